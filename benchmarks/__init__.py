@@ -0,0 +1 @@
+"""Benchmarks of the shopper generation, ingest and query hot paths."""
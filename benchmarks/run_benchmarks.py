@@ -0,0 +1,360 @@
+"""
+Times the hot paths of the shopper data generator over a grid of shoppers per day and
+number of days, and saves the results as JSON so runs of different versions can be compared.
+
+Run from the project folder:
+    python -m benchmarks.run_benchmarks --output benchmarks.json
+    python -m benchmarks.run_benchmarks --output new.json --compare benchmarks.json
+
+The database benchmarks run against the MongoDB at --mongodb-uri (or MONGODB_URI) in a
+separate benchmark database, or against an in-process mongomock client if no URI is given.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from configuration import HolidayModifiers, Rush, SeniorDiscount, StoreModel, DayModifiers
+from configuration import TimeFrame
+from shoppermodel import Day, ShopperDatabase, ShopperTable
+
+BENCHMARK_DATABASE = "shoppers_benchmark_db"
+BENCHMARK_COLLECTION = "benchmark"
+SUITES = ["day", "create_table", "to_csv", "populate", "query"]
+
+
+def create_store_model(shoppers_per_day, seed):
+    """
+    Returns a StoreModel with the default parameters and the same average traffic every day.
+    :param shoppers_per_day: average number of shoppers of every day of the week.
+    :param seed: seed of the store model.
+    :return: a StoreModel.
+    """
+    avg_shopper_traffic = {day_name: shoppers_per_day for day_name in
+                           ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday",
+                            "Saturday", "Sunday"]}
+    return StoreModel(Rush("12:00", "13:00", 10, 0.1), Rush("17:00", "18:30", 10, 0.15),
+                      HolidayModifiers(), DayModifiers(),
+                      SeniorDiscount("10:00", "12:00", 45, 60, 0.2), avg_shopper_traffic,
+                      seed=seed)
+
+
+def create_time_frame(days):
+    """
+    Returns a TimeFrame of the given number of days starting on 2020-01-01.
+    :param days: number of days of the time frame.
+    :return: a TimeFrame.
+    """
+    start_date = datetime(2020, 1, 1)
+    end_date = start_date + timedelta(days=days - 1)
+    return TimeFrame(start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"))
+
+
+def create_database(uri):
+    """
+    Returns a ShopperDatabase connected to the benchmark database.
+    :param uri: URI of the MongoDB to benchmark, an in-process mongomock client if None.
+    :return: the ShopperDatabase and the name of the database backend.
+    """
+    shopper_database = ShopperDatabase()
+    shopper_database.database_name = BENCHMARK_DATABASE
+    if uri:
+        shopper_database.uri = uri
+        shopper_database.connect_to_client()
+        return shopper_database, "mongod"
+    try:
+        import mongomock
+    except ImportError:
+        raise ImportError("The database benchmarks need a MongoDB URI or mongomock, "
+                          "install it with pip install mongomock.")
+    shopper_database.client = mongomock.MongoClient()
+    shopper_database.database = shopper_database.client[BENCHMARK_DATABASE]
+    return shopper_database, "mongomock"
+
+
+def time_call(function, repeat):
+    """
+    Calls a function repeatedly and returns how long each call took.
+    :param function: the function to time, called without arguments.
+    :param repeat: number of times to call the function.
+    :return: list of the seconds each call took.
+    """
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def create_result(benchmark, shoppers_per_day, days, rows, seconds):
+    """
+    Returns the result of a benchmark as a dictionary.
+    :param benchmark: name of the benchmark.
+    :param shoppers_per_day: average number of shoppers per day.
+    :param days: number of days.
+    :param rows: number of shoppers processed by one call.
+    :param seconds: list of the seconds each call took.
+    :return: dictionary of the result.
+    """
+    best = min(seconds)
+    return {"benchmark": benchmark, "shoppers_per_day": shoppers_per_day, "days": days,
+            "rows": int(rows), "repeat": len(seconds), "seconds_min": best,
+            "seconds_median": statistics.median(seconds),
+            "rows_per_second": rows / best if best > 0 else None}
+
+
+def benchmark_day(shoppers_per_day, repeat, seed):
+    """
+    Times Day.create_shoppers for one day.
+    :param shoppers_per_day: number of shoppers of the day.
+    :param repeat: number of times to time the call.
+    :param seed: seed of the store model.
+    :return: dictionary of the result.
+    """
+    store_model = create_store_model(shoppers_per_day, seed).compile()
+    date = pd.Timestamp("2020-01-08")
+    seconds = time_call(lambda: Day(store_model, shoppers_per_day, date,
+                                    store_model.day_rng(date)).create_shoppers(), repeat)
+    return create_result("day.create_shoppers", shoppers_per_day, 1, shoppers_per_day, seconds)
+
+
+def benchmark_create_table(shoppers_per_day, days, repeat, seed, workers):
+    """
+    Times ShopperTable.create_table.
+    :param shoppers_per_day: average number of shoppers per day.
+    :param days: number of days.
+    :param repeat: number of times to time the call.
+    :param seed: seed of the store model.
+    :param workers: number of processes generating the days.
+    :return: dictionary of the result.
+    """
+    store_model = create_store_model(shoppers_per_day, seed)
+    time_frame = create_time_frame(days)
+    tables = []
+    seconds = time_call(lambda: tables.append(
+        ShopperTable(store_model, time_frame).create_table(workers)), repeat)
+    return create_result("shopper_table.create_table", shoppers_per_day, days,
+                         len(tables[-1]), seconds)
+
+
+def benchmark_to_csv(shoppers_per_day, days, repeat, seed, workers, folder):
+    """
+    Times ShopperTable.to_csv streaming the shoppers chunk by chunk to a file.
+    :param shoppers_per_day: average number of shoppers per day.
+    :param days: number of days.
+    :param repeat: number of times to time the call.
+    :param seed: seed of the store model.
+    :param workers: number of processes generating the days.
+    :param folder: folder the CSV file is written to.
+    :return: dictionary of the result.
+    """
+    store_model = create_store_model(shoppers_per_day, seed)
+    time_frame = create_time_frame(days)
+    path = os.path.join(folder, "shoppers.csv")
+    seconds = time_call(lambda: ShopperTable(store_model, time_frame).to_csv(
+        path, workers=workers), repeat)
+    rows = int(store_model.daily_traffic(time_frame.dates).sum())
+    return create_result("shopper_table.to_csv", shoppers_per_day, days, rows, seconds)
+
+
+def benchmark_populate(shopper_database, shoppers_per_day, days, repeat, seed, workers):
+    """
+    Times ShopperDatabase.populate_shopper_database streaming the shoppers chunk by chunk.
+    :param shopper_database: ShopperDatabase connected to the benchmark database.
+    :param shoppers_per_day: average number of shoppers per day.
+    :param days: number of days.
+    :param repeat: number of times to time the call.
+    :param seed: seed of the store model.
+    :param workers: number of processes generating the days.
+    :return: dictionary of the result.
+    """
+    store_model = create_store_model(shoppers_per_day, seed)
+    time_frame = create_time_frame(days)
+    seconds = time_call(lambda: shopper_database.populate_shopper_database(
+        ShopperTable(store_model, time_frame), BENCHMARK_COLLECTION, workers=workers), repeat)
+    rows = shopper_database.database[BENCHMARK_COLLECTION].estimated_document_count()
+    return create_result("shopper_database.populate_shopper_database", shoppers_per_day, days,
+                         rows, seconds)
+
+
+def benchmark_query(shopper_database, shoppers_per_day, days, repeat):
+    """
+    Times ShopperDatabase.query on the collection filled by benchmark_populate, once for
+    a selective query and once for a query returning a large share of the shoppers.
+    :param shopper_database: ShopperDatabase holding the benchmark collection.
+    :param shoppers_per_day: average number of shoppers per day.
+    :param days: number of days.
+    :param repeat: number of times to time each query.
+    :return: list of dictionaries of the results.
+    """
+    queries = {"selective": {"IsSenior": True, "DayOfWeek": "Tuesday"},
+               "broad": {"DayOfWeek": {"$in": ["Friday", "Saturday", "Sunday"]}}}
+    results = []
+    for name, query_dict in queries.items():
+        outputs = []
+        seconds = time_call(lambda: outputs.append(shopper_database.query(
+            query_dict, collection_name=BENCHMARK_COLLECTION)), repeat)
+        results.append(create_result("shopper_database.query." + name, shoppers_per_day, days,
+                                     outputs[-1]["count"], seconds))
+    return results
+
+
+def run_benchmarks(args):
+    """
+    Runs the selected benchmarks over the grid of shoppers per day and number of days.
+    :param args: parsed arguments.
+    :return: dictionary of the run metadata and the results.
+    """
+    results = []
+    backend = None
+    with tempfile.TemporaryDirectory() as folder:
+        for shoppers_per_day in args.shoppers:
+            if "day" in args.suites:
+                results.append(benchmark_day(shoppers_per_day, args.repeat, args.seed))
+                print_result(results[-1])
+            for days in args.days:
+                if "create_table" in args.suites:
+                    results.append(benchmark_create_table(shoppers_per_day, days, args.repeat,
+                                                          args.seed, args.workers))
+                    print_result(results[-1])
+                if "to_csv" in args.suites:
+                    results.append(benchmark_to_csv(shoppers_per_day, days, args.repeat,
+                                                    args.seed, args.workers, folder))
+                    print_result(results[-1])
+
+        if "populate" in args.suites or "query" in args.suites:
+            shopper_database, backend = create_database(args.mongodb_uri)
+            try:
+                for shoppers_per_day in args.shoppers:
+                    for days in args.days:
+                        # the query benchmarks need the collection the populate benchmark fills
+                        populate = benchmark_populate(shopper_database, shoppers_per_day, days,
+                                                      args.repeat, args.seed, args.workers)
+                        if "populate" in args.suites:
+                            results.append(populate)
+                            print_result(populate)
+                        if "query" in args.suites:
+                            for result in benchmark_query(shopper_database, shoppers_per_day,
+                                                          days, args.repeat):
+                                results.append(result)
+                                print_result(result)
+            finally:
+                shopper_database.client.drop_database(BENCHMARK_DATABASE)
+
+    return {"created": datetime.now().isoformat(timespec="seconds"),
+            "revision": git_revision(), "python": platform.python_version(),
+            "platform": platform.platform(), "numpy": np.__version__,
+            "pandas": pd.__version__, "database": backend, "workers": args.workers,
+            "seed": args.seed, "results": results}
+
+
+def compare_results(results, baseline):
+    """
+    Prints how much slower or faster each benchmark is than in a baseline run.
+    :param results: dictionary of the current run, as returned by run_benchmarks.
+    :param baseline: dictionary of the baseline run.
+    :return: list of (benchmark, shoppers_per_day, days, ratio) of the benchmarks in both
+    runs, where ratio is the current time divided by the baseline time.
+    """
+    def key(result):
+        return result["benchmark"], result["shoppers_per_day"], result["days"]
+
+    baseline_seconds = {key(result): result["seconds_min"] for result in baseline["results"]}
+    ratios = []
+    for result in results["results"]:
+        if key(result) in baseline_seconds and baseline_seconds[key(result)] > 0:
+            ratio = result["seconds_min"] / baseline_seconds[key(result)]
+            ratios.append(key(result) + (ratio,))
+            print("{:<45} {:>8} x {:>4} days  {:6.2f}x baseline".format(*key(result), ratio))
+    return ratios
+
+
+def print_result(result):
+    """
+    Prints a benchmark result on one line.
+    :param result: dictionary of the result.
+    """
+    print("{:<45} {:>8} x {:>4} days  {:9.4f} s  {:>12,.0f} rows/s".format(
+        result["benchmark"], result["shoppers_per_day"], result["days"],
+        result["seconds_min"], result["rows_per_second"] or 0))
+
+
+def git_revision():
+    """
+    Returns the git commit the benchmarks ran on.
+    :return: the commit hash, None if it could not be found.
+    """
+    try:
+        output = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def number_of_days(value):
+    """
+    Parses a number of days of a time frame from the command line, a time frame ends
+    after the day it starts on so it has at least 2 days.
+    :param value: the number of days as a string.
+    :return: the number of days as an integer.
+    """
+    days = int(value)
+    if days < 2:
+        raise argparse.ArgumentTypeError("Invalid. A time frame has at least 2 days, "
+                                         "not {}.".format(value))
+    return days
+
+
+def read_commands():
+    """
+    Parses the commands from the command line.
+    :return: parsed arguments.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the shopper data generator")
+    parser.add_argument('-s', '--shoppers', nargs='+', default=[500, 2000, 8000], type=int,
+                        help='Average numbers of shoppers per day to benchmark: 500 2000 8000')
+    parser.add_argument('-d', '--days', nargs='+', default=[7, 28], type=number_of_days,
+                        help='Numbers of days to benchmark, at least 2: 7 28')
+    parser.add_argument('-r', '--repeat', default=3, type=int,
+                        help='Number of times each benchmark is timed, the fastest is kept: 3')
+    parser.add_argument('-w', '--workers', default=1, type=int,
+                        help='Number of processes generating the shoppers: 1')
+    parser.add_argument('--seed', default=42, type=int,
+                        help='Seed of the generated shoppers: 42')
+    parser.add_argument('--suites', nargs='+', default=SUITES, choices=SUITES,
+                        help='Benchmarks to run: ' + ' '.join(SUITES))
+    parser.add_argument('--mongodb-uri', default=os.environ.get('MONGODB_URI'), type=str,
+                        help='URI of the MongoDB to benchmark, mongomock if not given: '
+                             'MONGODB_URI')
+    parser.add_argument('-o', '--output', default='benchmarks.json', type=str,
+                        help='Path of the JSON file the results are saved to: benchmarks.json')
+    parser.add_argument('-c', '--compare', default=None, type=str,
+                        help='Path of a JSON file of earlier results to compare against')
+    return parser.parse_args()
+
+
+def main():
+    """
+    Runs the benchmarks and saves the results.
+    """
+    args = read_commands()
+    results = run_benchmarks(args)
+    with open(args.output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    if args.compare is not None:
+        with open(args.compare) as baseline_file:
+            compare_results(results, json.load(baseline_file))
+
+
+if __name__ == '__main__':
+    main()
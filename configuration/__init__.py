@@ -1,8 +1,11 @@
 """Initializes the configuration package."""
 
+from configuration.holiday_calendar import HolidayCalendar
 from configuration.holiday_modifiers import HolidayModifiers
 from configuration.rush import Rush
 from configuration.senior_discount import SeniorDiscount
 from configuration.store_model import StoreModel
+from configuration.compiled_store_model import CompiledStoreModel
 from configuration.day_modifiers import DayModifiers
 from configuration.time_frame import TimeFrame
+from configuration.store_fleet import StoreFleet
@@ -0,0 +1,114 @@
+"""
+This module holds the store model flattened into plain numbers for generating shoppers
+"""
+import calendar
+from collections import namedtuple
+
+import numpy as np
+
+from configuration.holiday_calendar import HolidayCalendar
+from shoppermodel.day import Day
+from shoppermodel.util import seconds_since_midnight
+
+# a rush window in seconds since midnight
+CompiledRush = namedtuple('CompiledRush', ['start', 'end', 'time_spent', 'percent'])
+
+# the senior discount window in seconds since midnight, on a day of the week (Monday is 0)
+CompiledSeniorDiscount = namedtuple('CompiledSeniorDiscount',
+                                    ['start', 'end', 'min_time_spent', 'max_time_spent',
+                                     'weekday'])
+
+
+class CompiledStoreModel:
+    """
+    A StoreModel compiled once per run: every time of day is turned into seconds since
+    midnight and every per day of the week value into a lookup table indexed by the day of
+    the week, so creating a day only needs the date.
+    """
+
+    def __init__(self, store_model):
+        """
+        Initializes CompiledStoreModel.
+        :param store_model: the StoreModel object to compile.
+        """
+        day_modifiers = store_model.day_modifiers
+        senior_discount = store_model.senior_discount
+
+        self.seed = store_model.seed
+        self.open_time = seconds_since_midnight(store_model.open_time)
+        self.close_time = seconds_since_midnight(store_model.close_time)
+        self.lunch_rush = self.__compile_rush(store_model.lunch_rush)
+        self.dinner_rush = self.__compile_rush(store_model.dinner_rush)
+        self.senior_discount = CompiledSeniorDiscount(
+            seconds_since_midnight(senior_discount.start_time),
+            seconds_since_midnight(senior_discount.end_time),
+            senior_discount.min_time_spent, senior_discount.max_time_spent,
+            list(calendar.day_name).index(senior_discount.day_name))
+        self.percent_senior = store_model.percent_senior
+
+        self.min_time_spent = day_modifiers.min_time_spent
+        self.avg_time_spent = day_modifiers.avg_time_spent
+        self.max_time_spent = day_modifiers.max_time_spent
+        self.weekend_time_spent = day_modifiers.weekend_time_spent
+        self.sunny_time_spent = day_modifiers.sunny_time_spent
+        self.sunny_chance_percent = day_modifiers.sunny_chance_percent
+
+        # lookup tables indexed by the day of the week
+        self.traffic = np.array([store_model.avg_shopper_traffic[day_name]
+                                 for day_name in calendar.day_name])
+        self.is_weekend = np.array([False, False, False, False, False, True, True])
+
+        self.holiday_modifiers = store_model.holiday_modifiers
+
+    def compile(self):
+        """
+        Returns this compiled store model.
+        :return: this CompiledStoreModel.
+        """
+        return self
+
+    def create_day(self, date, num_of_shoppers):
+        """
+        Creates a day
+        :param date: the date to create a Day object for
+        :param num_of_shoppers: number of shoppers of the day
+        :return: a Day
+        """
+        return Day(self, num_of_shoppers, date, self.day_rng(date))
+
+    def daily_traffic(self, dates, holiday_calendar=None):
+        """
+        Returns the number of shoppers of each date, the average traffic of the
+        day of the week after applying the holiday modifiers.
+        :param dates: a pandas DatetimeIndex of dates.
+        :param holiday_calendar: a HolidayCalendar covering the dates, one is created
+        for the dates if None.
+        :return: a numpy array of the number of shoppers of each date.
+        """
+        if holiday_calendar is None:
+            holiday_calendar = HolidayCalendar(dates.min(), dates.max(),
+                                               self.holiday_modifiers.region)
+        multipliers = self.holiday_modifiers.multipliers(holiday_calendar.kinds_of(dates))
+        return np.round(self.traffic[dates.dayofweek] * multipliers).astype(int)
+
+    def day_rng(self, date):
+        """
+        Returns the random number generator for a date. Every date gets its own independent
+        stream derived from the seed and the date, so days can be generated in any order or
+        process and still produce the same shoppers.
+        :param date: the date to create the random number generator for.
+        :return: a numpy Generator.
+        """
+        seed_sequence = np.random.SeedSequence(self.seed, spawn_key=(date.toordinal(),))
+        return np.random.default_rng(seed_sequence)
+
+    @staticmethod
+    def __compile_rush(rush):
+        """
+        Returns a rush with its window in seconds since midnight.
+        :param rush: Rush object.
+        :return: a CompiledRush.
+        """
+        return CompiledRush(seconds_since_midnight(rush.start_time),
+                            seconds_since_midnight(rush.end_time),
+                            rush.time_spent, rush.percent)
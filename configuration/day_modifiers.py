@@ -1,7 +1,7 @@
 """"
 Contains all modifier variables for a sunny day
 """
-import random
+import numpy as np
 
 
 class DayModifiers:
@@ -20,16 +20,20 @@ class DayModifiers:
         self.sunny_chance_percent = sunny_chance_percent
         self.sunny_time_spent = sunny_time_spent
 
-    def time_spent(self, is_weekend=False):
+    def time_spent(self, is_weekend=False, rng=None, size=None):
         """
         Generates a value for a time spent at the grocery store
         :param is_weekend: is the time spent being generate for a weekend
+        :param rng: numpy Generator to draw the time spent from (optional)
+        :param size: number of values to generate, a single value is returned if None
         :return: the time spent
         """
+        if rng is None:
+            rng = np.random.default_rng()
         if not is_weekend:
-            return random.triangular(self.min_time_spent,
-                                     self.avg_time_spent,
-                                     self.max_time_spent)
-        return random.triangular(self.min_time_spent,
-                                 self.weekend_time_spent,
-                                 self.max_time_spent)
+            return rng.triangular(self.min_time_spent,
+                                  self.avg_time_spent,
+                                  self.max_time_spent, size)
+        return rng.triangular(self.min_time_spent,
+                              self.weekend_time_spent,
+                              self.max_time_spent, size)
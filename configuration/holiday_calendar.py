@@ -0,0 +1,74 @@
+"""
+Precomputed holiday information for a range of dates.
+Used to look up how a holiday changes the number of shoppers without
+checking the holidays of every date one by one.
+"""
+import holidays
+import numpy as np
+import pandas as pd
+
+
+def region_holidays(region, years=None):
+    """
+    Returns the holidays of a country.
+    :param region: country code of the holidays, for example US or CA.
+    :param years: the years to look up the holidays of, looked up on demand if None.
+    :return: a holidays.HolidayBase object.
+    """
+    # country_holidays replaces CountryHoliday in newer releases of holidays
+    country_holidays = getattr(holidays, 'country_holidays', holidays.CountryHoliday)
+    return country_holidays(region, years=years)
+
+
+class HolidayCalendar:
+    """
+    Holds the kind of every date in a range of dates: a holiday, the day before a holiday,
+    2 to 6 days before a holiday, or none of these. The holidays of the years the range
+    spans are looked up once when the calendar is created.
+    """
+
+    NONE = 0
+    WEEK_BEFORE = 1
+    DAY_BEFORE = 2
+    HOLIDAY = 3
+
+    def __init__(self, start_date, end_date, region='US'):
+        """
+        Initializes HolidayCalendar.
+        :param start_date: first date of the calendar.
+        :param end_date: last date of the calendar.
+        :param region: country code of the holidays, for example US or CA (US).
+        """
+        self.region = region
+        self.start_date = pd.Timestamp(start_date).normalize()
+        self.end_date = pd.Timestamp(end_date).normalize()
+        # holidays up to a week after the last date change the number of shoppers
+        last_date = self.end_date + pd.Timedelta(days=7)
+        years = list(range(self.start_date.year, last_date.year + 1))
+
+        num_days = (last_date - self.start_date).days + 1
+        is_holiday = np.zeros(num_days, dtype=bool)
+        for holiday in region_holidays(region, years):
+            offset = (pd.Timestamp(holiday) - self.start_date).days
+            if 0 <= offset < num_days:
+                is_holiday[offset] = True
+
+        num_dates = (self.end_date - self.start_date).days + 1
+        kinds = np.full(num_dates, self.NONE, dtype=np.int8)
+        for days_ahead in range(6, 1, -1):
+            kinds[is_holiday[days_ahead:days_ahead + num_dates]] = self.WEEK_BEFORE
+        kinds[is_holiday[1:1 + num_dates]] = self.DAY_BEFORE
+        kinds[is_holiday[:num_dates]] = self.HOLIDAY
+        self.kinds = kinds
+
+    def kinds_of(self, dates):
+        """
+        Returns the kind of each of the given dates.
+        :param dates: a pandas DatetimeIndex of dates within the calendar.
+        :return: a numpy array of kinds (NONE, WEEK_BEFORE, DAY_BEFORE or HOLIDAY).
+        """
+        offsets = (pd.DatetimeIndex(dates).normalize() - self.start_date).days
+        if len(offsets) and (offsets.min() < 0 or offsets.max() >= len(self.kinds)):
+            raise ValueError("Invalid. The dates are not within the holiday calendar "
+                             "({} to {}).".format(self.start_date.date(), self.end_date.date()))
+        return self.kinds[offsets]
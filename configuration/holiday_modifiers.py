@@ -2,8 +2,9 @@
 Holds the percentage increase or decrease of shoppers during a holiday.
 Used to change number of shoppers during a holiday.
 """
-import holidays
-import pandas as pd
+import numpy as np
+
+from configuration.holiday_calendar import HolidayCalendar, region_holidays
 
 
 class HolidayModifiers:
@@ -12,9 +13,8 @@ class HolidayModifiers:
     Used to change number of shoppers during a holiday.
     """
 
-    holidays = holidays.US()
-
-    def __init__(self, holiday_percent=0.2, day_before_percent=0.4, week_before_percent=0.15):
+    def __init__(self, holiday_percent=0.2, day_before_percent=0.4, week_before_percent=0.15,
+                 region='US'):
         """
         Initializes HolidayModifiers.
         :param holiday_percent: percent decrease in average shopper traffic on a holiday (0.2).
@@ -22,10 +22,12 @@ class HolidayModifiers:
         holiday as a decimal (0.4).
         :param week_before_percent: percent increase in average shopper traffic during the week
         leading up to a holiday as a decimal (0.15).
+        :param region: country code of the holidays, for example US or CA (US).
         """
         self.holiday_percent = holiday_percent
         self.day_before_percent = day_before_percent
         self.week_before_percent = week_before_percent
+        self.region = region
 
     def apply_holiday_modifier(self, date, num_of_shoppers):
         """
@@ -35,40 +37,36 @@ class HolidayModifiers:
         :param num_of_shoppers: current number of shoppers for the given date.
         :return: updated number of shoppers for the given date.
         """
-        if self.__is_holiday(date):
-            return round(num_of_shoppers * self.holiday_percent)
-        if self.__is_day_before_holiday(date):
-            return round(num_of_shoppers * (1 + self.day_before_percent))
-        if self.__is_week_before_holiday(date):
-            return round(num_of_shoppers * (1 + self.week_before_percent))
-        return num_of_shoppers
+        calendar = HolidayCalendar(date, date, self.region)
+        multiplier = self.multipliers(calendar.kinds)[0]
+        return round(num_of_shoppers * multiplier)
 
-    def __is_holiday(self, date):
+    def multipliers(self, kinds):
         """
-        Returns true if the given date is a holiday. False otherwise.
-        :param date: date as a datetime object.
-        :return: true if the given date is a holiday. False otherwise.
+        Returns the factor the number of shoppers is multiplied by for each holiday kind.
+        :param kinds: a numpy array of HolidayCalendar kinds.
+        :return: a numpy array of multipliers.
         """
-        return date in self.holidays
+        by_kind = np.empty(4)
+        by_kind[HolidayCalendar.NONE] = 1
+        by_kind[HolidayCalendar.WEEK_BEFORE] = 1 + self.week_before_percent
+        by_kind[HolidayCalendar.DAY_BEFORE] = 1 + self.day_before_percent
+        by_kind[HolidayCalendar.HOLIDAY] = self.holiday_percent
+        return by_kind[kinds]
 
-    def __is_day_before_holiday(self, date):
-        """
-        Returns true if the given date is one day before a holiday. False otherwise.
-        :param date: the date as a datetime object.
-        :return: true if the given date is one day before a holiday. False otherwise.
-        """
-        date_ahead = date + pd.Timedelta('1 days')
-        return date_ahead in self.holidays
+    @property
+    def region(self):
+        """Return the holiday region."""
+        return self._region
 
-    def __is_week_before_holiday(self, date):
-        """
-        Returns true if the given date is 2 to 7 days before a holiday. False otherwise.
-        :param date: the date as a datetime object.
-        :return: true if the given date is 2 to 7 days before a holiday. False otherwise.
-        """
-        time_deltas = pd.timedelta_range(start='2 days', periods=5)
-        for delta in time_deltas:
-            test_date = date + delta
-            if test_date in self.holidays:
-                return True
-        return False
+    @region.setter
+    def region(self, region):
+        """Set the holiday region."""
+        try:
+            country_holidays = region_holidays(region)
+        except (KeyError, NotImplementedError, AttributeError, TypeError):
+            raise AttributeError("Invalid. Could not set the holiday region because the "
+                                 "provided region ({}) is not a supported country "
+                                 "code (US).".format(region))
+        self._region = region
+        self.holidays = country_holidays
@@ -0,0 +1,175 @@
+"""
+Converts parameter documents, the dictionaries of parameters stored in MongoDB
+and sent to the API, into configuration objects, and works out which dates a change
+to a parameter document affects.
+"""
+import copy
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from configuration.day_modifiers import DayModifiers
+from configuration.holiday_modifiers import HolidayModifiers
+from configuration.rush import Rush
+from configuration.senior_discount import SeniorDiscount
+from configuration.store_model import StoreModel
+from configuration.time_frame import TimeFrame
+
+
+def create_config(parameter_set):
+    """
+    Takes parameter dictionary and creates configuration objects used to generate shopper data
+    :param parameter_set: dictionary of parameters and their corresponding values {parameter: value}
+    :return: configuration objects initialized with data from parameters dictionary
+    """
+    time_frame = TimeFrame(parameter_set["start_date"], parameter_set["end_date"])
+
+    lunch_rush = Rush(parameter_set["lunch_rush"]["start_time"],
+                      parameter_set["lunch_rush"]["end_time"],
+                      parameter_set["lunch_rush"]["time_spent"],
+                      parameter_set["lunch_rush"]["percent"])
+    dinner_rush = Rush(parameter_set["dinner_rush"]["start_time"],
+                       parameter_set["dinner_rush"]["end_time"],
+                       parameter_set["dinner_rush"]["time_spent"],
+                       parameter_set["dinner_rush"]["percent"])
+
+    senior_discount = SeniorDiscount(parameter_set["senior_discount"]["start_time"],
+                                     parameter_set["senior_discount"]["end_time"],
+                                     parameter_set["senior_discount"]["min_time_spent"],
+                                     parameter_set["senior_discount"]["max_time_spent"],
+                                     parameter_set["senior_discount"]["percent"],
+                                     parameter_set["senior_discount"].get("day", "Tuesday"))
+
+    holiday_modifiers = HolidayModifiers(parameter_set["holiday_modifiers"]["holiday_percent"],
+                                         parameter_set["holiday_modifiers"]["day_before_percent"],
+                                         parameter_set["holiday_modifiers"]["week_before_percent"],
+                                         parameter_set["holiday_modifiers"].get("region", "US"))
+
+    day_modifiers = DayModifiers(parameter_set["day_modifiers"]["min_time_spent"],
+                                 parameter_set["day_modifiers"]["avg_time_spent"],
+                                 parameter_set["day_modifiers"]["max_time_spent"],
+                                 parameter_set["day_modifiers"]["weekend_time_spent"],
+                                 parameter_set["day_modifiers"]["sunny_traffic_percent"],
+                                 parameter_set["day_modifiers"]["sunny_chance_percent"],
+                                 parameter_set["day_modifiers"]["sunny_time_spent"])
+
+    avg_shopper_traffic = parameter_set["daily_average_traffic"]
+
+    store_model = StoreModel(lunch_rush, dinner_rush, holiday_modifiers, day_modifiers,
+                             senior_discount, avg_shopper_traffic, parameter_set["open_time"],
+                             parameter_set["close_time"],
+                             parameter_set["senior_discount"]["percent"],
+                             parameter_set.get("seed"))
+
+    return store_model, time_frame
+
+
+# the keys of a parameter document that the generated shoppers depend on
+GENERATION_KEYS = ["start_date", "end_date", "open_time", "close_time", "daily_average_traffic",
+                   "lunch_rush", "dinner_rush", "day_modifiers", "holiday_modifiers",
+                   "senior_discount", "seed"]
+
+# fields of the compiled store model that change the shoppers of every day
+EVERY_DAY_FIELDS = ["seed", "open_time", "close_time", "lunch_rush", "dinner_rush",
+                    "percent_senior", "sunny_chance_percent"]
+
+# fields that only change the shoppers of weekdays, weekends replace the time spent
+WEEKDAY_FIELDS = ["min_time_spent", "avg_time_spent", "max_time_spent"]
+
+# fields that only change the shoppers of weekends
+WEEKEND_FIELDS = ["weekend_time_spent", "sunny_time_spent"]
+
+
+def generation_snapshot(parameter_set, seed):
+    """
+    Returns a copy of the parameters the shoppers depend on, with the seed they were
+    generated with. Stored with the parameters so a later change can be compared to it.
+    :param parameter_set: dictionary of parameters and their corresponding values.
+    :param seed: the seed the shoppers were generated with.
+    :return: dictionary of the parameters the shoppers were generated with.
+    """
+    snapshot = {key: copy.deepcopy(parameter_set[key]) for key in GENERATION_KEYS
+                if key in parameter_set}
+    snapshot["seed"] = seed
+    return snapshot
+
+
+def normalize_parameters(parameter_set, seed):
+    """
+    Returns the parameters the shoppers depend on in a canonical form, so two parameter
+    documents that generate the same shoppers compare and hash the same: dates as
+    YYYY-MM-DD, times as HH:MM:SS and numbers as floats.
+    :param parameter_set: dictionary of parameters and their corresponding values.
+    :param seed: the seed the shoppers are generated with.
+    :return: dictionary of the normalized parameters.
+    """
+    snapshot = generation_snapshot(parameter_set, seed)
+    del snapshot["seed"]
+    for key in ["start_date", "end_date"]:
+        snapshot[key] = pd.Timestamp(snapshot[key]).strftime("%Y-%m-%d")
+    normalized = _normalize(snapshot)
+    normalized["seed"] = seed
+    return normalized
+
+
+def _normalize(value):
+    """
+    Returns a parameter value with its times as HH:MM:SS and its numbers as floats,
+    normalizing nested dictionaries.
+    :param value: a parameter value.
+    :return: the normalized value.
+    """
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        for time_format in ["%H:%M", "%H:%M:%S"]:
+            try:
+                return datetime.strptime(value, time_format).strftime("%H:%M:%S")
+            except ValueError:
+                pass
+    return value
+
+
+def affected_dates(old_parameter_set, new_parameter_set):
+    """
+    Returns the dates whose shoppers change when the shoppers generated with the old
+    parameters are generated with the new ones. Every day draws from its own random
+    stream, so the shoppers of the other dates stay the same. Changes to the number of
+    shoppers of a date, like the traffic of a day of the week or the holiday modifiers,
+    affect only that date, the weekend time spent only weekends, and the senior discount
+    only the old and new senior day. Both parameter sets need a seed.
+    :param old_parameter_set: dictionary of the parameters the shoppers were generated with.
+    :param new_parameter_set: dictionary of the changed parameters.
+    :return: a pandas DatetimeIndex of the affected dates of the new time frame, every
+    date if the time frames differ.
+    """
+    old_store_model, old_time_frame = create_config(old_parameter_set)
+    new_store_model, new_time_frame = create_config(new_parameter_set)
+    old_model = old_store_model.compile()
+    new_model = new_store_model.compile()
+    dates = new_time_frame.dates
+
+    def changed(fields):
+        return any(getattr(old_model, field) != getattr(new_model, field) for field in fields)
+
+    if not old_time_frame.dates.equals(dates) or changed(EVERY_DAY_FIELDS):
+        return dates
+
+    region = new_model.holiday_modifiers.region
+    affected = (old_model.daily_traffic(dates, old_time_frame.holiday_calendar(
+        old_model.holiday_modifiers.region)) != new_model.daily_traffic(
+            dates, new_time_frame.holiday_calendar(region)))
+    is_weekend = new_model.is_weekend[dates.dayofweek]
+    if changed(WEEKDAY_FIELDS):
+        affected |= ~is_weekend
+    if changed(WEEKEND_FIELDS):
+        affected |= is_weekend
+    if old_model.senior_discount != new_model.senior_discount:
+        affected |= np.isin(dates.dayofweek, [old_model.senior_discount.weekday,
+                                              new_model.senior_discount.weekday])
+    return dates[affected]
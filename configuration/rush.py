@@ -2,9 +2,10 @@
 Represents a period of time in which customers will come into
 the store for a specific rush crowd. eg. a Lunch rush
 """
-import random
 from datetime import datetime
 
+import numpy as np
+
 
 class Rush:
     """
@@ -33,13 +34,16 @@ class Rush:
         """
         return round(self.percent * num)
 
-    def calculate_time_spent(self, std=5):
+    def calculate_time_spent(self, std=5, rng=None):
         """
         Returns a randomly generated integer for time spent.
         :param std: standard deviation to be applied.
+        :param rng: numpy Generator to draw the time spent from (optional).
         :return: a randomly generated integer for time spent.
         """
-        return round(random.gauss(self.time_spent, std))
+        if rng is None:
+            rng = np.random.default_rng()
+        return round(rng.normal(self.time_spent, std))
 
     @property
     def start_time(self):
@@ -0,0 +1,121 @@
+"""
+This module holds a fleet of stores that are generated together
+"""
+import copy
+import json
+import secrets
+import zlib
+
+import numpy as np
+
+from configuration.parameter_set import create_config
+from configuration.time_frame import TimeFrame
+
+
+class StoreFleet:
+    """
+    A collection of stores sharing one time frame, holiday calendar and seed. Every store
+    gets its own seed derived from the fleet seed and its store ID, unless it is given a
+    seed of its own, so a store generates the same shoppers no matter which other stores
+    are in the fleet.
+    """
+
+    def __init__(self, store_models, time_frame, seed=None, store_seeds=None):
+        """
+        Initializes StoreFleet.
+        :param store_models: dictionary of StoreModel objects by store ID {store_id: StoreModel}.
+        :param time_frame: TimeFrame object shared by the stores.
+        :param seed: seed the store seeds are derived from, random if None (optional).
+        :param store_seeds: dictionary of the seeds of the stores that have a seed of their
+        own by store ID {store_id: seed} (optional).
+        """
+        if not store_models:
+            raise ValueError("Invalid. A fleet needs at least one store.")
+        self.time_frame = time_frame
+        self.seed = secrets.randbits(32) if seed is None else int(seed)
+        self.store_models = dict(store_models)
+        self.store_seeds = {store_id: int(store_seed)
+                            for store_id, store_seed in (store_seeds or {}).items()}
+        for store_id, store_model in self.store_models.items():
+            store_model.seed = self.store_seed(store_id)
+
+    def store_seed(self, store_id):
+        """
+        Returns the seed of a store, its own seed if it was given one, otherwise derived
+        from the fleet seed and the store ID.
+        :param store_id: the ID of the store.
+        :return: the seed of the store as an integer.
+        """
+        if store_id in self.store_seeds:
+            return self.store_seeds[store_id]
+        store_key = zlib.crc32(str(store_id).encode("utf-8"))
+        seed_sequence = np.random.SeedSequence(self.seed, spawn_key=(store_key,))
+        return int(seed_sequence.generate_state(1)[0])
+
+    @classmethod
+    def from_manifest(cls, path):
+        """
+        Creates a fleet from a JSON or YAML manifest. The manifest holds the time frame and
+        seed of the fleet, the parameters shared by every store and a list of stores, each
+        with a store_id and the parameters that differ from the shared ones. A store with a
+        seed keeps it instead of the seed derived from the seed of the fleet:
+        {"start_date": "2020-01-01", "end_date": "2020-03-31", "seed": 42,
+        "defaults": {parameter set}, "stores": [{"store_id": "north", "seed": 7, ...}, ...]}
+        :param path: path to the manifest, YAML if it ends in .yml or .yaml.
+        :return: a StoreFleet.
+        """
+        with open(path) as manifest_file:
+            if str(path).endswith((".yml", ".yaml")):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError("Reading a YAML manifest requires PyYAML, "
+                                      "install it with pip install pyyaml.")
+                manifest = yaml.safe_load(manifest_file)
+            else:
+                manifest = json.load(manifest_file)
+        return cls.from_dict(manifest)
+
+    @classmethod
+    def from_dict(cls, manifest):
+        """
+        Creates a fleet from a manifest dictionary, see from_manifest.
+        :param manifest: the manifest as a dictionary.
+        :return: a StoreFleet.
+        ValueError: If a store ID is used twice or the shared parameters have a seed.
+        """
+        if manifest.get("defaults", {}).get("seed") is not None:
+            raise ValueError("Invalid. The seed shared by the stores goes at the top of the "
+                             "manifest, not in defaults.")
+        time_frame = TimeFrame(manifest["start_date"], manifest["end_date"])
+        store_models = {}
+        store_seeds = {}
+        for store in manifest["stores"]:
+            store = dict(store)
+            store_id = str(store.pop("store_id"))
+            if store_id in store_models:
+                raise ValueError("Invalid. The store ID ({}) is used by more than one "
+                                 "store.".format(store_id))
+            parameter_set = _merge(manifest.get("defaults", {}), store)
+            parameter_set["start_date"] = manifest["start_date"]
+            parameter_set["end_date"] = manifest["end_date"]
+            store_models[store_id], _ = create_config(parameter_set)
+            if store.get("seed") is not None:
+                store_seeds[store_id] = store["seed"]
+        return cls(store_models, time_frame, manifest.get("seed"), store_seeds)
+
+
+def _merge(defaults, overrides):
+    """
+    Returns the defaults updated with the overrides, merging nested dictionaries.
+    :param defaults: dictionary of default values.
+    :param overrides: dictionary of values replacing the defaults.
+    :return: the merged dictionary.
+    """
+    merged = copy.deepcopy(defaults)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
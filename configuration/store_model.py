@@ -2,9 +2,10 @@
 This module holds the domain model data for the store
 """
 import calendar
+import secrets
 from datetime import datetime
 
-from shoppermodel.day import Day
+from configuration.compiled_store_model import CompiledStoreModel
 
 
 class StoreModel:
@@ -13,7 +14,8 @@ class StoreModel:
     """
 
     def __init__(self, lunch_rush, dinner_rush, holiday_modifiers, day_modifiers, senior_discount,
-                 avg_shopper_traffic, open_time='06:00', close_time='21:00', percent_senior=0.2):
+                 avg_shopper_traffic, open_time='06:00', close_time='21:00', percent_senior=0.2,
+                 seed=None):
         self.lunch_rush = lunch_rush
         self.dinner_rush = dinner_rush
         self.day_modifiers = day_modifiers
@@ -23,19 +25,71 @@ class StoreModel:
         self.close_time = close_time
         self.percent_senior = percent_senior
         self.avg_shopper_traffic = avg_shopper_traffic
+        self.seed = seed
 
-    def create_day(self, date):
+    def create_day(self, date, num_of_shoppers=None):
         """
         Creates a day
         :param date: the date to create a Day object for
+        :param num_of_shoppers: number of shoppers of the day, computed from the
+        average traffic and the holidays if None
         :return: a Day
         """
-        day_name = calendar.day_name[date.weekday()]
-        # get avg number of shoppers based on day of week
-        num_of_shoppers = self.avg_shopper_traffic[day_name]
-        # check if the date is a holiday
-        num_of_shoppers = self.holiday_modifiers.apply_holiday_modifier(date, num_of_shoppers)
-        return Day(self, num_of_shoppers, date)
+        if num_of_shoppers is None:
+            day_name = calendar.day_name[date.weekday()]
+            # get avg number of shoppers based on day of week
+            num_of_shoppers = self.avg_shopper_traffic[day_name]
+            # check if the date is a holiday
+            num_of_shoppers = self.holiday_modifiers.apply_holiday_modifier(date,
+                                                                            num_of_shoppers)
+        return self.compile().create_day(date, num_of_shoppers)
+
+    def compile(self):
+        """
+        Returns the store model flattened into seconds since midnight and lookup tables.
+        Compile once per run and create the days from the compiled model.
+        :return: a CompiledStoreModel.
+        """
+        return CompiledStoreModel(self)
+
+    def daily_traffic(self, dates, holiday_calendar=None):
+        """
+        Returns the number of shoppers of each date, the average traffic of the
+        day of the week after applying the holiday modifiers.
+        :param dates: a pandas DatetimeIndex of dates.
+        :param holiday_calendar: a HolidayCalendar covering the dates, one is created
+        for the dates if None.
+        :return: a numpy array of the number of shoppers of each date.
+        """
+        return self.compile().daily_traffic(dates, holiday_calendar)
+
+    def day_rng(self, date):
+        """
+        Returns the random number generator for a date.
+        :param date: the date to create the random number generator for.
+        :return: a numpy Generator.
+        """
+        return self.compile().day_rng(date)
+
+    @property
+    def seed(self):
+        """Return the seed."""
+        return self._seed
+
+    @seed.setter
+    def seed(self, seed):
+        """Set the seed, a random one is picked if no seed is provided."""
+        if seed is None:
+            seed = secrets.randbits(32)
+        try:
+            seed = int(seed)
+        except (TypeError, ValueError):
+            raise AttributeError("Invalid. Could not set the seed because the provided seed "
+                                 "({}) is not an integer.".format(seed))
+        if seed < 0:
+            raise ValueError("Invalid. Could not set the seed because the provided seed "
+                             "({}) is negative.".format(seed))
+        self._seed = seed
 
     @property
     def open_time(self):
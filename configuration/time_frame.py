@@ -3,7 +3,8 @@ This modules holds the date range information for the shopping data
 """
 from datetime import datetime
 import pandas as pd
-import holidays
+
+from configuration.holiday_calendar import HolidayCalendar
 
 
 class TimeFrame:
@@ -11,12 +12,24 @@ class TimeFrame:
     The TimeFrame represents the time period for the shopper behavior being tracked.
     It knows whether a date is a holiday and can create a list of dates within the time period.
     """
-    holidays = holidays.US()
 
     def __init__(self, start_date, end_date):
         self.start_date = start_date
         self.end_date = end_date
         self.dates = pd.date_range(start_date, end_date)
+        self.__holiday_calendars = {}
+
+    def holiday_calendar(self, region='US'):
+        """
+        Returns the holiday calendar of the dates in the time period, it is only
+        computed the first time it is requested for a region.
+        :param region: country code of the holidays (US).
+        :return: a HolidayCalendar object.
+        """
+        if region not in self.__holiday_calendars:
+            self.__holiday_calendars[region] = HolidayCalendar(self.start_date, self.end_date,
+                                                               region)
+        return self.__holiday_calendars[region]
 
     @property
     def start_date(self):
@@ -2,7 +2,10 @@
 import argparse
 
 from datetime import datetime, timedelta
-from json import loads
+from functools import partial
+from json import dumps, loads
+
+from pymongo import WriteConcern
 
 import shopperapi.app
 
@@ -12,7 +15,10 @@ from configuration.senior_discount import SeniorDiscount
 from configuration.store_model import StoreModel
 from configuration.day_modifiers import DayModifiers
 from configuration.time_frame import TimeFrame
+from configuration.store_fleet import StoreFleet
 
+from shoppermodel.fleet_table import FleetTable
+from shoppermodel.pipeline import tee
 from shoppermodel.shopper_database import ShopperDatabase
 from shoppermodel.shopper_table import ShopperTable
 
@@ -106,6 +112,8 @@ def generator_commands(parser):
     parser.add_argument('-wbh', '--week-before-holiday-percent', default=0.15, type=float,
                         help='The percent increase of shoppers when day is within a week '
                              'before a holiday')
+    parser.add_argument('-hr', '--holiday-region', default='US', type=str,
+                        help='The country code of the holidays observed by the store: US')
 
     # Sunny Percentages
     parser.add_argument('-stp', '--sunny-traffic-percent', default=0.4, type=float,
@@ -120,6 +128,59 @@ def generator_commands(parser):
                         help='Average number of minutes that shoppers spend in the store on '
                              'weekends: 60')
 
+    # Random Seed
+    parser.add_argument('-seed', '--seed', default=None, type=int,
+                        help='Seed for the random number generators, the same seed generates '
+                             'the same shoppers: random')
+
+    return parser
+
+
+def output_commands(parser):
+    """
+    Adds the optional arguments of saving and inserting the generated shoppers to the
+    command line parser
+    :param parser: an argparse object to add commands to
+    :return: the parser the arguments were added to
+    """
+
+    # Saving to a file
+    parser.add_argument('-p', '--path',
+                        help='The path to save a file, will not save if no path provided')
+    parser.add_argument('-f', '--format', default='csv',
+                        choices=['csv', 'parquet', 'arrow', 'shards'],
+                        help='The format saved to the path, shards saves a directory: csv')
+    parser.add_argument('-cmp', '--compression', default=None, type=str,
+                        help='The compression of the file: gzip or zstd for csv, snappy, zstd '
+                             'or gzip for parquet, lz4 or zstd for arrow: snappy for parquet, '
+                             'none otherwise')
+    parser.add_argument('-ni', '--no-index', action='store_true',
+                        help='Leave the index column out of a csv')
+
+    # Generating
+    parser.add_argument('-w', '--workers', default=1, type=int,
+                        help='The number of processes generating the shoppers: 1')
+    parser.add_argument('-dpc', '--days-per-chunk', default=7, type=int,
+                        help='The number of days generated and saved at a time: 7')
+
+    # Inserting into the database
+    parser.add_argument('-bs', '--batch-size', default=10000, type=int,
+                        help='The number of shoppers inserted into the database at a time: '
+                             '10000')
+    parser.add_argument('-wr', '--writers', default=1, type=int,
+                        help='The number of threads inserting shoppers into the database: 1')
+    parser.add_argument('-wc', '--write-concern', default=None, type=str,
+                        help='The write concern of the inserts, for example 0, 1 or majority: '
+                             'the database default')
+    parser.add_argument('-qs', '--queue-size', default=4, type=int,
+                        help='The number of batches waiting to be inserted before generation '
+                             'pauses: 4')
+    parser.add_argument('-lay', '--layout', default='shopper',
+                        choices=['shopper', 'day', 'hour', 'timeseries'],
+                        help='The documents of the collection, one per shopper, one per day or '
+                             'hour holding its shoppers in arrays, or a time-series '
+                             'collection: shopper')
+
     return parser
 
 
@@ -140,7 +201,7 @@ def create_config(args):
                                      args.senior_max_time_spent, args.senior_percent)
 
     holiday_modifiers = HolidayModifiers(args.holiday_percent, args.day_before_holiday_percent,
-                                         args.week_before_holiday_percent)
+                                         args.week_before_holiday_percent, args.holiday_region)
 
     day_modifiers = DayModifiers(args.min_time_spent, args.avg_time_spent, args.max_time_spent,
                                  args.weekend_time_spent, args.sunny_traffic_percent,
@@ -153,7 +214,7 @@ def create_config(args):
 
     store_model = StoreModel(lunch_rush, dinner_rush, holiday_modifiers, day_modifiers,
                              senior_discount, avg_shopper_traffic, args.open_time,
-                             args.close_time, args.senior_percent)
+                             args.close_time, args.senior_percent, args.seed)
 
     return store_model, time_frame
 
@@ -213,18 +274,94 @@ def run_generator(args):
     path = args.path
     store_model, time_frame = create_config(args)
     shopper_table = ShopperTable(store_model, time_frame)
-    shopper_table.create_table()
 
-    # create database class and connect to the database and populate
+    # create database class and connect to the database and populate, the shoppers
+    # are generated chunk by chunk while the writers insert the previous chunk, and each
+    # chunk is saved to the file as it is inserted
     database = ShopperDatabase()
     database.connect_to_client()
-    database.populate_shopper_database(shopper_table, collection_name)
+    database.populate_shopper_database(shopper_table, collection_name, args.days_per_chunk,
+                                       args.workers, args.batch_size, args.writers,
+                                       write_concern(args), args.queue_size, args.layout,
+                                       iter_saved_chunks(shopper_table, path, args))
+
+
+def run_fleet(args):
+    """
+    Generates shopper data for every store in a fleet manifest in one run, saves it to
+    the database and gives option to save to csv
+    :param args: command line arguments from argparse
+    :return: None
+    """
+    store_fleet = StoreFleet.from_manifest(args.manifest)
+    fleet_table = FleetTable(store_fleet)
+
+    # one database connection and one pool of workers for every store, each chunk is
+    # saved to the file as it is inserted
+    database = ShopperDatabase()
+    database.connect_to_client()
+    database.populate_shopper_database(fleet_table, args.collection, args.days_per_chunk,
+                                       args.workers, args.batch_size, args.writers,
+                                       write_concern(args), args.queue_size, args.layout,
+                                       iter_saved_chunks(fleet_table, args.path, args))
+
+
+def write_concern(args):
+    """
+    Returns the write concern given on the command line
+    :param args: command line arguments from argparse
+    :return: a pymongo WriteConcern, None to use the write concern of the database
+    """
+    if args.write_concern is None:
+        return None
+    if args.write_concern.isdigit():
+        return WriteConcern(w=int(args.write_concern))
+    return WriteConcern(w=args.write_concern)
+
+
+def iter_saved_chunks(shopper_table, path, args):
+    """
+    Generates the shoppers of a table chunk by chunk, saving every chunk to a file in the
+    format given on the command line as it is passed on, so the shoppers are generated
+    once for both the database and the file
+    :param shopper_table: ShopperTable or FleetTable to generate
+    :param path: the path of the file, None to generate without saving
+    :param args: command line arguments from argparse
+    :return: an iterable of data frames of shoppers
+    """
+    if shopper_table.data_frame is not None:
+        data_frames = [shopper_table.data_frame]
+    else:
+        data_frames = shopper_table.iter_chunks(args.days_per_chunk, args.workers)
+    if path is None:
+        return data_frames
+    return tee(data_frames, partial(save_table, shopper_table, path, args),
+               args.queue_size)
 
-    if path is not None:
-        try:
-            shopper_table.to_csv(path)
-        except PermissionError:
-            print("Cannot save due to PermissionError")
+
+def save_table(shopper_table, path, args, data_frames=None):
+    """
+    Saves the shoppers of a table to a file in the format given on the command line
+    :param shopper_table: ShopperTable or FleetTable to save
+    :param path: the path of the file
+    :param args: command line arguments from argparse
+    :param data_frames: the chunks of shoppers to save, generated by the table if None
+    :return: None
+    """
+    try:
+        if args.format == 'parquet':
+            shopper_table.to_parquet(path, args.days_per_chunk, args.workers,
+                                     args.compression or 'snappy', data_frames)
+        elif args.format == 'arrow':
+            shopper_table.to_arrow(path, args.days_per_chunk, args.workers, args.compression,
+                                   data_frames)
+        elif args.format == 'shards':
+            shopper_table.to_shards(path, args.days_per_chunk, args.workers, data_frames)
+        else:
+            shopper_table.to_csv(path, args.days_per_chunk, args.workers, args.compression,
+                                 not args.no_index, data_frames)
+    except PermissionError:
+        print("Cannot save due to PermissionError")
 
 
 def query_database(args):
@@ -252,6 +389,24 @@ def query_database(args):
             print("Invalid query " + user_query)
 
 
+def report_indexes(args):
+    """
+    Prints the indexes of the collections and suggests missing ones for the queries
+    recorded by the database profiler, after creating the declared indexes if asked to
+    :param args: command line arguments from argparse
+    :return: None
+    """
+    database = ShopperDatabase()
+    database.connect_to_client()
+    if args.create:
+        collections = database.get_database().list_collection_names()
+        for collection_name in collections:
+            if not collection_name.startswith("system."):
+                database.ensure_indexes(collection_name)
+    print(dumps(database.index_report(args.collection), indent=2))
+    database.close_client()
+
+
 def start_api(args):
     """
     Starts the Flask app
@@ -278,10 +433,20 @@ def main():
     generator_parser = generator_commands(generator_parser)
     generator_parser.add_argument('-col', '--collection', default='shoppers', type=str,
                                   help='The collection to save the generated shoppers to')
-    generator_parser.add_argument('-p', '--path',
-                                  help='The path to save a csv, will not save if no path provided')
+    generator_parser = output_commands(generator_parser)
     generator_parser.set_defaults(func=run_generator)
 
+    # Generate shopper data for a fleet of stores
+    fleet_parser = subparsers.add_parser('fleet',
+                                         help='Generate shopper data for every store in a '
+                                              'manifest and upload to database')
+    fleet_parser.add_argument('manifest', type=str,
+                              help='The path to a JSON or YAML manifest of the stores')
+    fleet_parser.add_argument('-col', '--collection', default='fleet', type=str,
+                              help='The collection to save the generated shoppers to')
+    fleet_parser = output_commands(fleet_parser)
+    fleet_parser.set_defaults(func=run_fleet)
+
     # Connect to database
     db_parser = subparsers.add_parser('database', help='Connect and access the database to query')
     db_parser.add_argument('limit', default=50, type=int,
@@ -289,6 +454,16 @@ def main():
                                 ' default is 50 while 0 is unlimited')
     db_parser.set_defaults(func=query_database)
 
+    # Report and create indexes
+    index_parser = subparsers.add_parser('indexes',
+                                         help='Report the indexes of the collections and '
+                                              'suggest missing ones')
+    index_parser.add_argument('-col', '--collection', default=None, type=str,
+                              help='The collection to report on: every collection')
+    index_parser.add_argument('-c', '--create', action='store_true',
+                              help='Create the declared indexes of every collection first')
+    index_parser.set_defaults(func=report_indexes)
+
     # Start api
     api_parser = subparsers.add_parser('api', help='Start and use Api')
     api_parser.set_defaults(func=start_api)
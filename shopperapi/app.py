@@ -1,6 +1,8 @@
 """Shopper API for accessing shopper data in MongoDB."""
 
+import tempfile
 from datetime import datetime
+from os import environ, path
 from this import d
 from dateutil import parser
 from flask import Flask, request, render_template, Blueprint
@@ -8,9 +10,11 @@ from flask_restx import Api, Resource, fields, reqparse
 from bson import ObjectId
 from pymongo import ASCENDING
 
-from shoppermodel import ShopperDatabase, ShopperTable
-from configuration import HolidayModifiers, Rush, SeniorDiscount
-from configuration import StoreModel, DayModifiers, TimeFrame
+from shoppermodel import GenerationCache, ShopperDatabase, ShopperTable
+from shoppermodel.pipeline import tee
+from shoppermodel.shopper_database import RESERVED_COLLECTIONS
+from configuration.parameter_set import affected_dates, create_config, generation_snapshot, \
+    normalize_parameters
 
 APP = Flask(__name__, template_folder='templates')
 blueprint = Blueprint('api', __name__, url_prefix='/api')
@@ -25,6 +29,11 @@ def index():
 DB = ShopperDatabase()
 DB.connect_to_client()
 
+# generated shoppers are cached on disk by their parameters and seed
+CACHE = GenerationCache(environ.get('SHOPPER_CACHE_DIR',
+                                    path.join(tempfile.gettempdir(), 'shopper_cache')),
+                        int(environ.get('SHOPPER_CACHE_BYTES', 2 ** 30)))
+
 
 default_parameters = {
     "name": "default",
@@ -65,7 +74,8 @@ default_parameters = {
 	"holiday_modifiers" : {
 		"holiday_percent" : 0.2,
 		"day_before_percent" : 0.4,
-		"week_before_percent" : 0.15
+		"week_before_percent" : 0.15,
+		"region" : "US"
 	},
 	"senior_discount" : {
 		"start_time" : "10:00",
@@ -74,57 +84,15 @@ default_parameters = {
 		"max_time_spent" : 60,
 		"percent" : 0.2,
 		"day" : "Tuesday"
-	}
+	},
+	"seed" : None
 }
 
-def generate_config(parameter_set):
-    """
-    Takes parameter dictionary and creates configuration objects used to generate shopper data
-    :param parameter_set: dictionary of parameters and their corresponding values {parameter: value}
-    :return: configuration objects initialized with data from parameters dictionary
+def get_parameters_from_db(parameter_set_name):
     """
-
-    parameter_set = parameter_set["documents"][0]
-
-    time_frame = TimeFrame(parameter_set["start_date"], parameter_set["end_date"])
-
-    lunch_rush = Rush(parameter_set["lunch_rush"]["start_time"], parameter_set["lunch_rush"]["end_time"], 
-                      parameter_set["lunch_rush"]["time_spent"], parameter_set["lunch_rush"]["percent"])
-    dinner_rush = Rush(parameter_set["dinner_rush"]["start_time"], parameter_set["dinner_rush"]["end_time"],
-                       parameter_set["dinner_rush"]["time_spent"], parameter_set["dinner_rush"]["percent"])
-
-    senior_discount = SeniorDiscount(parameter_set["senior_discount"]["start_time"], 
-                                     parameter_set["senior_discount"]["end_time"], 
-                                     parameter_set["senior_discount"]["min_time_spent"],
-                                     parameter_set["senior_discount"]["max_time_spent"], 
-                                     parameter_set["senior_discount"]["percent"])
-
-    holiday_modifiers = HolidayModifiers(parameter_set["holiday_modifiers"]["holiday_percent"], 
-                                         parameter_set["holiday_modifiers"]["day_before_percent"],
-                                         parameter_set["holiday_modifiers"]["week_before_percent"])
-
-    day_modifiers = DayModifiers(parameter_set["day_modifiers"]["min_time_spent"], 
-                                 parameter_set["day_modifiers"]["avg_time_spent"], 
-                                 parameter_set["day_modifiers"]["max_time_spent"],
-                                 parameter_set["day_modifiers"]["weekend_time_spent"], 
-                                 parameter_set["day_modifiers"]["sunny_traffic_percent"],
-                                 parameter_set["day_modifiers"]["sunny_chance_percent"], 
-                                 parameter_set["day_modifiers"]["sunny_time_spent"])
-
-    avg_shopper_traffic = parameter_set["daily_average_traffic"]
-
-    store_model = StoreModel(lunch_rush, dinner_rush, holiday_modifiers, day_modifiers,
-                             senior_discount, avg_shopper_traffic, parameter_set["open_time"],
-                             parameter_set["close_time"], parameter_set["senior_discount"]["percent"])
-
-    return store_model, time_frame
-
-
-def get_config_from_db(parameter_set_name):
-    """
-    Takes parameter name in MongoDB and creates configuration objects used to generate shopper data
+    Returns the parameter document with the given name in MongoDB
     :param parameter_set_name: name of the parameter set stored in MongoDB
-    :return: configuration objects initialized with data from parameters dictionary
+    :return: dictionary of parameters and their corresponding values, None if it doesn't exist
     """
 
     query_dict = {"name": parameter_set_name}
@@ -132,35 +100,120 @@ def get_config_from_db(parameter_set_name):
     parameter_set = DB.query(query_dict=query_dict, collection_name="parameters")
 
     if parameter_set["count"] == 0:
-        return 0, 0
+        return None
 
-    return generate_config(parameter_set)
+    return parameter_set["documents"][0]
 
 
 def generate_shoppers(parameter_set_name):
     """
-    Generates shopper data based on parameter set with given name in db, saves to the database
+    Generates shopper data based on parameter set with given name in db, saves to the database.
+    If the shoppers were generated before and only parameters that some dates depend on
+    changed, only the shoppers of those dates are regenerated. Shoppers generated before
+    with the same parameters and seed are loaded from the generation cache.
     :param parameter_set_name: name of parameter set in the database
     :return: None
     """
-    store_model, time_frame = get_config_from_db(parameter_set_name)
+    parameters = get_parameters_from_db(parameter_set_name)
 
-    if type(store_model) == int:
+    if parameters is None:
         message = "Could not generate shoppers because parameters named "
         message += parameter_set_name + " doesn't exist."
         return {"result": 0, "message": message}
 
+    # without a seed of its own the parameter set keeps the seed it was generated with
+    generated_with = parameters.get("generated_with")
+    if generated_with is not None and parameters.get("seed") is None:
+        parameters = dict(parameters, seed=generated_with["seed"])
+
+    store_model, time_frame = create_config(parameters)
     shopper_table = ShopperTable(store_model, time_frame)
-    shopper_table.create_table()
+    key = GenerationCache.key(normalize_parameters(parameters, store_model.seed))
 
-    # create database class and connect to the database and populate
+    # create database class and connect to the database and populate chunk by chunk,
+    # two writers insert one chunk while the next one is generated
     database = ShopperDatabase()
     database.connect_to_client()
-    database.populate_shopper_database(shopper_table, parameter_set_name)
+    collections = database.get_database().list_collection_names()
+    generated = generated_with is not None and parameter_set_name in collections
+
+    if generated and key == GenerationCache.key(normalize_parameters(generated_with,
+                                                                     generated_with["seed"])):
+        message = "Shoppers generated using " + parameter_set_name
+        message += " parameters are up to date."
+        return {"result": 1, "message": message}
+
+    if generated and (generated_with["start_date"], generated_with["end_date"]) == \
+            (parameters["start_date"], parameters["end_date"]):
+        dates = affected_dates(generated_with, parameters)
+        database.replace_days(shopper_table, parameter_set_name, dates, writers=2)
+        message = "Successfully regenerated " + str(len(dates)) + " of "
+        message += str(len(time_frame.dates)) + " days of shoppers using "
+        message += parameter_set_name + " parameters."
+    else:
+        cached_table = CACHE.get(key)
+        if cached_table is not None:
+            database.populate_shopper_database(cached_table, parameter_set_name, writers=2)
+            message = "Successfully loaded cached shoppers of "
+        else:
+            # every chunk is cached while it is inserted, the cache entry is added once
+            # the last chunk is saved
+            data_frames = tee(shopper_table.iter_chunks(),
+                              lambda chunks: CACHE.put(key, shopper_table, data_frames=chunks))
+            database.populate_shopper_database(shopper_table, parameter_set_name, writers=2,
+                                               data_frames=data_frames)
+            message = "Successfully generated shoppers using "
+        message += parameter_set_name + " parameters."
+
+    snapshot = generation_snapshot(parameters, store_model.seed)
+    DB.update_document({"name": parameter_set_name}, {"generated_with": snapshot},
+                       collection_name="parameters")
 
-    message = "Successfully generated shoppers using "
-    message += parameter_set_name + " parameters."
+    return {"result": 1, "message": message}
 
+
+def append_shoppers(parameter_set_name, end_date):
+    """
+    Extends the shoppers generated using the parameter set with given name to a new end date,
+    generating only the dates after the last generated one and saving them to the database
+    :param parameter_set_name: name of parameter set in the database
+    :param end_date: the new end date as a string (ex. 2020-02-15)
+    :return: dictionary of the result and a message
+    """
+    parameters = get_parameters_from_db(parameter_set_name)
+    generated_with = None if parameters is None else parameters.get("generated_with")
+
+    if generated_with is None or parameter_set_name not in \
+            DB.get_database().list_collection_names():
+        message = "Could not append shoppers because they haven't "
+        message += "been generated using " + parameter_set_name + " parameters."
+        return {"result": 0, "message": message}
+
+    if datetime.strptime(end_date, "%Y-%m-%d") <= \
+            datetime.strptime(parameters["end_date"], "%Y-%m-%d"):
+        message = "Could not append shoppers because the end date " + end_date
+        message += " is not after the current end date " + parameters["end_date"] + "."
+        return {"result": 0, "message": message}
+
+    # continue the seeded streams the shoppers were generated with
+    parameters = dict(parameters, end_date=end_date)
+    if parameters.get("seed") is None:
+        parameters["seed"] = generated_with["seed"]
+
+    store_model, time_frame = create_config(parameters)
+    shopper_table = ShopperTable(store_model, time_frame)
+
+    database = ShopperDatabase()
+    database.connect_to_client()
+    num_of_days = database.append_days(shopper_table, parameter_set_name, writers=2)
+
+    generated_with = dict(generated_with, end_date=end_date)
+    DB.update_document({"name": parameter_set_name},
+                       {"end_date": end_date, "generated_with": generated_with},
+                       collection_name="parameters")
+
+    message = "Successfully appended " + str(num_of_days) + " days of shoppers using "
+    message += parameter_set_name + " parameters."
     return {"result": 1, "message": message}
 
 
@@ -171,6 +224,8 @@ database = DB.get_database()
 if "parameters" not in database.list_collection_names():
     # add default parameter
     DB.update_document({"name": "default"}, default_parameters, collection_name="parameters")
+# parameter sets are looked up by name
+DB.ensure_indexes("parameters")
 
 # If shoppers collection doesn't exist, generate shoppers
 if "default" not in database.list_collection_names():
@@ -351,6 +406,8 @@ parser.add_argument('week-before-holiday-percent', default=0.15, type=float,
                     help='The percent increase of shoppers when day is within a week '
                             'before a holiday', 
                     required=True)
+parser.add_argument('holiday-region', default='US', type=str,
+                    help='The country code of the holidays observed by the store: US')
 
 # Senior Discount
 parser.add_argument('senior-start', default='10:00', type=str,
@@ -373,6 +430,11 @@ parser.add_argument('senior-percent', default=0.2, type=float,
 parser.add_argument('senior-day', default="Tuesday", type=str,
                     help='Day of week senior discount occurs: Tuesday', required=True)
 
+# Random Seed
+parser.add_argument('seed', type=int,
+                    help='Seed for the random number generators, the same seed generates '
+                            'the same shoppers (random if empty)')
+
 
 @NAME_SPACE.route("/")
 class Parameter(Resource):
@@ -403,9 +465,10 @@ class Parameter(Resource):
             result = {}
             d = request.args
 
-            if d["name"].lower() == "parameters":
+            if d["name"].lower() in RESERVED_COLLECTIONS:
                 message =  "Could not add/update the parameters. "
-                message += "Please use a name other than 'parameters'."
+                message += "Please use a name other than "
+                message += " or ".join("'" + name + "'" for name in RESERVED_COLLECTIONS) + "."
                 return {"result": 0, "message": message}
             
             result["name"] = d["name"]
@@ -446,7 +509,8 @@ class Parameter(Resource):
             result["holiday_modifiers"] = {
                 "holiday_percent" : float(d["holiday-percent"]),
                 "day_before_percent" : float(d["day-before-holiday-percent"]),
-                "week_before_percent" : float(d["week-before-holiday-percent"])
+                "week_before_percent" : float(d["week-before-holiday-percent"]),
+                "region" : d.get("holiday-region", "US")
             }
             result["senior_discount"] = {
                 "start_time": d["senior-start"],
@@ -456,7 +520,7 @@ class Parameter(Resource):
                 "percent" : float(d["senior-percent"]),
                 "day" : d["senior-day"]
             }
-            
+            result["seed"] = int(d["seed"]) if d.get("seed") not in (None, "") else None
             
 
             return DB.update_document({"name": d["name"]}, result, collection_name="parameters")
@@ -517,6 +581,49 @@ class ParameterItem(Resource):
             NAME_SPACE.abort(400, err.__doc__, status=GET_STATUS, statusCode="400")
 
 
+date_range_parser = reqparse.RequestParser()
+date_range_parser.add_argument('start-date', type=str,
+                               help='The first date of the shoppers in format: 2020-01-01')
+date_range_parser.add_argument('end-date', type=str,
+                               help='The last date of the shoppers in format: 2020-01-31')
+date_range_parser.add_argument('fields', type=str,
+                               help='The fields to return separated by commas, for example: '
+                                    'TimeIn,TimeSpent (every field if empty)')
+
+
+page_parser = date_range_parser.copy()
+page_parser.add_argument('page-size', default=10, type=int,
+                         help='The most shoppers in a page: 10')
+page_parser.add_argument('page-token', type=str,
+                         help='The token of the next page returned with the previous page')
+page_parser.add_argument('count', type=str, choices=['exact', 'estimated'],
+                         help='Add the number of shoppers, exact or estimated if an estimate '
+                              'will do (no count if empty)')
+
+
+def requested_fields():
+    """
+    Returns the fields asked for by the fields argument of the request
+    :return: a list of the field names, None if the request asks for every field
+    """
+    fields = [field.strip() for field in request.args.get("fields", "").split(",")]
+    return [field for field in fields if field] or None
+
+
+def date_range_query():
+    """
+    Returns a query on the dates between the optional start-date and end-date of the
+    request
+    :return: dictionary of the query, empty if the request has neither date
+    """
+    date_query = {}
+    if request.args.get("start-date"):
+        date_query["$gte"] = datetime.strptime(request.args["start-date"], "%Y-%m-%d")
+    if request.args.get("end-date"):
+        date_query["$lte"] = datetime.strptime(request.args["end-date"], "%Y-%m-%d")
+    return {"Date": date_query} if date_query else {}
+
+
 @NAME_SPACE.route("/<string:parameter_name>/shoppers")
 class Shopper(Resource):
     """Generates shopper data using the given parameters"""
@@ -527,15 +634,23 @@ class Shopper(Resource):
                                      'parameters used to generate the mock shopper data'
                      }
              )
+    @API.expect(page_parser)
     def get(self, parameter_name):
         """
-        Returns 1st 10 shoppers generated using the given parameters.
+        Returns a page of the shoppers generated using the given parameters, between the
+        optional start-date and end-date, in the order they arrived. Pass the next token of
+        a page as the page-token to get the page after it.
         """
         try:
             # if parameter_name isn't parameters (would overwrite parameters collection)
             if parameter_name.lower() != "parameters":
-                result = DB.query({}, None, parameter_name, 10)
-                if result["count"] == 0:
+                token = request.args.get("page-token")
+                result = DB.page(date_range_query(), parameter_name,
+                                 int(request.args.get("page-size", 10)), token,
+                                 requested_fields(), request.args.get("count") or None)
+                # an empty page of an existing collection only has no shoppers in the dates
+                if not result["documents"] and token is None and parameter_name not in \
+                        DB.get_database().list_collection_names():
                     message = "Cannot get shoppers because they haven't "
                     message += "been generated using " + parameter_name + " parameters."
                     return {"result": 0, "message": message}
@@ -575,4 +690,158 @@ class Shopper(Resource):
             NAME_SPACE.abort(500, err.__doc__, status=GET_STATUS, statusCode="500")
 
         except Exception as err:
-            NAME_SPACE.abort(400, err.__doc__, status=GET_STATUS, statusCode="400")
\ No newline at end of file
+            NAME_SPACE.abort(400, err.__doc__, status=GET_STATUS, statusCode="400")
+
+
+append_parser = reqparse.RequestParser()
+append_parser.add_argument('end-date', type=str, required=True,
+                           help='The new ending date to generate data up to in format: '
+                                '2020-12-31')
+
+
+@NAME_SPACE.route("/<string:parameter_name>/shoppers/append")
+class ShopperAppend(Resource):
+    """Extends the shopper data generated using the given parameters to a new end date"""
+
+    @API.doc(responses={200: 'OK', 400: 'Invalid Argument', 500: 'Mapping Key Error'},
+             params={'parameter_name': 'Parameter name of the set of '
+                                     'parameters used to generate the mock shopper data'
+                     }
+             )
+    @API.expect(append_parser)
+    def post(self, parameter_name):
+        """
+        Generates the shoppers of the dates up to a new end date, keeping the existing ones.
+        """
+        try:
+            if parameter_name.lower() != "parameters":
+                return append_shoppers(parameter_name, request.args["end-date"])
+
+            else:
+                message = "Can not append shoppers using parameters named 'parameters'."
+                return {"result": 0, "message": message}
+
+        except KeyError as err:
+            NAME_SPACE.abort(500, err.__doc__, status=GET_STATUS, statusCode="500")
+
+        except Exception as err:
+            NAME_SPACE.abort(400, err.__doc__, status=GET_STATUS, statusCode="400")
+
+
+def get_summary(parameter_name, level):
+    """
+    Returns the rollups of the shoppers generated using the given parameters between
+    the optional start-date and end-date of the request
+    :param parameter_name: name of the parameter set
+    :param level: day or hour
+    :return: the query result of the rollups
+    """
+    result = DB.summary(parameter_name, level, date_range_query(), requested_fields())
+    if result["count"] == 0:
+        message = "Cannot get the summary because shoppers haven't "
+        message += "been generated using " + parameter_name + " parameters."
+        return {"result": 0, "message": message}
+    return result
+
+
+@NAME_SPACE.route("/<string:parameter_name>/summary")
+class Summary(Resource):
+    """Summaries of the shoppers of every day generated using the given parameters"""
+
+    @API.doc(responses={200: 'OK', 400: 'Invalid Argument', 500: 'Mapping Key Error'},
+             params={'parameter_name': 'Parameter name of the set of '
+                                     'parameters used to generate the mock shopper data'
+                     }
+             )
+    @API.expect(date_range_parser)
+    def get(self, parameter_name):
+        """
+        Returns the number of shoppers, the mean and percentiles of the time spent, the share
+        of seniors and whether it was sunny for every day.
+        """
+        try:
+            return get_summary(parameter_name, "day")
+
+        except KeyError as err:
+            NAME_SPACE.abort(500, err.__doc__, status=GET_STATUS, statusCode="500")
+
+        except Exception as err:
+            NAME_SPACE.abort(400, err.__doc__, status=GET_STATUS, statusCode="400")
+
+
+@NAME_SPACE.route("/<string:parameter_name>/summary/hourly")
+class HourlySummary(Resource):
+    """Summaries of the shoppers of every hour generated using the given parameters"""
+
+    @API.doc(responses={200: 'OK', 400: 'Invalid Argument', 500: 'Mapping Key Error'},
+             params={'parameter_name': 'Parameter name of the set of '
+                                     'parameters used to generate the mock shopper data'
+                     }
+             )
+    @API.expect(date_range_parser)
+    def get(self, parameter_name):
+        """
+        Returns the number of shoppers, the mean and percentiles of the time spent, the share
+        of seniors and whether it was sunny for every hour of every day.
+        """
+        try:
+            return get_summary(parameter_name, "hour")
+
+        except KeyError as err:
+            NAME_SPACE.abort(500, err.__doc__, status=GET_STATUS, statusCode="500")
+
+        except Exception as err:
+            NAME_SPACE.abort(400, err.__doc__, status=GET_STATUS, statusCode="400")
+
+
+@NAME_SPACE.route("/<string:parameter_name>/indexes")
+class Index(Resource):
+    """Indexes of the shoppers generated using the given parameters"""
+
+    @API.doc(responses={200: 'OK', 400: 'Invalid Argument', 500: 'Mapping Key Error'},
+             params={'parameter_name': 'Parameter name of the set of '
+                                     'parameters used to generate the mock shopper data'
+                     }
+             )
+    def get(self, parameter_name):
+        """
+        Returns the indexes of the shoppers and suggests missing ones for the queries run
+        on them.
+        """
+        try:
+            report = DB.index_report(parameter_name)
+            if parameter_name not in report["collections"]:
+                message = "Cannot get the indexes because shoppers haven't "
+                message += "been generated using " + parameter_name + " parameters."
+                return {"result": 0, "message": message}
+            return report["collections"][parameter_name]
+
+        except KeyError as err:
+            NAME_SPACE.abort(500, err.__doc__, status=GET_STATUS, statusCode="500")
+
+        except Exception as err:
+            NAME_SPACE.abort(400, err.__doc__, status=GET_STATUS, statusCode="400")
+
+    @API.doc(responses={200: 'OK', 400: 'Invalid Argument', 500: 'Mapping Key Error'},
+             params={'parameter_name': 'Parameter name of the set of '
+                                     'parameters used to generate the mock shopper data'
+                     }
+             )
+    def post(self, parameter_name):
+        """
+        Creates the declared indexes of the shoppers generated using the given parameters.
+        """
+        try:
+            if parameter_name.lower() in RESERVED_COLLECTIONS or \
+                    parameter_name not in DB.get_database().list_collection_names():
+                message = "Cannot create the indexes because shoppers haven't "
+                message += "been generated using " + parameter_name + " parameters."
+                return {"result": 0, "message": message}
+            names = DB.ensure_indexes(parameter_name)
+            return {"result": 1, "message": "Created the indexes " + ", ".join(names) + "."}
+
+        except KeyError as err:
+            NAME_SPACE.abort(500, err.__doc__, status=GET_STATUS, statusCode="500")
+
+        except Exception as err:
+            NAME_SPACE.abort(400, err.__doc__, status=GET_STATUS, statusCode="400")
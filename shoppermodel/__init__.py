@@ -1,7 +1,11 @@
 """Initializes shoppermodel package."""
 
 from shoppermodel.day import Day
+from shoppermodel.fleet_table import FleetTable
+from shoppermodel.generation_cache import GenerationCache
+from shoppermodel.shard_store import ShardStore
 from shoppermodel.shopper import Shopper
 from shoppermodel.shopper_database import ShopperDatabase
 from shoppermodel.shopper_table import ShopperTable
+from shoppermodel.schema import to_external
 from shoppermodel.util import random_datetimes
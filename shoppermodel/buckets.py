@@ -0,0 +1,115 @@
+"""
+The bucketed layout of a collection of shoppers: one document per day or per hour of a
+store, holding the shoppers in parallel arrays, and the pipeline that unwinds the buckets
+back into one document per shopper when they are queried.
+"""
+import pandas as pd
+
+from shoppermodel import schema
+from shoppermodel.rollups import SECONDS_PER_HOUR
+
+# day: one document per day of a store, hour: one document per hour of a store
+BUCKET_LAYOUTS = ["day", "hour"]
+
+# fields shared by every shopper of a bucket, stored once per bucket
+BUCKET_FIELDS = ["parameter_name", "Date", "DayOfWeek", "IsSunny", "StoreId"]
+
+# fields of every shopper, stored as parallel arrays in the order of the ShopperIds
+SHOPPER_FIELDS = ["TimeIn", "TimeSpent", "IsSenior"]
+
+
+def iter_buckets(data_frame, parameter_set_name, level, batch_size):
+    """
+    Encodes the shoppers of a data frame as bucket documents, a batch at a time. A bucket
+    holds the shoppers of a day, or an hour of a day, of a store. Its _id is the first
+    ShopperId in it and count the number of shoppers, whose ShopperIds follow one another
+    since shoppers are numbered in arrival order.
+    :param data_frame: a data frame of shoppers in the compact representation.
+    :param parameter_set_name: the name of the parameter set stored with every bucket.
+    :param level: day for a bucket per day, hour for a bucket per hour.
+    :param batch_size: number of shoppers in the buckets of each batch, a batch holds
+    at least one bucket.
+    :return: a generator of lists of documents.
+    """
+    if level not in BUCKET_LAYOUTS:
+        raise ValueError("Invalid. The level of the buckets ({}) should be day "
+                         "or hour.".format(level))
+    external = schema.to_external(data_frame)
+    keys = {"Date": data_frame["Date"].to_numpy()}
+    if "StoreId" in data_frame:
+        keys["StoreId"] = data_frame["StoreId"].cat.codes.to_numpy()
+    if level == "hour":
+        keys["Hour"] = data_frame["TimeIn"].to_numpy() // SECONDS_PER_HOUR
+
+    columns = {column: external[column].to_numpy() for column in external}
+    for column in ["Date", "TimeIn"]:
+        # microseconds convert to datetime objects, nanoseconds to integers
+        columns[column] = columns[column].astype("datetime64[us]")
+
+    batch = []
+    shoppers = 0
+    groups = pd.DataFrame(keys).groupby(list(keys), sort=False).indices
+    for positions in groups.values():
+        first = positions[0]
+        bucket = {"_id": int(columns["ShopperId"][first]), "count": len(positions),
+                  "Bucket": level, "parameter_name": parameter_set_name}
+        for field in BUCKET_FIELDS[1:]:
+            if field in columns:
+                bucket[field] = columns[field][first:first + 1].tolist()[0]
+        if level == "hour":
+            bucket["Hour"] = int(keys["Hour"][first])
+        bucket["ShopperId"] = columns["ShopperId"][positions].tolist()
+        for field in SHOPPER_FIELDS:
+            bucket[field] = columns[field][positions].tolist()
+
+        batch.append(bucket)
+        shoppers += len(positions)
+        if shoppers >= batch_size:
+            yield batch
+            batch = []
+            shoppers = 0
+    if batch:
+        yield batch
+
+
+def buckets_query(query_dict):
+    """
+    Returns the conditions of a query on shoppers that are on the fields of their bucket,
+    including the ones under $and, as a query on the buckets holding them.
+    :param query_dict: a dictionary of a query on the shoppers.
+    :return: a dictionary of the query on the buckets, empty if no condition is.
+    """
+    bucket_query = {field: condition for field, condition in query_dict.items()
+                    if field in BUCKET_FIELDS}
+    conditions = [condition for condition in query_dict.get("$and", [])
+                  if condition and all(field in BUCKET_FIELDS for field in condition)]
+    if conditions:
+        bucket_query["$and"] = conditions
+    return bucket_query
+
+
+def unwind_pipeline(query_dict=None):
+    """
+    Returns the aggregation stages that unwind buckets into one document per shopper,
+    the same documents as the shopper layout, and match them against a query. The
+    conditions of the query on the fields of a bucket are matched before unwinding, so
+    they can use the indexes of the buckets and only the matching buckets are unwound.
+    :param query_dict: a dictionary of a query on the shoppers (optional).
+    :return: a list of aggregation stages.
+    """
+    query_dict = query_dict or {}
+    bucket_query = buckets_query(query_dict)
+    shopper = {"_id": "$ShopperId", "ShopperId": "$ShopperId"}
+    for field in BUCKET_FIELDS:
+        shopper[field] = "$" + field
+    for field in SHOPPER_FIELDS:
+        shopper[field] = {"$arrayElemAt": ["$" + field, "$position"]}
+
+    stages = []
+    if bucket_query:
+        stages.append({"$match": bucket_query})
+    stages.append({"$unwind": {"path": "$ShopperId", "includeArrayIndex": "position"}})
+    stages.append({"$project": shopper})
+    if query_dict and query_dict != bucket_query:
+        stages.append({"$match": query_dict})
+    return stages
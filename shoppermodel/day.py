@@ -3,12 +3,10 @@ The Day represent a specific day for the grocery store. It contains necessary in
 to generate a list of shoppers that visited the store at the specific date.
 """
 
-import datetime
 import calendar
 
-from numpy import random, array
-from shoppermodel.shopper import Shopper
-from shoppermodel import util
+import numpy as np
+from shoppermodel import schema, util
 
 
 class Day:
@@ -16,88 +14,89 @@ class Day:
     The Day represent a specific day for the grocery store. It contains necessary information
     to generate a list of shoppers that visited the store at the specific date.
     """
-    def __init__(self, store_model, num_of_shoppers, date):
+    def __init__(self, store_model, num_of_shoppers, date, rng=None):
         """
         Initializes Day.
-        :param store_model: StoreModel object.
+        :param store_model: StoreModel or CompiledStoreModel object.
         :param num_of_shoppers: number of shoppers to generate(int).
         :param date: date as datetime object.
+        :param rng: numpy Generator used for every random draw of this day (optional).
         """
-        self.store_model = store_model
-        self.open_time = store_model.open_time
-        self.close_time = store_model.close_time
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.store_model = store_model.compile()
         self.date = date
         self.num_of_shoppers = num_of_shoppers
-        self.day_of_week = calendar.day_name[date.dayofweek]
-        self.percent_senior = store_model.percent_senior
+        self.weekday = date.dayofweek
+        self.day_of_week = calendar.day_name[self.weekday]
         self.shoppers = {"Date": [], "DayOfWeek": [], "TimeIn": [], "TimeSpent": [],
                          "IsSenior": [], "IsSunny": []}
-        self.day_modifiers = self.store_model.day_modifiers
-        probability = [self.day_modifiers.sunny_chance_percent,
-                       1 - self.day_modifiers.sunny_chance_percent]
-        self.is_sunny = random.choice(a=array([True, False]), p=probability)
-        if date.dayofweek in [5, 6]:
-            self.is_weekend = True
-        else:
-            self.is_weekend = False
+        probability = [self.store_model.sunny_chance_percent,
+                       1 - self.store_model.sunny_chance_percent]
+        self.is_sunny = self.rng.choice(a=np.array([True, False]), p=probability)
+        self.is_weekend = self.store_model.is_weekend[self.weekday]
 
     def create_shoppers(self):
         """
-        Creates a list of shoppers that visited the store at the specific date.
+        Creates the shoppers that visited the store at the specific date, sorted by arrival.
+        Every column is drawn as a whole array for the day, so the cost per shopper is a
+        handful of numpy operations.
         """
-        lunch_percent = self.store_model.lunch_rush.percent
-        lunch_start = datetime.datetime.combine(self.date, self.store_model.lunch_rush.start_time)
-        lunch_end = datetime.datetime.combine(self.date, self.store_model.lunch_rush.end_time)
-        lunch_avg_time_spent = self.store_model.lunch_rush.time_spent
+        size = self.num_of_shoppers
+        model = self.store_model
+        rng = self.rng
 
-        dinner_percent = self.store_model.dinner_rush.percent
-        dinner_start = datetime.datetime.combine(self.date, self.store_model.dinner_rush.start_time)
-        dinner_end = datetime.datetime.combine(self.date, self.store_model.dinner_rush.end_time)
-        dinner_avg_time_spent = self.store_model.dinner_rush.time_spent
+        # times are seconds since midnight until the columns are built
+        time_in = util.random_datetimes(model.open_time, model.close_time, size, rng)
+        time_spent = rng.triangular(model.min_time_spent, model.avg_time_spent,
+                                    model.max_time_spent, size)
+        is_senior = rng.random(size) < model.percent_senior
 
-        senior_start = datetime.datetime.combine(self.date,
-                                                 self.store_model.senior_discount.start_time)
-        senior_end = datetime.datetime.combine(self.date, self.store_model.senior_discount.end_time)
-        senior_max_time_spent = self.store_model.senior_discount.max_time_spent
-        senior_min_time_spent = self.store_model.senior_discount.min_time_spent
+        # lunch_percent more lunch shoppers than any other time
+        self.__apply_rush(model.lunch_rush, time_in, time_spent)
+        # dinner_percent more dinner shoppers than any other time
+        self.__apply_rush(model.dinner_rush, time_in, time_spent)
 
-        weekend_increase = self.day_modifiers.sunny_time_spent
-        weekend_avg_time_spent = self.day_modifiers.weekend_time_spent
-        sunny_weekend_avg_time_spent = self.day_modifiers.sunny_time_spent
+        # check weekend
+        if self.is_weekend:
+            if self.is_sunny:
+                is_sunny_shopper = rng.random(size) < model.sunny_time_spent
+                time_spent = np.where(is_sunny_shopper, model.sunny_time_spent,
+                                      model.weekend_time_spent).astype(float)
+            else:
+                time_spent[:] = model.weekend_time_spent
 
-        times = util.random_datetimes(datetime.datetime.combine(self.date, self.open_time),
-                                      datetime.datetime.combine(self.date, self.close_time),
-                                      self.num_of_shoppers)
+        # senior hours
+        senior_discount = model.senior_discount
+        if self.weekday == senior_discount.weekday:
+            moved = ~((senior_discount.start < time_in) & (time_in < senior_discount.end))
+            num_moved = np.count_nonzero(moved)
+            time_in[moved] = util.random_datetimes(senior_discount.start, senior_discount.end,
+                                                   num_moved, rng)
+            time_spent[moved] = rng.integers(senior_discount.min_time_spent,
+                                             senior_discount.max_time_spent, num_moved)
 
-        for time_in in times:
-            new_shopper = Shopper(self, time_in, self.is_sunny,
-                                  self.store_model.percent_senior,
-                                  self.store_model.day_modifiers)
-            # lunch_percent more lunch shoppers than any other time
-            if random.rand() < lunch_percent:
-                if not lunch_start < new_shopper.time_in < lunch_end:
-                    temp = util.random_datetimes(lunch_start, lunch_end, 1)
-                    new_shopper.time_in = temp[0]
-                    new_shopper.time_spent = lunch_avg_time_spent
-            # dinner_percent more dinner shoppers than any other time
-            if random.rand() < dinner_percent:
-                if not dinner_start < new_shopper.time_in < dinner_end:
-                    temp = util.random_datetimes(dinner_start, dinner_end, 1)
-                    new_shopper.time_in = temp[0]
-                    new_shopper.time_spent = dinner_avg_time_spent
-            # check weekend
-            if self.is_weekend:
-                if self.is_sunny and random.rand() < weekend_increase:
-                    new_shopper.time_spent = sunny_weekend_avg_time_spent
-                else:
-                    new_shopper.time_spent = weekend_avg_time_spent
-            # senior hours
-            if calendar.day_name[self.date.dayofweek] == self.store_model.senior_discount.day_name:
-                if not senior_start < new_shopper.time_in < senior_end:
-                    temp = util.random_datetimes(senior_start, senior_end, 1)
-                    new_shopper.time_in = temp[0]
-                    new_shopper.time_spent = random.randint(senior_min_time_spent,
-                                                            senior_max_time_spent)
+        # emit the shoppers in arrival order, so days only need to be concatenated in order
+        order = np.argsort(time_in, kind='stable')
 
-            for key, value in new_shopper.shopper_parameters_to_dictionary().items():
-                self.shoppers[key].append(value)
+        dtypes = schema.DTYPES
+        self.shoppers = {"Date": np.full(size, schema.date_index(self.date),
+                                         dtype=dtypes["Date"]),
+                         "DayOfWeek": schema.day_names(np.full(size, self.weekday,
+                                                               dtype=np.int8)),
+                         "TimeIn": time_in[order].astype(dtypes["TimeIn"]),
+                         "TimeSpent": time_spent[order].astype(dtypes["TimeSpent"]),
+                         "IsSenior": is_senior[order].astype(dtypes["IsSenior"], copy=False),
+                         "IsSunny": np.full(size, self.is_sunny, dtype=dtypes["IsSunny"])}
+
+    def __apply_rush(self, rush, time_in, time_spent):
+        """
+        Moves a rush's share of the shoppers into the rush window, in place.
+        :param rush: CompiledRush with the window in seconds since midnight.
+        :param time_in: array of arrival times as seconds since midnight.
+        :param time_spent: array of times spent in the store.
+        """
+        outside = ~((rush.start < time_in) & (time_in < rush.end))
+        moved = (self.rng.random(len(time_in)) < rush.percent) & outside
+        time_in[moved] = util.random_datetimes(rush.start, rush.end, np.count_nonzero(moved),
+                                               self.rng)
+        time_spent[moved] = rush.time_spent
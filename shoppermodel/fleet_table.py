@@ -0,0 +1,71 @@
+"""
+This module generates the shoppers of a fleet of stores in one run
+"""
+import numpy as np
+import pandas as pd
+
+from shoppermodel.shopper_table import ShopperTable
+
+
+class FleetTable(ShopperTable):
+    """
+    A shopper table for every store of a StoreFleet. The stores share the dates and holiday
+    calendar of the fleet, and their days are spread over the same pool of workers. Every
+    shopper is tagged with the ID of its store in the StoreId column.
+    """
+
+    def __init__(self, store_fleet):
+        """
+        Initializes FleetTable.
+        :param store_fleet: StoreFleet object.
+        """
+        super().__init__(None, store_fleet.time_frame)
+        self.store_fleet = store_fleet
+
+    def create_table(self, workers=1):
+        """
+        Populates this class with a data frame of the shoppers of every store.
+        :param workers: number of processes generating the stores (default 1).
+        :return: the data frame of the shoppers.
+        """
+        chunks = self.iter_chunks(len(self.time_frame.dates), workers)
+        self.data_frame = pd.concat(list(chunks))
+        return self.data_frame
+
+    def _chunk_tasks(self, dates, days_per_chunk):
+        """
+        Returns the chunks of consecutive days of one store. The chunks come in date
+        order, and within a range of dates in the order of the stores.
+        :param dates: the dates to generate, in order.
+        :param days_per_chunk: number of days in each chunk.
+        :return: a list of tuples of the ID of the store of the chunk and a tuple of the
+        CompiledStoreModel, the dates and their number of shoppers.
+        """
+        store_models = {}
+        traffic = {}
+        for store_id, store_model in self.store_fleet.store_models.items():
+            store_models[store_id] = store_model.compile()
+            # the time frame computes the holiday calendar of a region once for every store
+            holiday_calendar = self.time_frame.holiday_calendar(
+                store_model.holiday_modifiers.region)
+            traffic[store_id] = store_models[store_id].daily_traffic(dates, holiday_calendar)
+
+        tasks = []
+        for i in range(0, len(dates), days_per_chunk):
+            for store_id in store_models:
+                tasks.append((store_id, (store_models[store_id], dates[i:i + days_per_chunk],
+                                         traffic[store_id][i:i + days_per_chunk])))
+        return tasks
+
+    def _tag_chunk(self, data_frame, store_id):
+        """
+        Returns a generated chunk of shoppers with the ID of its store in the StoreId
+        column, a categorical of every store of the fleet.
+        :param data_frame: a data frame of the shoppers of a chunk.
+        :param store_id: the ID of the store of the chunk.
+        :return: the data frame of shoppers.
+        """
+        store_ids = list(self.store_fleet.store_models)
+        codes = np.full(len(data_frame), store_ids.index(store_id), dtype=np.int32)
+        data_frame['StoreId'] = pd.Categorical.from_codes(codes, categories=store_ids)
+        return data_frame
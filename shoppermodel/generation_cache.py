@@ -0,0 +1,136 @@
+"""
+Caches generated shoppers on disk by a hash of the parameters and seed they were
+generated with, so generating the same shoppers again only reads them back.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+from shoppermodel.shard_store import MANIFEST
+from shoppermodel.shopper_table import ShopperTable
+
+# bump whenever a change to the generator changes the shoppers generated from the same
+# parameters and seed, so the shoppers cached by older versions are not reused
+ENGINE_VERSION = 1
+
+
+class GenerationCache:
+    """
+    A directory of shard stores of generated shoppers, each named by the key of the
+    parameters and seed it was generated with. When the shard stores take up more than
+    max_bytes, the least recently used ones are deleted.
+    """
+
+    def __init__(self, path, max_bytes=2 ** 30):
+        """
+        Initializes GenerationCache.
+        :param path: the directory of the cache, created if it doesn't exist.
+        :param max_bytes: the most bytes the cached shoppers take up (1 GiB).
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def key(normalized_parameters):
+        """
+        Returns the key of the shoppers generated with the given parameters, a hash of
+        the parameters, which include the seed, and the engine version.
+        :param normalized_parameters: dictionary of parameters in a canonical form, like
+        the one returned by configuration.parameter_set.normalize_parameters.
+        :return: the key as a hexadecimal string.
+        """
+        content = json.dumps({"engine_version": ENGINE_VERSION,
+                              "parameters": normalized_parameters},
+                             sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the cached shoppers of a key and marks them as recently used.
+        :param key: the key of the shoppers.
+        :return: a ShopperTable memory mapping the cached shoppers, None if not cached.
+        """
+        manifest_path = os.path.join(self.path, key, MANIFEST)
+        if not os.path.exists(manifest_path):
+            return None
+        os.utime(manifest_path)
+        return ShopperTable.from_shards(os.path.join(self.path, key))
+
+    def put(self, key, shopper_table, days_per_chunk=7, workers=1, data_frames=None):
+        """
+        Saves the shoppers of a shopper table under a key, then deletes the least
+        recently used shoppers until the cache fits in max_bytes. The shoppers just
+        saved are kept even if they alone take up more than max_bytes. Given the chunks
+        of the table as they are inserted into the database, through pipeline.tee, the
+        shoppers are cached while they are inserted and the entry is added once the
+        last chunk is saved.
+        :param key: the key of the shoppers.
+        :param shopper_table: the ShopperTable to save.
+        :param days_per_chunk: number of days generated and saved at a time (default 7).
+        :param workers: number of processes generating the chunks (default 1).
+        :param data_frames: the chunks of the shopper table, generated by the table
+        if None (optional).
+        :return: a ShopperTable memory mapping the cached shoppers.
+        """
+        # written to a temporary directory first, so a partial write is never used
+        temporary_path = os.path.join(self.path, ".{}-{}".format(key, os.getpid()))
+        try:
+            shopper_table.to_shards(temporary_path, days_per_chunk, workers, data_frames)
+        except BaseException:
+            shutil.rmtree(temporary_path, ignore_errors=True)
+            raise
+        try:
+            os.rename(temporary_path, os.path.join(self.path, key))
+        except OSError:
+            # cached by someone else in the meantime
+            shutil.rmtree(temporary_path, ignore_errors=True)
+        self.evict(keep=key)
+        return self.get(key)
+
+    def evict(self, keep=None):
+        """
+        Deletes the least recently used shoppers until the cache fits in max_bytes.
+        :param keep: the key of shoppers never to delete (optional).
+        :return: the keys of the deleted shoppers.
+        """
+        entries = []
+        for key in os.listdir(self.path):
+            manifest_path = os.path.join(self.path, key, MANIFEST)
+            if key.startswith(".") or not os.path.exists(manifest_path):
+                continue
+            entries.append((os.path.getmtime(manifest_path), key,
+                            _directory_size(os.path.join(self.path, key))))
+
+        total = sum(size for _, _, size in entries)
+        evicted = []
+        for _, key, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.path, key), ignore_errors=True)
+            total -= size
+            evicted.append(key)
+        return evicted
+
+    def size(self):
+        """
+        Returns the number of bytes the cached shoppers take up.
+        :return: the size of the cache in bytes.
+        """
+        return _directory_size(self.path)
+
+
+def _directory_size(path):
+    """
+    Returns the number of bytes of the files in a directory and its subdirectories.
+    :param path: the directory.
+    :return: the size in bytes.
+    """
+    size = 0
+    for folder, _, file_names in os.walk(path):
+        for file_name in file_names:
+            size += os.path.getsize(os.path.join(folder, file_name))
+    return size
@@ -0,0 +1,110 @@
+"""
+The indexes declared for the collections of the shopper database, and the advisor that
+suggests indexes for the shapes of the queries run against them.
+"""
+import pymongo
+
+# indexes of every collection of shoppers, as lists of (field, direction), the last one
+# serves the pages of shoppers
+SHOPPER_INDEXES = [[("Date", pymongo.ASCENDING), ("TimeIn", pymongo.ASCENDING)],
+                   [("DayOfWeek", pymongo.ASCENDING), ("Date", pymongo.ASCENDING)],
+                   [("TimeIn", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]]
+
+# indexes of the collections of buckets of shoppers, whose TimeIn is an array
+BUCKET_INDEXES = [[("Date", pymongo.ASCENDING), ("Hour", pymongo.ASCENDING)],
+                  [("DayOfWeek", pymongo.ASCENDING), ("Date", pymongo.ASCENDING)]]
+
+# indexes of the collections of shoppers of a fleet of stores
+FLEET_INDEXES = [[("StoreId", pymongo.ASCENDING), ("Date", pymongo.ASCENDING)]]
+
+# indexes of the time-series collections of shoppers, on their meta and time fields
+TIMESERIES_INDEXES = [[("meta.parameter_name", pymongo.ASCENDING),
+                       ("TimeIn", pymongo.ASCENDING)]]
+
+# indexes of the time-series collections of shoppers of a fleet of stores
+TIMESERIES_FLEET_INDEXES = [[("meta.StoreId", pymongo.ASCENDING),
+                             ("TimeIn", pymongo.ASCENDING)]]
+
+# indexes of the parameters collection, looked up by name
+PARAMETER_INDEXES = [[("name", pymongo.ASCENDING)]]
+
+# indexes of the rollups collection, read by parameter set, level and date
+ROLLUP_INDEXES = [[("parameter_name", pymongo.ASCENDING), ("level", pymongo.ASCENDING),
+                   ("Date", pymongo.ASCENDING), ("Hour", pymongo.ASCENDING)]]
+
+# query operators that match a range of values rather than one
+RANGE_OPERATORS = ["$gt", "$gte", "$lt", "$lte", "$ne", "$nin", "$regex", "$exists"]
+
+
+def query_shape(query_dict, sort=None):
+    """
+    Returns the shape of a query: the fields it matches on one value, the fields it
+    sorts on and the fields it matches on a range, without the values themselves.
+    Fields under $or, $nor and $expr are left out since one index can't serve them.
+    :param query_dict: a dictionary of the query statement.
+    :param sort: a list of (field, direction) or a dictionary of the sort (optional).
+    :return: a tuple of the equality, sort and range fields as tuples.
+    """
+    equality = []
+    ranges = []
+    for field, value in _iter_conditions(query_dict or {}):
+        if isinstance(value, dict) and any(operator in RANGE_OPERATORS for operator in value):
+            ranges.append(field)
+        else:
+            equality.append(field)
+    sort_fields = [field for field, _ in (sort.items() if isinstance(sort, dict) else sort or [])]
+    return (tuple(sorted(set(equality))),
+            tuple(field for field in sort_fields if field not in equality),
+            tuple(sorted(set(ranges) - set(equality) - set(sort_fields))))
+
+
+def suggest_index(shape):
+    """
+    Returns the index that serves a query shape best: the equality fields first, then
+    the sort fields, then the range fields.
+    :param shape: a query shape from query_shape.
+    :return: a list of (field, direction), empty if the query needs no index.
+    """
+    equality, sort_fields, ranges = shape
+    fields = [field for field in equality + sort_fields + ranges if field != "_id"]
+    return [(field, pymongo.ASCENDING) for field in fields]
+
+
+def is_covered(shape, index_keys):
+    """
+    Returns whether one of the indexes serves a query shape: it starts with the equality
+    fields in any order, followed by the sort fields in order and then a range field.
+    :param shape: a query shape from query_shape.
+    :param index_keys: a list of the keys of the existing indexes, each a list of
+    (field, direction).
+    :return: True if an existing index serves the query, or the query needs no index.
+    """
+    equality, sort_fields, ranges = (tuple(field for field in fields if field != "_id")
+                                     for fields in shape)
+    if not equality + sort_fields + ranges:
+        return True
+    for keys in index_keys:
+        fields = [field for field, _ in keys]
+        leading = len(equality)
+        if set(fields[:leading]) != set(equality):
+            continue
+        if tuple(fields[leading:leading + len(sort_fields)]) != sort_fields:
+            continue
+        after = fields[leading + len(sort_fields):leading + len(sort_fields) + 1]
+        if not ranges or (after and after[0] in ranges):
+            return True
+    return False
+
+
+def _iter_conditions(query_dict):
+    """
+    Returns the conditions of a query on fields, including the ones under $and.
+    :param query_dict: a dictionary of the query statement.
+    :return: a generator of (field, condition).
+    """
+    for field, value in query_dict.items():
+        if field == "$and":
+            for condition in value:
+                yield from _iter_conditions(condition)
+        elif not field.startswith("$"):
+            yield field, value
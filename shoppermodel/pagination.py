@@ -0,0 +1,71 @@
+"""
+Keyset pagination of shoppers: pages are sorted by TimeIn and _id, and the continuation
+token of a page holds the TimeIn and _id of its last shopper, so the next page starts
+right after it without skipping over the pages before it.
+"""
+import base64
+import binascii
+import json
+
+from bson import json_util
+
+# the sort of the pages, the keys the continuation tokens hold
+PAGE_SORT = [("TimeIn", 1), ("_id", 1)]
+
+# datetimes are stored naive, in UTC
+JSON_OPTIONS = json_util.JSONOptions(tz_aware=False)
+
+
+def encode_token(document):
+    """
+    Returns the continuation token of the page ending with a document.
+    :param document: the last shopper of a page, with its TimeIn and _id.
+    :return: an opaque url-safe string.
+    """
+    keys = [document[field] for field, _ in PAGE_SORT]
+    content = json_util.dumps(keys, json_options=JSON_OPTIONS)
+    return base64.urlsafe_b64encode(content.encode("utf-8")).decode("ascii")
+
+
+def decode_token(token):
+    """
+    Returns the TimeIn and _id held by a continuation token.
+    :param token: a continuation token from encode_token.
+    :return: a list of the TimeIn and _id of the last shopper of the previous page.
+    ValueError: If the token wasn't made by encode_token.
+    """
+    try:
+        keys = json_util.loads(base64.urlsafe_b64decode(token.encode("ascii")),
+                               json_options=JSON_OPTIONS)
+    except (binascii.Error, UnicodeError, json.JSONDecodeError, TypeError) as err:
+        raise ValueError("Invalid. The page token {} is not a token of a page.".format(token)) \
+            from err
+    if not isinstance(keys, list) or len(keys) != len(PAGE_SORT):
+        raise ValueError("Invalid. The page token {} is not a token of a page.".format(token))
+    return keys
+
+
+def keyset_query(query_dict, token=None, date_bound=False):
+    """
+    Returns a query of the shoppers matching a query that come after the last shopper of
+    the previous page in the order of PAGE_SORT.
+    :param query_dict: a dictionary of the query statement.
+    :param token: the continuation token of the previous page, None for the first page.
+    :param date_bound: whether to also match the shoppers on a Date from the date of the
+    last shopper on, a condition the buckets of a bucketed collection can be matched on
+    before unwinding. Left out otherwise, since the (TimeIn, _id) index serves the page
+    without it (default False).
+    :return: the query of the page.
+    """
+    if token is None:
+        return query_dict
+    time_in, last_id = decode_token(token)
+    after = {"$or": [{"TimeIn": {"$gt": time_in}},
+                     {"TimeIn": time_in, "_id": {"$gt": last_id}}]}
+    page_query = dict(query_dict)
+    page_query["$and"] = list(query_dict.get("$and", [])) + [after]
+    if date_bound:
+        # every shopper of a later page arrives on the date of the last one or later
+        page_query["$and"].append(
+            {"Date": {"$gte": time_in.replace(hour=0, minute=0, second=0, microsecond=0)}})
+    return page_query
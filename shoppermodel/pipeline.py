@@ -0,0 +1,131 @@
+"""
+Connects a producer and its consumers through a bounded queue, so producing the next
+item overlaps with consuming the ones before it.
+"""
+import queue
+import threading
+
+# put on the queue once per consumer when the producer is done
+_DONE = object()
+
+
+def run_pipeline(items, consume, consumers=1, queue_size=4):
+    """
+    Consumes the items of an iterable in a pool of consumer threads while the calling
+    thread keeps producing them. The queue between them holds at most queue_size items,
+    so the producer waits when the consumers fall behind and at most queue_size plus
+    consumers items are in memory at a time. If a consumer fails, the producer stops and
+    the first error is raised once the consumers have finished.
+    :param items: an iterable of items, produced in the calling thread.
+    :param consume: function called with each item in a consumer thread.
+    :param consumers: number of consumer threads (default 1).
+    :param queue_size: maximum number of items waiting to be consumed (default 4).
+    :return: None
+    """
+    if consumers < 1 or queue_size < 1:
+        raise ValueError("Invalid. A pipeline needs at least one consumer and a queue size "
+                         "of at least 1.")
+
+    work = queue.Queue(maxsize=queue_size)
+    errors = []
+
+    def consumer():
+        while True:
+            item = work.get()
+            if item is _DONE:
+                return
+            # after an error the queue is still drained so the producer never blocks
+            if errors:
+                continue
+            try:
+                consume(item)
+            except Exception as err:
+                errors.append(err)
+
+    threads = [threading.Thread(target=consumer, daemon=True) for _ in range(consumers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        for item in items:
+            if errors:
+                break
+            work.put(item)
+    finally:
+        for _ in threads:
+            work.put(_DONE)
+        for thread in threads:
+            thread.join()
+
+    if errors:
+        raise errors[0]
+
+
+class _Stopped(Exception):
+    """
+    Raised in the consumer of tee when the items stop before the end.
+    """
+
+
+def tee(items, consume, queue_size=4):
+    """
+    Passes the items of an iterable on to the caller while a consumer thread gets every
+    one of them as well, so two consumers share a single pass over the items. consume is
+    called once with an iterable of the items and runs while the caller iterates. The
+    queue between them holds at most queue_size items, so iterating waits when the
+    consumer falls behind. If the items stop before the end, because the caller stops
+    iterating or producing them fails, the iterable of the consumer raises an error so
+    it can discard what it did. If the consumer fails, iterating stops and its error is
+    raised.
+    :param items: an iterable of items, produced in the calling thread.
+    :param consume: function called with an iterable of the items in a consumer thread.
+    :param queue_size: maximum number of items waiting to be consumed (default 4).
+    :return: a generator of the items.
+    """
+    if queue_size < 1:
+        raise ValueError("Invalid. A pipeline needs a queue size of at least 1.")
+
+    work = queue.Queue(maxsize=queue_size)
+    errors = []
+    stopped = object()
+    ended = []
+
+    def iterate():
+        while True:
+            item = work.get()
+            if item is _DONE or item is stopped:
+                ended.append(item)
+            if item is _DONE:
+                return
+            if item is stopped:
+                raise _Stopped()
+            yield item
+
+    def consumer():
+        try:
+            consume(iterate())
+        except _Stopped:
+            return
+        except Exception as err:
+            errors.append(err)
+        # the items left are drained so iterating never blocks on a finished consumer
+        while not ended and work.get() not in (_DONE, stopped):
+            pass
+
+    thread = threading.Thread(target=consumer, daemon=True)
+    thread.start()
+
+    done = False
+    try:
+        for item in items:
+            if errors:
+                break
+            work.put(item)
+            yield item
+        done = not errors
+    finally:
+        work.put(_DONE if done else stopped)
+        thread.join()
+
+    if errors:
+        raise errors[0]
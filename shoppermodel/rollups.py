@@ -0,0 +1,74 @@
+"""
+Pre-aggregated summaries of the shoppers of every day and every hour, computed while the
+shoppers are inserted so dashboards don't have to scan every shopper document.
+"""
+import numpy as np
+import pandas as pd
+
+from shoppermodel import schema
+
+# the percentiles of the time spent stored with every rollup
+PERCENTILES = [50, 90, 99]
+
+SECONDS_PER_HOUR = 3600
+
+
+def compute_rollups(data_frame):
+    """
+    Returns the rollups of the shoppers of a data frame holding whole days: the number of
+    shoppers, the mean and percentiles of the time spent, the share of seniors and whether
+    it was sunny, for every day and for every hour of every day. The shoppers of a fleet
+    are summarized per store.
+    :param data_frame: a data frame of shoppers in the compact representation.
+    :return: a tuple of the daily and hourly rollups as data frames.
+    """
+    frame = pd.DataFrame({"Date": data_frame["Date"].to_numpy(),
+                          "Hour": data_frame["TimeIn"].to_numpy() // SECONDS_PER_HOUR,
+                          "TimeSpent": data_frame["TimeSpent"].to_numpy().astype(np.float64),
+                          "IsSenior": data_frame["IsSenior"].to_numpy(),
+                          "IsSunny": data_frame["IsSunny"].to_numpy()})
+    keys = ["Date"]
+    if "StoreId" in data_frame:
+        frame["StoreId"] = data_frame["StoreId"].to_numpy()
+        keys.append("StoreId")
+
+    return _aggregate(frame, keys), _aggregate(frame, keys + ["Hour"])
+
+
+def rollup_documents(rollups, level, parameter_set_name):
+    """
+    Returns the rollups as MongoDB documents.
+    :param rollups: a data frame of daily or hourly rollups from compute_rollups.
+    :param level: the level of the rollups, day or hour.
+    :param parameter_set_name: the name of the parameter set stored with every rollup.
+    :return: a list of documents.
+    """
+    dates = rollups["Date"].to_numpy()
+    columns = {"parameter_name": [parameter_set_name] * len(rollups),
+               "level": [level] * len(rollups),
+               "Date": dates.astype("datetime64[D]").astype("datetime64[us]").tolist(),
+               "DayOfWeek": schema.day_names(
+                   ((dates + 3) % 7).astype(np.int8)).astype(str).tolist()}
+    for column in rollups:
+        if column != "Date":
+            columns[column] = rollups[column].to_numpy().tolist()
+    return [dict(zip(columns, row)) for row in zip(*columns.values())]
+
+
+def _aggregate(frame, keys):
+    """
+    Summarizes the shoppers of every group of a frame.
+    :param frame: a data frame of the Date, Hour, TimeSpent, IsSenior and IsSunny
+    columns of shoppers.
+    :param keys: the columns to group by.
+    :return: a data frame with one row per group.
+    """
+    grouped = frame.groupby(keys, sort=True, observed=True)
+    rollups = grouped.agg(count=("TimeSpent", "size"),
+                          mean_time_spent=("TimeSpent", "mean"),
+                          senior_share=("IsSenior", "mean"),
+                          is_sunny=("IsSunny", "max"))
+    for percentile in PERCENTILES:
+        rollups["p{}_time_spent".format(percentile)] = \
+            grouped["TimeSpent"].quantile(percentile / 100)
+    return rollups.reset_index()
@@ -0,0 +1,58 @@
+"""
+The column layout of the shopper table. Shoppers are generated in a compact form
+and converted to the external representation, with datetimes and strings, when they
+leave the program as a csv or as MongoDB documents.
+"""
+import calendar
+
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['Date', 'DayOfWeek', 'TimeIn', 'TimeSpent', 'IsSenior', 'IsSunny']
+DAY_NAMES = list(calendar.day_name)
+
+# the types of the compact columns, used wherever they are built or merged
+# Date: days since 1970-01-01, TimeIn: seconds since midnight of the date,
+# DayOfWeek: categorical of the day names
+DTYPES = {'Date': np.int32, 'TimeIn': np.int32, 'TimeSpent': np.float32,
+          'IsSenior': np.bool_, 'IsSunny': np.bool_}
+
+SECONDS_PER_DAY = 86400
+
+
+def date_index(date):
+    """
+    Returns the compact representation of a date, the number of days since 1970-01-01.
+    :param date: a date, datetime or pandas Timestamp.
+    :return: the number of days since 1970-01-01 as an integer.
+    """
+    return int(np.datetime64(pd.Timestamp(date).date(), 'D').astype(np.int64))
+
+
+def day_names(codes):
+    """
+    Returns a categorical of day names from day of week numbers (Monday is 0).
+    :param codes: an array of day of week numbers.
+    :return: a pandas Categorical of the day names.
+    """
+    return pd.Categorical.from_codes(codes, categories=DAY_NAMES)
+
+
+def to_external(data_frame):
+    """
+    Returns a copy of a compact shopper data frame in the external representation:
+    Date and TimeIn as datetimes, TimeSpent as a float and the categorical columns as
+    strings. The conversion is lossless.
+    :param data_frame: a data frame of shoppers in the compact representation.
+    :return: a data frame of shoppers in the external representation.
+    """
+    external = data_frame.copy()
+    days = data_frame['Date'].to_numpy().astype('datetime64[D]')
+    seconds = data_frame['TimeIn'].to_numpy().astype('timedelta64[s]')
+    external['Date'] = days.astype('datetime64[ns]')
+    external['TimeIn'] = (days + seconds).astype('datetime64[ns]')
+    external['TimeSpent'] = data_frame['TimeSpent'].astype(np.float64)
+    for column in ['DayOfWeek', 'StoreId']:
+        if column in external:
+            external[column] = external[column].astype(object)
+    return external
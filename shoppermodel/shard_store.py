@@ -0,0 +1,168 @@
+"""
+Stores generated shoppers on disk as one binary file per column per shard of dates,
+described by a JSON manifest, so they can be opened again with memory mapping instead
+of being generated, parsed from a csv or pulled from the database.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+FORMAT_VERSION = 1
+MANIFEST = "manifest.json"
+
+
+class ShardStore:
+    """
+    A directory of shards of shoppers. Every shard holds the shoppers of a range of dates,
+    one raw little-endian binary file per column, and the manifest records the rows,
+    dates and column types of every shard. Categorical columns are stored as their codes
+    with the categories in the manifest.
+    """
+
+    def __init__(self, path):
+        """
+        Opens the shard store in a directory.
+        :param path: the directory of the shard store.
+        """
+        self.path = path
+        with open(os.path.join(path, MANIFEST)) as manifest_file:
+            self.manifest = json.load(manifest_file)
+        if self.manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError("Invalid. The shard store at {} has an unsupported format "
+                             "version ({}).".format(path, self.manifest.get("format_version")))
+        self.columns = self.manifest["columns"]
+        self.shards = self.manifest["shards"]
+
+    def __len__(self):
+        """
+        Returns the number of shoppers in the shard store.
+        :return: the number of shoppers.
+        """
+        return sum(shard["rows"] for shard in self.shards)
+
+    @property
+    def start_date(self):
+        """Return the first date of the shoppers."""
+        return self.manifest["start_date"]
+
+    @property
+    def end_date(self):
+        """Return the last date of the shoppers."""
+        return self.manifest["end_date"]
+
+    @classmethod
+    def write(cls, path, data_frames):
+        """
+        Writes data frames of shoppers to a new shard store, one shard per data frame.
+        :param path: the directory of the shard store, created if it doesn't exist.
+        :param data_frames: an iterable of data frames of shoppers in the compact
+        representation, in date order.
+        :return: the ShardStore.
+        """
+        os.makedirs(path, exist_ok=True)
+        columns = None
+        shards = []
+        for number, data_frame in enumerate(data_frames):
+            if columns is None:
+                columns = _describe_columns(data_frame)
+            folder = "shard-{:05d}".format(number)
+            os.makedirs(os.path.join(path, folder), exist_ok=True)
+            for column in columns:
+                values = data_frame[column["name"]]
+                if "categories" in column:
+                    values = values.cat.codes
+                values = np.ascontiguousarray(values.to_numpy(), dtype=column["dtype"])
+                values.tofile(os.path.join(path, folder, column["name"] + ".bin"))
+            dates = data_frame["Date"].to_numpy()
+            shards.append({"folder": folder, "rows": len(data_frame),
+                           "start_date": _date_string(dates.min()) if len(dates) else None,
+                           "end_date": _date_string(dates.max()) if len(dates) else None})
+
+        dated = [shard for shard in shards if shard["rows"]]
+        manifest = {"format_version": FORMAT_VERSION, "columns": columns or [],
+                    "start_date": dated[0]["start_date"] if dated else None,
+                    "end_date": dated[-1]["end_date"] if dated else None,
+                    "shards": shards}
+        with open(os.path.join(path, MANIFEST), "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        return cls(path)
+
+    def read_shard(self, number):
+        """
+        Returns the shoppers of a shard. The columns are memory mapped from the shard's
+        files, so nothing is read until it is used.
+        :param number: the position of the shard in the manifest.
+        :return: a data frame of shoppers in the compact representation.
+        """
+        shard = self.shards[number]
+        columns = {}
+        for column in self.columns:
+            values = self.__map(shard, column)
+            if "categories" in column:
+                values = pd.Categorical.from_codes(values, categories=column["categories"])
+            columns[column["name"]] = values
+        shopper_ids = columns["ShopperId"]
+        if len(shopper_ids) and shopper_ids[-1] - shopper_ids[0] + 1 == len(shopper_ids):
+            index = pd.RangeIndex(shopper_ids[0], shopper_ids[-1] + 1)
+        else:
+            index = pd.Index(shopper_ids)
+        return pd.DataFrame(columns, index=index, copy=False)
+
+    def iter_shards(self):
+        """
+        Returns the shoppers of every shard, in order.
+        :return: a generator of data frames of shoppers.
+        """
+        for number in range(len(self.shards)):
+            yield self.read_shard(number)
+
+    def to_frame(self):
+        """
+        Returns the shoppers of every shard in one data frame, copied into memory.
+        :return: a data frame of shoppers in the compact representation.
+        """
+        return pd.concat(list(self.iter_shards()))
+
+    def __map(self, shard, column):
+        """
+        Memory maps the file of a column of a shard read only.
+        :param shard: the shard's entry in the manifest.
+        :param column: the column's entry in the manifest.
+        :return: a numpy array backed by the file.
+        """
+        if shard["rows"] == 0:
+            return np.empty(0, dtype=column["dtype"])
+        file_path = os.path.join(self.path, shard["folder"], column["name"] + ".bin")
+        return np.memmap(file_path, dtype=column["dtype"], mode="r", shape=(shard["rows"],))
+
+
+def _describe_columns(data_frame):
+    """
+    Returns the manifest entries of the columns of a data frame of shoppers.
+    :param data_frame: a data frame of shoppers in the compact representation.
+    :return: a list of dictionaries with the name, little-endian dtype and, for
+    categorical columns, the categories of every column.
+    """
+    columns = []
+    for name in data_frame:
+        values = data_frame[name]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            columns.append({"name": name, "dtype": codes.dtype.newbyteorder("<").str,
+                            "categories": [str(category) for category in
+                                           values.cat.categories]})
+        else:
+            dtype = values.to_numpy().dtype
+            columns.append({"name": name, "dtype": dtype.newbyteorder("<").str})
+    return columns
+
+
+def _date_string(date_index):
+    """
+    Returns a date stored as days since 1970-01-01 as a string.
+    :param date_index: the number of days since 1970-01-01.
+    :return: the date as a string (ex. 2020-01-31).
+    """
+    return str(np.datetime64(int(date_index), "D"))
@@ -10,7 +10,8 @@ class Shopper:
     the store at. Uses default values for all fields.
     """
 
-    def __init__(self, day, time_in, is_sunny, percent_senior, day_modifiers):
+    def __init__(self, day, time_in, is_sunny, percent_senior, day_modifiers, rng=None):
+        self.rng = rng if rng is not None else day.rng
         self.date = day.date
         self.day_of_week = day.day_of_week
         self.time_in = time_in
@@ -18,11 +19,11 @@ class Shopper:
         self.day_modifiers = day_modifiers
         self.time_spent = self.__generate_time_spent()
         self.percent_senior = percent_senior
-        self.is_senior = np.random.choice(a=np.array([True, False]),
-                                          p=[self.percent_senior, 1 - self.percent_senior])
+        self.is_senior = self.rng.choice(a=np.array([True, False]),
+                                         p=[self.percent_senior, 1 - self.percent_senior])
 
     def __generate_time_spent(self):
-        return self.day_modifiers.time_spent()
+        return self.day_modifiers.time_spent(rng=self.rng)
 
     def shopper_parameters_to_dictionary(self):
         """
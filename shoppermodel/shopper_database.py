@@ -1,11 +1,38 @@
 """Represents the MongoDB database for the shopper data."""
+from collections import Counter
 from datetime import datetime
+from functools import partial
+from itertools import repeat
 
 import pandas
 import pymongo
 from bson import ObjectId
 from os import environ
 
+from shoppermodel import schema
+from shoppermodel.buckets import BUCKET_LAYOUTS, buckets_query, iter_buckets, \
+    unwind_pipeline
+from shoppermodel.indexes import BUCKET_INDEXES, FLEET_INDEXES, PARAMETER_INDEXES, \
+    ROLLUP_INDEXES, SHOPPER_INDEXES, TIMESERIES_FLEET_INDEXES, TIMESERIES_INDEXES, \
+    is_covered, query_shape, suggest_index
+from shoppermodel.pagination import PAGE_SORT, encode_token, keyset_query
+from shoppermodel.pipeline import run_pipeline
+from shoppermodel.rollups import compute_rollups, rollup_documents
+from shoppermodel.timeseries import META_FIELDS, TIMESERIES_OPTIONS, timeseries_query
+
+# the collection of the daily and hourly rollups of every parameter set
+ROLLUPS = "rollups"
+
+# collections that don't hold shoppers, parameter sets can't use their names
+RESERVED_COLLECTIONS = ["parameters", ROLLUPS]
+
+# shopper: a document per shopper, day and hour: buckets of the shoppers of a day or an
+# hour, timeseries: a MongoDB time-series collection of a document per shopper
+LAYOUTS = ["shopper"] + BUCKET_LAYOUTS + ["timeseries"]
+
+# exact: count every matching document, estimated: an estimate will do, None: no count
+COUNTS = ["exact", "estimated", None]
+
 
 class ShopperDatabase:
     """
@@ -21,6 +48,10 @@ class ShopperDatabase:
         self.client = None
         self.database = None
         self.collections = {}
+        # the number of times each query shape ran on each collection
+        self.query_shapes = Counter()
+        # the layout of each collection of shoppers, one of LAYOUTS
+        self.layouts = {}
 
     def connect_to_client(self):
         """
@@ -42,53 +73,148 @@ class ShopperDatabase:
         else:
             raise ConnectionError('No client connection established.')
 
-    def populate_shopper_database(self, shopper_table, parameter_set_name):
+    def populate_shopper_database(self, shopper_table, parameter_set_name, days_per_chunk=7,
+                                  workers=1, batch_size=10000, writers=1, write_concern=None,
+                                  queue_size=4, layout="shopper", data_frames=None):
         """
-        Populates the shopper database with the given pandas data frame
-        by converting the data frame into a records-based dictionary and
-        inserting it into a MongoDB database collection. If the collection exists,
+        Populates the shopper database with the shoppers of the given shopper table.
+        The documents are encoded straight from the column arrays in batches of batch_size
+        and inserted with unordered insert_many calls, so memory stays bounded by a chunk
+        of days no matter how many shoppers there are. Generation and ingest are pipelined:
+        the batches flow through a bounded queue to writer threads, so the next chunk is
+        generated while the previous one is inserted. If the collection exists,
         then the program will replace the existing collection and associated
-        parameters with the new data provided.
+        parameters with the new data provided. If the shopper table has not been
+        created, the shoppers are generated and inserted chunk by chunk.
         :param shopper_table: the object that contains the data to be added into
         the database.
         :param collection_name: a unique name for the collection to be created.
+        :param days_per_chunk: number of days generated and inserted at a time (default 7).
+        :param workers: number of processes generating the chunks (default 1).
+        :param batch_size: number of documents in each insert_many call (default 10000).
+        :param writers: number of threads inserting the batches (default 1).
+        :param write_concern: a pymongo WriteConcern for the inserts, the write concern
+        of the database if None (optional).
+        :param queue_size: number of batches waiting for a writer before generation pauses
+        (default 4).
+        :param layout: shopper for a document per shopper, day or hour for a document per
+        day or hour of a store holding its shoppers in arrays, timeseries for a MongoDB
+        time-series collection (MongoDB 5.0 or later) with TimeIn as the time field and the
+        parameter set and store as the meta field (default shopper). query and aggregate
+        unwind the buckets into shoppers and rewrite the queries of a time-series
+        collection to prune its buckets.
+        :param data_frames: the chunks of shoppers to insert, for chunks that are also
+        written elsewhere through pipeline.tee, generated by the shopper table if None
+        (optional).
         ConnectionError: If populate_shopper_database was not executed prior to running this method.
+        ValueError: If the layout is not one of LAYOUTS.
         """
+        if layout not in LAYOUTS:
+            raise ValueError("Invalid. The layout ({}) should be one of {}.".format(
+                layout, ", ".join(LAYOUTS)))
         if self.client is None and self.uri != "" and self.database_name != "":
             self.connect_to_client(self.uri, self.database_name)
         elif self.client is None:
             msg = "No database connection established. Please run connect_to_client "
             raise ConnectionError(msg + "before populating the database.")
 
-        data_frame = shopper_table.data_frame
+        if data_frames is None and shopper_table.data_frame is not None:
+            data_frames = [shopper_table.data_frame]
+        elif data_frames is None:
+            data_frames = shopper_table.iter_chunks(days_per_chunk, workers)
 
+        # the rollups of the deleted collections are deleted with them
         for col in self.database.list_collection_names():
             if col.lower() != "parameters":
                 self.delete_collection(col)
 
         # Create/Connect to a collection
+        if layout == "timeseries":
+            self.database.create_collection(parameter_set_name, timeseries=TIMESERIES_OPTIONS)
         collection = self.database[parameter_set_name]
-
-        # create ID column for use in MongoDB
-        data_frame["_id"] = data_frame["ShopperId"]
-
-        # convert to datetime for MongoDB
-        data_frame["Date"] = pandas.to_datetime(data_frame["Date"])
-        data_frame["TimeIn"] = pandas.to_datetime(data_frame["TimeIn"])
-
-        # insert parameter id
-        data_frame.insert(len(data_frame.columns), "parameter_name",
-                          [parameter_set_name for i in range(0, len(data_frame))])
-
-        # convert pandas data frame to dictionary
-        data = data_frame.to_dict("records")
-
-        # add data to the database
-        collection.insert_many(data)
+        self.layouts[parameter_set_name] = layout
+        self.__insert_frames(collection, data_frames, parameter_set_name, batch_size, writers,
+                             write_concern, queue_size)
+        # built after the bulk load, so the inserts don't maintain them
+        self.ensure_indexes(parameter_set_name)
+        self.ensure_indexes(ROLLUPS)
 
         # Add collection to the dictionary of collections
         self.collections[parameter_set_name] = collection
 
+    def replace_days(self, shopper_table, parameter_set_name, dates, days_per_chunk=7,
+                     workers=1, batch_size=10000, writers=1, write_concern=None, queue_size=4):
+        """
+        Replaces the shoppers of the given dates with newly generated ones and leaves the
+        shoppers of every other date untouched. The new shoppers get ShopperIds after the
+        largest one in the collection. Deleting from a time-series collection needs
+        MongoDB 7.0 or later.
+        :param shopper_table: the ShopperTable generating the new shoppers.
+        :param parameter_set_name: name of the collection of the shoppers.
+        :param dates: the dates to replace, within the time frame of the shopper table.
+        :param days_per_chunk: number of days generated and inserted at a time (default 7).
+        :param workers: number of processes generating the chunks (default 1).
+        :param batch_size: number of documents in each insert_many call (default 10000).
+        :param writers: number of threads inserting the batches (default 1).
+        :param write_concern: a pymongo WriteConcern for the inserts, the write concern
+        of the database if None (optional).
+        :param queue_size: number of batches waiting for a writer before generation pauses
+        (default 4).
+        :return: the number of shoppers deleted.
+        ConnectionError: If connect_to_client was not executed prior to running this method.
+        ValueError: If collection does not exist in the database.
+        """
+        collection = self.__verify_connections(parameter_set_name)
+        dates = pandas.DatetimeIndex(dates).normalize()
+        if len(dates) == 0:
+            return 0
+
+        date_query = {"Date": {"$in": [date.to_pydatetime() for date in dates]}}
+        result = collection.delete_many(self.__shopper_query(parameter_set_name, date_query))
+        self.database[ROLLUPS].delete_many(dict(date_query, parameter_name=parameter_set_name))
+        first_id = self.__next_shopper_id(parameter_set_name)
+
+        data_frames = shopper_table.iter_chunks(days_per_chunk, workers, dates, first_id)
+        self.__insert_frames(collection, data_frames, parameter_set_name, batch_size, writers,
+                             write_concern, queue_size)
+        return result.deleted_count
+
+    def append_days(self, shopper_table, parameter_set_name, days_per_chunk=7, workers=1,
+                    batch_size=10000, writers=1, write_concern=None, queue_size=4):
+        """
+        Adds the shoppers of the dates of the shopper table after the last date in the
+        collection, leaving the shoppers already in it untouched. The ShopperIds continue
+        from the largest one in the collection, and every day draws from its own seeded
+        stream, so the appended days are the same as if the whole time frame had been
+        generated at once with the same seed.
+        :param shopper_table: the ShopperTable whose time frame ends at the new end date.
+        :param parameter_set_name: name of the collection of the shoppers.
+        :param days_per_chunk: number of days generated and inserted at a time (default 7).
+        :param workers: number of processes generating the chunks (default 1).
+        :param batch_size: number of documents in each insert_many call (default 10000).
+        :param writers: number of threads inserting the batches (default 1).
+        :param write_concern: a pymongo WriteConcern for the inserts, the write concern
+        of the database if None (optional).
+        :param queue_size: number of batches waiting for a writer before generation pauses
+        (default 4).
+        :return: the number of days appended.
+        ConnectionError: If connect_to_client was not executed prior to running this method.
+        ValueError: If collection does not exist in the database.
+        """
+        collection = self.__verify_connections(parameter_set_name)
+        dates = shopper_table.time_frame.dates
+        last = collection.find_one(sort=[("Date", pymongo.DESCENDING)], projection=["Date"])
+        if last is not None:
+            dates = dates[dates > pandas.Timestamp(last["Date"])]
+        if len(dates) == 0:
+            return 0
+
+        first_id = self.__next_shopper_id(parameter_set_name)
+        data_frames = shopper_table.iter_chunks(days_per_chunk, workers, dates, first_id)
+        self.__insert_frames(collection, data_frames, parameter_set_name, batch_size, writers,
+                             write_concern, queue_size)
+        return len(dates)
+
     def populate_shopper_database_from_csv(self, csv_path="shoppers.csv",
                                            collection_name="default"):
         """
@@ -157,71 +283,198 @@ class ShopperDatabase:
         else:
             return {"result": 0, "message": "Could not delete the document."}
 
-    def db_query(self, query_dict, result_dict, limit=0):
+    def db_query(self, query_dict, result_dict, limit=0, fields=None, count="exact"):
         """
         Returns the dictionary output to be returned by the API
         for a query.
         :param query_dict: query result from the MongoDB.
         :param result_dict: query result formatted as a dictionary.
         :param limit: the amount of document to return in a query, default 0 means no limit
+        :param fields: a list of the fields to return, every field if None (optional).
+        :param count: exact, estimated or None, see query (default exact).
         :return: formatted dictionary of the query result.
         """
         collections = self.database.list_collection_names()
         for col in collections:
-            if col == "parameters":
+            if col in RESERVED_COLLECTIONS:
                 continue
-            query = self.query(query_dict=query_dict, collection_name=col, limit=limit)
+            query = self.query(query_dict=query_dict, collection_name=col, limit=limit,
+                               fields=fields, count=count)
             if query != {}:
                 result_dict["collections"][col] = query
         return result_dict
 
-    def query(self, query_dict: dict, sort_list=None, collection_name="default", limit=0):
+    def query(self, query_dict: dict, sort_list=None, collection_name="default", limit=0,
+              fields=None, count="exact"):
         """
-        Returns the results of a query.
+        Returns the results of a query in a single round trip. Without a limit the count
+        is the number of documents found; with a limit the documents and their count come
+        back together from a $facet, or the count is estimated from the collection's
+        metadata when an estimate is enough and there is no filter.
         :param query_dict: a dictionary of the query statement.
         :param sort_list: a list of fields to sort by (optional).
         :param collection_name: name of the collection to query on.
         :param limit: the amount of document to return in a query, default 0 means no limit
-        :return: resulting query object.
+        :param fields: a list of the fields to return, every field if None (optional). The
+        other fields are left out by MongoDB, _id too unless it is one of the fields.
+        :param count: exact for the exact number of matching documents, estimated if an
+        estimate will do, None to leave the count out (default exact).
+        :return: resulting query object, with the count and whether it is exact or
+        estimated in count_type when a count was asked for.
         ConnectionError: If populate_shopper_database was not executed prior to running this method.
-        ValueError: If collection does not exist in the database.
+        ValueError: If collection does not exist in the database, or count is not one of
+        COUNTS.
         """
+        if count not in COUNTS:
+            raise ValueError("Invalid. The count ({}) should be exact, estimated or "
+                             "None.".format(count))
         try:
             collection = self.__verify_connections(collection_name)
         except ValueError as err:
             return {"count": 0, "message": "Could not find a document because the collection doesn't exist."}
 
-        if limit > 0:
-            output = collection.find(query_dict).limit(limit)
-        elif not isinstance(sort_list, list) or sort_list is None:
-            output = collection.find(query_dict)
+        self.query_shapes[(collection_name, query_shape(query_dict, sort_list))] += 1
+        bucketed = self.layout(collection_name) in BUCKET_LAYOUTS
+        projection = self.__projection(collection_name, fields)
+        if bucketed:
+            pipeline = unwind_pipeline(query_dict)
         else:
-            output = collection.find(query_dict).sort(sort_list)
-
-        count = collection.count_documents(query_dict)
-
-        if count == 0:
-            return {"count": count, "message": "Could not find any document."}
-
-        result = []
-        for document in output:
-            # document data type: dictionary
-            for key in document:
-                # ObjectId and datetime values converted to string
-                if isinstance(document[key], (ObjectId, datetime)):
-                    document[key] = str(document[key])
+            pipeline = [{"$match": self.__shopper_query(collection_name, query_dict)}]
+        # the stages after the match that pick the documents to return
+        stages = []
+        if limit > 0:
+            stages.append({"$limit": limit})
+        elif isinstance(sort_list, list):
+            stages.append({"$sort": dict(sort_list)})
+        if projection:
+            stages.append({"$project": projection})
+
+        output = None
+        total = None
+        count_type = count
+        if limit > 0 and count == "estimated" and not query_dict and not bucketed:
+            total, count_type = self.__count(collection_name, query_dict, count)
+        elif limit > 0 and count is not None:
+            count_type = "exact"
+            faceted = next(collection.aggregate(pipeline + [
+                {"$facet": {"documents": stages, "count": [{"$count": "count"}]}}]))
+            output = faceted["documents"]
+            total = faceted["count"][0]["count"] if faceted["count"] else 0
+
+        if output is None and bucketed:
+            output = collection.aggregate(pipeline + stages)
+        elif output is None:
+            output = collection.find(pipeline[0]["$match"], projection)
+            if limit > 0:
+                output = output.limit(limit)
+            elif isinstance(sort_list, list):
+                output = output.sort(sort_list)
+
+        result = [_to_json(document) for document in output]
+        if count is None:
+            return {"message": "Found {} documents.".format(len(result)), "documents": result}
+        if total is None:
+            # every matching document was read, so they are the count
+            total = len(result)
+            count_type = "exact"
+        counted = {"count": total, "count_type": count_type}
+
+        if total == 0 or not result:
+            return dict(counted, message="Could not find any document.")
 
-            result.append(document)
-        
         if limit > 0:
             message = "Found the corresponding document/s, but returning only the first "
             message += str(limit)
-            return {"count": count, "message": message, "documents": result}
+            return dict(counted, message=message, documents=result)
 
-        if count == 1:
-            return {"count": count, "message": "Found 1 document.", "documents": result}
+        if total == 1:
+            return dict(counted, message="Found 1 document.", documents=result)
             
-        return {"count": count, "message": "Found " + str(count) + " documents.", "documents": result}
+        return dict(counted, message="Found " + str(total) + " documents.", documents=result)
+
+    def page(self, query_dict, collection_name="default", page_size=100, token=None,
+             fields=None, count=None):
+        """
+        Returns a page of the shoppers matching a query, in the order of their TimeIn and
+        _id, and the continuation token of the next page. Each page starts right after the
+        last shopper of the previous one, so walking every page holds one page in memory
+        at a time and takes as long for the last page as for the first. The buckets of a
+        bucketed collection are read in the order of their Date and Hour from the date of
+        the previous page on, and only as many are unwound as the page needs.
+        :param query_dict: a dictionary of the query statement.
+        :param collection_name: name of the collection to query on.
+        :param page_size: the most shoppers in a page (default 100).
+        :param token: the continuation token of the previous page, None for the first page.
+        :param fields: a list of the fields to return, every field if None (optional).
+        :param count: exact or estimated to add the number of shoppers matching the query
+        on every page, None to leave it out (default None).
+        :return: a dictionary of the documents of the page and the token of the next page,
+        None on the last page, and the count and whether it is exact or estimated in
+        count_type when a count was asked for.
+        ValueError: If the page size is less than 1, the token is not a token of a page or
+        count is not one of COUNTS.
+        """
+        if page_size < 1:
+            raise ValueError("Invalid. The page size ({}) should be at least 1.".format(
+                page_size))
+        if count not in COUNTS:
+            raise ValueError("Invalid. The count ({}) should be exact, estimated or "
+                             "None.".format(count))
+        try:
+            collection = self.__verify_connections(collection_name)
+        except ValueError:
+            return {"message": "Could not find a document because the collection doesn't "
+                               "exist.", "documents": [], "next": None}
+
+        bucketed = self.layout(collection_name) in BUCKET_LAYOUTS
+        page_query = keyset_query(query_dict, token, date_bound=bucketed)
+        self.query_shapes[(collection_name, query_shape(page_query, PAGE_SORT))] += 1
+        # the keys of the token are read even if they are not among the fields
+        projection = self.__projection(collection_name, fields,
+                                       [field for field, _ in PAGE_SORT])
+        # one more than a page is read to know whether there is a next page
+        if bucketed:
+            documents = self.__page_buckets(collection, page_query, page_size + 1, projection)
+        else:
+            documents = list(collection.find(self.__shopper_query(collection_name, page_query),
+                                             projection).sort(PAGE_SORT).limit(page_size + 1))
+
+        next_token = None
+        if len(documents) > page_size:
+            documents = documents[:page_size]
+            next_token = encode_token(documents[-1])
+        if fields:
+            documents = [{key: value for key, value in document.items() if key in fields}
+                         for document in documents]
+        message = "Found {} documents.".format(len(documents))
+        if next_token is None:
+            message += " This is the last page."
+        result = {"message": message, "next": next_token,
+                  "documents": [_to_json(document) for document in documents]}
+        if count is not None:
+            result["count"], result["count_type"] = self.__count(collection_name, query_dict,
+                                                                 count)
+        return result
+
+    def summary(self, parameter_set_name, level="day", query_dict=None, fields=None):
+        """
+        Returns the rollups of the shoppers generated using a parameter set, in date order.
+        Every rollup holds the number of shoppers, the mean and percentiles of the time
+        spent, the share of seniors and whether it was sunny.
+        :param parameter_set_name: the name of the parameter set.
+        :param level: day for the rollups of every day, hour for every hour (day).
+        :param query_dict: a dictionary of a query on the rollups, like a range of Dates
+        (optional).
+        :param fields: a list of the fields of the rollups to return, every field if None
+        (optional).
+        :return: the query result of the rollups.
+        """
+        if level not in ["day", "hour"]:
+            raise ValueError("Invalid. The level of the rollups ({}) should be day "
+                             "or hour.".format(level))
+        query_dict = dict(query_dict or {}, parameter_name=parameter_set_name, level=level)
+        sort_list = [("Date", pymongo.ASCENDING), ("Hour", pymongo.ASCENDING)]
+        return self.query(query_dict, sort_list, ROLLUPS, fields=fields)
 
     def find_parameters(self):
         """
@@ -246,9 +499,111 @@ class ShopperDatabase:
         ValueError: If collection does not exist in the database.
         """
         collection = self.__verify_connections(collection_name)
+        self.query_shapes[(collection_name, _pipeline_shape(agg_list))] += 1
 
+        if self.layout(collection_name) in BUCKET_LAYOUTS:
+            # a leading $match is matched while unwinding, partly before it
+            if agg_list and "$match" in agg_list[0]:
+                agg_list = unwind_pipeline(agg_list[0]["$match"]) + agg_list[1:]
+            else:
+                agg_list = unwind_pipeline() + agg_list
+        elif agg_list and "$match" in agg_list[0]:
+            match = self.__shopper_query(collection_name, agg_list[0]["$match"])
+            agg_list = [{"$match": match}] + agg_list[1:]
         return collection.aggregate(agg_list)
 
+    def layout(self, collection_name):
+        """
+        Returns the layout of a collection of shoppers: shopper if it holds a document per
+        shopper, day or hour if it holds buckets of the shoppers of a day or an hour,
+        timeseries if it is a time-series collection.
+        :param collection_name: name of the collection.
+        :return: one of LAYOUTS, shopper for an empty collection.
+        """
+        if collection_name not in self.layouts:
+            document = self.database[collection_name].find_one(
+                {}, projection=["Bucket", TIMESERIES_OPTIONS["metaField"]])
+            if document is None:
+                return "shopper"
+            if TIMESERIES_OPTIONS["metaField"] in document:
+                self.layouts[collection_name] = "timeseries"
+            else:
+                self.layouts[collection_name] = document.get("Bucket", "shopper")
+        return self.layouts[collection_name]
+
+    def ensure_indexes(self, collection_name):
+        """
+        Creates the indexes declared for a collection: the parameters collection is
+        indexed by name, the rollups by parameter set, level and date, and collections of
+        shoppers by date, with an index by store and date for the shoppers of a fleet.
+        Indexes that already exist are left as they are.
+        :param collection_name: name of the collection.
+        :return: a list of the names of the declared indexes.
+        ConnectionError: If connect_to_client was not executed prior to running this method.
+        """
+        if self.client is None:
+            msg = "No database connection established. Please run connect_to_client "
+            raise ConnectionError(msg + "before creating indexes.")
+        collection = self.database[collection_name]
+        if collection_name == "parameters":
+            declared = PARAMETER_INDEXES
+        elif collection_name == ROLLUPS:
+            declared = ROLLUP_INDEXES
+        elif self.layout(collection_name) == "timeseries":
+            declared = TIMESERIES_INDEXES
+            if collection.find_one({"StoreId": {"$exists": True}}, projection=["_id"]):
+                declared = declared + TIMESERIES_FLEET_INDEXES
+        else:
+            declared = SHOPPER_INDEXES if self.layout(collection_name) == "shopper" \
+                else BUCKET_INDEXES
+            if collection.find_one({"StoreId": {"$exists": True}}, projection=["_id"]):
+                declared = declared + FLEET_INDEXES
+        return [collection.create_index(keys) for keys in declared]
+
+    def index_report(self, collection_name=None, profile_limit=1000):
+        """
+        Returns the indexes of the collections and suggests the missing ones for the
+        query shapes run on them: the queries run through this object, and the queries
+        in system.profile if the database profiler is on (db.setProfilingLevel).
+        :param collection_name: name of the collection to report on, every collection if
+        None (optional).
+        :param profile_limit: number of the most recent system.profile entries read
+        (default 1000).
+        :return: a dictionary of the indexes and suggestions of every collection, each
+        suggestion with the number of queries of its shape.
+        """
+        database = self.get_database()
+        names = [name for name in database.list_collection_names()
+                 if not name.startswith("system.")]
+        if collection_name is not None:
+            names = [name for name in names if name == collection_name]
+
+        shapes = Counter(self.query_shapes)
+        if "system.profile" in database.list_collection_names():
+            profile = database["system.profile"].find().sort("ts", pymongo.DESCENDING)
+            for entry in profile.limit(profile_limit):
+                shape = _profile_shape(entry, self.database_name)
+                if shape is not None:
+                    shapes[shape] += 1
+
+        report = {}
+        for name in names:
+            indexes = database[name].index_information()
+            index_keys = [index["key"] for index in indexes.values()]
+            suggestions = {}
+            for (shape_collection, shape), count in shapes.items():
+                if shape_collection != name or is_covered(shape, index_keys):
+                    continue
+                keys = tuple(suggest_index(shape))
+                suggestions[keys] = suggestions.get(keys, 0) + count
+            report[name] = {
+                "indexes": {index_name: [list(key) for key in index["key"]]
+                            for index_name, index in indexes.items()},
+                "suggestions": [{"index": [list(key) for key in keys], "queries": count}
+                                for keys, count in sorted(suggestions.items(),
+                                                          key=lambda item: -item[1])]}
+        return {"collections": report}
+
     def get_database(self):
         """
         Returns the connections to the MongoDB database.
@@ -272,6 +627,7 @@ class ShopperDatabase:
         # remove collection from collections list
         if collection_name in self.collections:
             self.collections.pop(collection_name)
+        self.layouts.pop(collection_name, None)
         # delete collection from the database
         col_list = self.database.list_collection_names()
         if collection_name in col_list:
@@ -321,7 +677,8 @@ class ShopperDatabase:
             "holiday_modifiers": {
                 "holiday_percent": store_model.holiday_modifiers.holiday_percent,
                 "day_before_percent": store_model.holiday_modifiers.day_before_percent,
-                "week_before_percent": store_model.holiday_modifiers.week_before_percent
+                "week_before_percent": store_model.holiday_modifiers.week_before_percent,
+                "region": store_model.holiday_modifiers.region
             },
             "senior_discount": {
                 "start_time": store_model.senior_discount.start_time.__str__(),
@@ -330,13 +687,166 @@ class ShopperDatabase:
                 "max_time_spent": store_model.senior_discount.max_time_spent,
                 "percent": store_model.senior_discount.percent,
                 "day": store_model.senior_discount.day_name
-            }
+            },
+            "seed": store_model.seed
         }
 
         collection = self.database["parameters"]
         result = collection.insert_one(parameters)
+        self.ensure_indexes("parameters")
         return result.inserted_id
 
+    def __next_shopper_id(self, collection_name):
+        """
+        Returns the ShopperId after the largest one in a collection.
+        :param collection_name: name of the collection of shoppers.
+        :return: the next ShopperId, 0 if the collection is empty.
+        """
+        collection = self.database[collection_name]
+        last = collection.find_one(sort=[("_id", pymongo.DESCENDING)],
+                                   projection=["_id", "count"])
+        if last is None:
+            return 0
+        # a bucket is numbered by its first ShopperId, and the rest follow it
+        return last["_id"] + (last["count"] if self.layout(collection_name) in BUCKET_LAYOUTS
+                              else 1)
+
+    def __page_buckets(self, collection, page_query, limit, projection):
+        """
+        Returns the first shoppers of a page of a bucketed collection. The buckets matching
+        the page are read in the order of their Date and Hour, and unwound a few at a time
+        until enough shoppers match. Buckets of different dates or hours hold shoppers
+        of different times, so the buckets are unwound up to the end of a date or hour and
+        the shoppers of the buckets unwound later all arrive after the ones before.
+        :param collection: the collection of buckets.
+        :param page_query: the query of the page from keyset_query.
+        :param limit: the most shoppers to return.
+        :param projection: a dictionary of the projection of the shoppers, None for every
+        field.
+        :return: a list of the shoppers in the order of PAGE_SORT.
+        """
+        def unwind(bucket_ids, needed):
+            pipeline = [{"$match": {"_id": {"$in": bucket_ids}}}] + unwind_pipeline(page_query)
+            pipeline += [{"$sort": dict(PAGE_SORT)}, {"$limit": needed}]
+            if projection:
+                pipeline.append({"$project": projection})
+            return list(collection.aggregate(pipeline))
+
+        # sorted on the index of the buckets, the order within a date or hour doesn't matter
+        buckets = collection.find(buckets_query(page_query), ["Date", "Hour", "count"]) \
+            .sort([("Date", pymongo.ASCENDING), ("Hour", pymongo.ASCENDING)])
+        documents = []
+        bucket_ids = []
+        shoppers = 0
+        last_key = None
+        with buckets:
+            for bucket in buckets:
+                key = (bucket["Date"], bucket.get("Hour"))
+                if key != last_key and shoppers >= limit - len(documents):
+                    documents += unwind(bucket_ids, limit - len(documents))
+                    bucket_ids = []
+                    shoppers = 0
+                    if len(documents) >= limit:
+                        return documents
+                bucket_ids.append(bucket["_id"])
+                shoppers += bucket["count"]
+                last_key = key
+        if bucket_ids:
+            documents += unwind(bucket_ids, limit - len(documents))
+        return documents
+
+    def __shopper_query(self, collection_name, query_dict):
+        """
+        Returns a query on the shoppers of a collection, rewritten to prune the buckets of
+        a time-series collection.
+        :param collection_name: name of the collection of shoppers.
+        :param query_dict: a dictionary of the query statement.
+        :return: the query to run on the collection.
+        """
+        if self.layout(collection_name) == "timeseries":
+            return timeseries_query(query_dict)
+        return query_dict
+
+    def __count(self, collection_name, query_dict, count):
+        """
+        Returns the number of shoppers of a collection matching a query.
+        :param collection_name: name of the collection of shoppers.
+        :param query_dict: a dictionary of the query statement.
+        :param count: exact or estimated, an estimate is only made when there is no filter.
+        :return: a tuple of the count and whether it is exact or estimated.
+        """
+        collection = self.database[collection_name]
+        if self.layout(collection_name) in BUCKET_LAYOUTS:
+            counted = list(collection.aggregate(unwind_pipeline(query_dict) +
+                                                [{"$count": "count"}]))
+            return (counted[0]["count"] if counted else 0), "exact"
+        if count == "estimated" and not query_dict:
+            return collection.estimated_document_count(), "estimated"
+        return collection.count_documents(self.__shopper_query(collection_name, query_dict)), \
+            "exact"
+
+    def __projection(self, collection_name, fields, keep=()):
+        """
+        Returns the projection of a query on the shoppers of a collection.
+        :param collection_name: name of the collection of shoppers.
+        :param fields: a list of the fields to return, every field if None.
+        :param keep: fields read along with the fields (optional).
+        :return: a dictionary of the projection, None for every field.
+        """
+        if fields:
+            projection = {field: 1 for field in list(fields) + list(keep)}
+            if "_id" not in projection:
+                projection["_id"] = 0
+            return projection
+        if self.layout(collection_name) == "timeseries":
+            # the meta field of a time-series collection only repeats other fields
+            return {TIMESERIES_OPTIONS["metaField"]: 0}
+        return None
+
+    def __insert_frames(self, collection, data_frames, parameter_set_name, batch_size, writers,
+                        write_concern, queue_size):
+        """
+        Inserts the shoppers of data frames in batches, through a pipeline of writer threads,
+        and the daily and hourly rollups of each data frame into the rollups collection.
+        :param collection: the pymongo collection to insert into.
+        :param data_frames: an iterable of data frames of shoppers.
+        :param parameter_set_name: the name of the parameter set stored with every shopper.
+        :param batch_size: number of documents in each insert_many call.
+        :param writers: number of threads inserting the batches.
+        :param write_concern: a pymongo WriteConcern for the inserts, or None.
+        :param queue_size: number of batches waiting for a writer before generation pauses.
+        """
+        if write_concern is not None:
+            collection = collection.with_options(write_concern=write_concern)
+
+        layout = self.layout(collection.name)
+        batches = (batch for data_frame in data_frames
+                   for batch in self.__iter_batches(data_frame, parameter_set_name, batch_size,
+                                                    layout))
+        run_pipeline(batches, partial(collection.insert_many, ordered=False), writers,
+                     queue_size)
+
+    def __iter_batches(self, data_frame, parameter_set_name, batch_size, layout):
+        """
+        Inserts the rollups of the shoppers of a data frame and returns the shoppers
+        as batches of documents.
+        :param data_frame: a data frame of shoppers holding whole days.
+        :param parameter_set_name: the name of the parameter set stored with every document.
+        :param batch_size: number of shoppers in each batch.
+        :param layout: one of LAYOUTS.
+        :return: a generator of lists of documents.
+        """
+        documents = []
+        for level, rollups in zip(["day", "hour"], compute_rollups(data_frame)):
+            documents += rollup_documents(rollups, level, parameter_set_name)
+        if documents:
+            self.database[ROLLUPS].insert_many(documents, ordered=False)
+        if layout in BUCKET_LAYOUTS:
+            yield from iter_buckets(data_frame, parameter_set_name, layout, batch_size)
+        else:
+            yield from _iter_documents(data_frame, parameter_set_name, batch_size,
+                                       layout == "timeseries")
+
     def __verify_connections(self, collection_name):
         """
         Verifies that a connection to a MongoDB database and collection has been made.
@@ -358,3 +868,85 @@ class ShopperDatabase:
         else:
             collection = self.collections[collection_name]
         return collection
+
+
+def _iter_documents(data_frame, parameter_set_name, batch_size, meta=False):
+    """
+    Encodes the shoppers of a data frame as MongoDB documents, a batch at a time.
+    Only one batch of documents is in memory at a time.
+    :param data_frame: a data frame of shoppers in the compact representation.
+    :param parameter_set_name: the name of the parameter set stored with every shopper.
+    :param batch_size: number of documents in each batch.
+    :param meta: whether to add the meta field of a time-series collection (default False).
+    :return: a generator of lists of documents.
+    """
+    external = schema.to_external(data_frame)
+    columns = {}
+    for column in external:
+        values = external[column].to_numpy()
+        if values.dtype.kind == 'M':
+            # microseconds convert to datetime objects, nanoseconds to integers
+            values = values.astype('datetime64[us]')
+        columns[column] = values
+    columns["_id"] = columns["ShopperId"]
+    keys = list(columns) + ["parameter_name"]
+
+    for start in range(0, len(external), batch_size):
+        values = [columns[key][start:start + batch_size].tolist() for key in columns]
+        values.append(repeat(parameter_set_name))
+        documents = [dict(zip(keys, row)) for row in zip(*values)]
+        if meta:
+            for document in documents:
+                document[TIMESERIES_OPTIONS["metaField"]] = {
+                    field: document[field] for field in META_FIELDS if field in document}
+        yield documents
+
+
+def _to_json(document):
+    """
+    Converts the ObjectId and datetime values of a document to strings.
+    :param document: a document from MongoDB.
+    :return: the document.
+    """
+    for key in document:
+        if isinstance(document[key], (ObjectId, datetime)):
+            document[key] = str(document[key])
+    return document
+
+
+def _pipeline_shape(agg_list):
+    """
+    Returns the shape of the query of an aggregation: the $match and $sort stages it
+    starts with, which are the ones that can use an index.
+    :param agg_list: a list of the aggregation statement.
+    :return: a query shape from query_shape.
+    """
+    query_dict = {}
+    sort = None
+    for stage in agg_list:
+        if "$match" in stage and sort is None:
+            query_dict = {"$and": [query_dict, stage["$match"]]}
+        elif "$sort" in stage and sort is None:
+            sort = stage["$sort"]
+        else:
+            break
+    return query_shape(query_dict, sort)
+
+
+def _profile_shape(entry, database_name):
+    """
+    Returns the collection and query shape of a find or aggregate in system.profile.
+    :param entry: a document of system.profile.
+    :param database_name: the name of the database the profile belongs to.
+    :return: a tuple of the collection name and query shape, None for other operations.
+    """
+    command = entry.get("command", {})
+    namespace = entry.get("ns", "")
+    if not namespace.startswith(database_name + "."):
+        return None
+    collection_name = namespace[len(database_name) + 1:]
+    if "find" in command:
+        return collection_name, query_shape(command.get("filter"), command.get("sort"))
+    if "aggregate" in command:
+        return collection_name, _pipeline_shape(command.get("pipeline", []))
+    return None
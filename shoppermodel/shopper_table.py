@@ -1,8 +1,17 @@
 """
 This module represents the input for the data to be generated
 """
+import gzip
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+import numpy as np
 import pandas as pd
 
+from shoppermodel import schema
+from shoppermodel.shard_store import ShardStore
+
 
 class ShopperTable:
     """
@@ -10,44 +19,375 @@ class ShopperTable:
     method to create the shopper data
     """
 
-    def __init__(self, store_model, time_frame):
+    def __init__(self, store_model, time_frame, seed=None):
+        """
+        Initializes ShopperTable.
+        :param store_model: StoreModel object.
+        :param time_frame: TimeFrame object.
+        :param seed: seed for the random number generators, replaces the seed of the store
+        model when provided (optional).
+        """
         self.store_model = store_model
         self.time_frame = time_frame
         self.data_frame = None
+        self.shard_store = None
+        if seed is not None:
+            self.store_model.seed = seed
 
-    def create_table(self):
+    @staticmethod
+    def from_shards(path):
+        """
+        Opens the shoppers saved with to_shards. The columns are memory mapped, so the
+        shoppers can be saved, inserted or analyzed again without generating them.
+        :param path: the directory of the shard store.
+        :return: a ShopperTable of the stored shoppers.
+        ValueError: If the shard store holds no shoppers.
+        """
+        # imported here since the configuration package imports this package
+        from configuration.time_frame import TimeFrame
+
+        shard_store = ShardStore(path)
+        if shard_store.start_date is None:
+            raise ValueError("Invalid. The shard store at {} holds no shoppers, so it has "
+                             "no time frame.".format(path))
+        end_date = shard_store.end_date
+        if end_date == shard_store.start_date:
+            # a TimeFrame ends after the day it starts on, the shoppers of a single day get
+            # a time frame ending the next day whose dates are that day alone
+            end_date = str((pd.Timestamp(end_date) + pd.Timedelta(days=1)).date())
+        time_frame = TimeFrame(shard_store.start_date, end_date)
+        time_frame.dates = pd.date_range(shard_store.start_date, shard_store.end_date)
+        shopper_table = ShopperTable(None, time_frame)
+        shopper_table.shard_store = shard_store
+        return shopper_table
+
+    def create_table(self, workers=1):
         """
         Populates this class with a data frame of the shoppers generated based
         on the passed in parameters
+        :param workers: number of processes generating the days, the days are
+        generated in this process if 1 (default 1).
         :return: None
         """
-        day_list = []
-        # create all the days
-        for date in self.time_frame.dates:
-            day_list.append(self.store_model.create_day(date))
-
-        shopper_dict = {'Date': [], 'DayOfWeek': [], 'TimeIn': [], 'TimeSpent': [],
-                        'IsSenior': [], 'IsSunny': []}
+        if self.shard_store is not None:
+            self.data_frame = self.shard_store.to_frame()
+            return self.data_frame
 
-        for day in day_list:
-            day.create_shoppers()
-            day_dict = day.shoppers
-            for key, value in day_dict.items():
-                shopper_dict[key] += value
+        store_model = self.store_model.compile()
+        dates, traffic = self.__daily_traffic(store_model)
+        # a few chunks per worker keeps the processes busy when days differ in size
+        num_chunks = min(len(dates), workers * 4) if workers > 1 else 1
+        tasks = zip(repeat(store_model), np.array_split(dates, num_chunks),
+                    np.array_split(traffic, num_chunks))
+        column_list = list(_iter_columns(tasks, workers))
 
-        self.data_frame = pd.DataFrame(shopper_dict)
-        self.data_frame.reset_index()
-        self.data_frame['ShopperId'] = self.data_frame.index
-        self.data_frame.sort_values(by=['Date', 'TimeIn'], inplace=True)
+        self.data_frame = _to_frame(_merge_columns(column_list), 0)
         return self.data_frame
 
-    def to_csv(self, path):
+    def iter_chunks(self, days_per_chunk=7, workers=1, dates=None, first_id=0):
+        """
+        Generates the shoppers in chunks of consecutive days, so only one chunk
+        has to be in memory at a time no matter how long the time frame is.
+        :param days_per_chunk: number of days in each chunk (default 7).
+        :param workers: number of processes generating the chunks (default 1).
+        :param dates: the dates of the time frame to generate, every date if None (optional).
+        :param first_id: the ShopperId of the first shopper (default 0).
+        :return: a generator of data frames of shoppers in date order.
+        """
+        if self.shard_store is not None:
+            if dates is not None or first_id != 0:
+                raise ValueError("Invalid. The shoppers of a shard store can only be "
+                                 "read in full.")
+            yield from self.shard_store.iter_shards()
+            return
+
+        if dates is None:
+            dates = self.time_frame.dates
+        else:
+            dates = pd.DatetimeIndex(dates).normalize().sort_values()
+        tasks = self._chunk_tasks(dates, days_per_chunk)
+        columns_list = _iter_columns([task for _, task in tasks], workers)
+        for (store_id, _), columns in zip(tasks, columns_list):
+            data_frame = self._tag_chunk(_to_frame(columns, first_id), store_id)
+            first_id += len(data_frame)
+            yield data_frame
+
+    def _chunk_tasks(self, dates, days_per_chunk):
+        """
+        Returns the chunks iter_chunks generates, in the order they are yielded. Overridden
+        by tables that generate the shoppers of several stores.
+        :param dates: the dates to generate, in order.
+        :param days_per_chunk: number of days in each chunk.
+        :return: a list of tuples of the ID of the store of the chunk, None for a single
+        store, and a tuple of the CompiledStoreModel, the dates and their number of
+        shoppers.
+        """
+        store_model = self.store_model.compile()
+        dates, traffic = self.__daily_traffic(store_model, dates)
+        return [(None, (store_model, dates[i:i + days_per_chunk], traffic[i:i + days_per_chunk]))
+                for i in range(0, len(dates), days_per_chunk)]
+
+    def _tag_chunk(self, data_frame, store_id):
+        """
+        Returns a generated chunk of shoppers tagged with its store. Overridden by tables
+        that generate the shoppers of several stores.
+        :param data_frame: a data frame of the shoppers of a chunk.
+        :param store_id: the ID of the store of the chunk from _chunk_tasks.
+        :return: the data frame of shoppers.
+        """
+        return data_frame
+
+    def __daily_traffic(self, store_model, dates=None):
+        """
+        Returns the dates of the time frame and their number of shoppers, computed
+        once from the holiday calendar of the time frame.
+        :param store_model: CompiledStoreModel object.
+        :param dates: the dates of the time frame, every date if None (optional).
+        :return: a tuple of the dates and a numpy array of the number of shoppers.
+        """
+        if dates is None:
+            dates = self.time_frame.dates
+        else:
+            dates = pd.DatetimeIndex(dates).normalize().sort_values()
+        holiday_calendar = self.time_frame.holiday_calendar(
+            store_model.holiday_modifiers.region)
+        return dates, store_model.daily_traffic(dates, holiday_calendar)
+
+    def to_csv(self, path, days_per_chunk=7, workers=1, compression=None, index=True,
+               data_frames=None):
+        """
+        Generates a csv of the shoppers given file path. The shoppers are written
+        chunk by chunk as they are generated if the table has not been created, so
+        memory stays bounded by the size of a chunk.
+        :param path: a filepath to save the generated shopper data
+        :param days_per_chunk: number of days generated and written at a time (default 7).
+        :param workers: number of processes generating the chunks (default 1).
+        :param compression: compression of the file, gzip, zstd or None (None).
+        :param index: whether to write the index of the data frame as the first
+        column (True).
+        :param data_frames: the chunks of shoppers to write, for chunks that are
+        written elsewhere as well, generated by the table if None (optional).
+        :return: None
+        """
+        data_frames = self.__iter_frames(days_per_chunk, workers, data_frames)
+        with _open_text(path, compression) as csv_file:
+            for i, data_frame in enumerate(data_frames):
+                schema.to_external(data_frame).to_csv(csv_file, header=i == 0, index=index)
+        return None
+
+    def to_shards(self, path, days_per_chunk=7, workers=1, data_frames=None):
+        """
+        Saves the shoppers as a shard store, one binary file per column for every chunk
+        of days and a JSON manifest, which from_shards opens again with memory mapping.
+        The shoppers are written chunk by chunk if the table has not been created.
+        :param path: the directory to save the shard store to.
+        :param days_per_chunk: number of days in each shard (default 7).
+        :param workers: number of processes generating the chunks (default 1).
+        :param data_frames: the chunks of shoppers to write, for chunks that are
+        written elsewhere as well, generated by the table if None (optional).
+        :return: the ShardStore.
+        """
+        return ShardStore.write(path, self.__iter_frames(days_per_chunk, workers, data_frames))
+
+    def to_parquet(self, path, days_per_chunk=7, workers=1, compression='snappy',
+                   data_frames=None):
+        """
+        Generates a Parquet file of the shoppers given file path, with one row group per
+        day so readers can skip the days they do not need. The shoppers are written chunk
+        by chunk if the table has not been created.
+        :param path: a filepath to save the generated shopper data
+        :param days_per_chunk: number of days generated and written at a time (default 7).
+        :param workers: number of processes generating the chunks (default 1).
+        :param compression: compression codec of the file, for example snappy, zstd, gzip
+        or None (snappy).
+        :param data_frames: the chunks of shoppers to write, for chunks that are
+        written elsewhere as well, generated by the table if None (optional).
+        :return: None
+        """
+        pyarrow = _import_pyarrow()
+        import pyarrow.parquet
+
+        writer = None
+        try:
+            for table in self.__iter_arrow_days(days_per_chunk, workers, data_frames):
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(path, table.schema,
+                                                           compression=compression or 'none')
+                writer.write_table(table, row_group_size=max(len(table), 1))
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def to_arrow(self, path, days_per_chunk=7, workers=1, compression=None,
+                 data_frames=None):
         """
-        Generates a csv of the shoppers given file path
+        Generates an Arrow IPC file of the shoppers given file path, with one record batch
+        per day. The shoppers are written chunk by chunk if the table has not been created.
         :param path: a filepath to save the generated shopper data
+        :param days_per_chunk: number of days generated and written at a time (default 7).
+        :param workers: number of processes generating the chunks (default 1).
+        :param compression: compression codec of the record batches, lz4, zstd or
+        None (None).
+        :param data_frames: the chunks of shoppers to write, for chunks that are
+        written elsewhere as well, generated by the table if None (optional).
         :return: None
         """
-        if self.data_frame is None:
-            self.create_table()
+        pyarrow = _import_pyarrow()
+
+        options = pyarrow.ipc.IpcWriteOptions(compression=compression)
+        writer = None
+        try:
+            for table in self.__iter_arrow_days(days_per_chunk, workers, data_frames):
+                if writer is None:
+                    writer = pyarrow.ipc.new_file(path, table.schema, options=options)
+                writer.write_table(table, max_chunksize=max(len(table), 1))
+        finally:
+            if writer is not None:
+                writer.close()
+
+    def __iter_frames(self, days_per_chunk, workers, data_frames=None):
+        """
+        Returns the given chunks, the created table, or generates the shoppers chunk by
+        chunk if the table has not been created.
+        :param days_per_chunk: number of days generated at a time.
+        :param workers: number of processes generating the chunks.
+        :param data_frames: the chunks of shoppers, if they were generated already
+        (optional).
+        :return: an iterable of data frames of shoppers.
+        """
+        if data_frames is not None:
+            return data_frames
+        if self.data_frame is not None:
+            return [self.data_frame]
+        return self.iter_chunks(days_per_chunk, workers)
+
+    def __iter_arrow_days(self, days_per_chunk, workers, data_frames=None):
+        """
+        Returns the shoppers as Arrow tables, one per day, in the external column types.
+        The tables share the schema of the first one.
+        :param days_per_chunk: number of days generated at a time.
+        :param workers: number of processes generating the chunks.
+        :param data_frames: the chunks of shoppers, if they were generated already
+        (optional).
+        :return: a generator of pyarrow Tables.
+        """
+        pyarrow = _import_pyarrow()
+
+        arrow_schema = None
+        for data_frame in self.__iter_frames(days_per_chunk, workers, data_frames):
+            table = pyarrow.Table.from_pandas(schema.to_external(data_frame),
+                                              schema=arrow_schema, preserve_index=False)
+            arrow_schema = table.schema
+            # the shoppers of a day are next to each other, so a day ends where the date changes
+            dates = data_frame['Date'].to_numpy()
+            bounds = np.concatenate(([0], np.flatnonzero(np.diff(dates)) + 1, [len(dates)]))
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                yield table.slice(start, end - start)
+
+
+def _create_columns(store_model, dates, traffic):
+    """
+    Creates the shoppers of the given dates. Runs in the worker processes when
+    the table is created with several workers.
+    :param store_model: CompiledStoreModel object.
+    :param dates: the dates to create shoppers for, in order.
+    :param traffic: the number of shoppers of each date.
+    :return: a dictionary of compact numpy column arrays {column: array}.
+    """
+    day_columns = []
+    for date, num_of_shoppers in zip(dates, traffic):
+        day = store_model.create_day(date, num_of_shoppers)
+        day.create_shoppers()
+        day_columns.append(day.shoppers)
+    return _merge_columns(day_columns)
+
+
+def _iter_columns(tasks, workers):
+    """
+    Creates the shoppers of each chunk of dates, in order. With several workers
+    only a bounded number of chunks is generated ahead of the consumer.
+    :param tasks: an iterable of chunks to generate, each a tuple of a CompiledStoreModel,
+    the dates and their number of shoppers.
+    :param workers: number of processes generating the chunks.
+    :return: a generator of dictionaries of column arrays {column: array}.
+    """
+    if workers <= 1:
+        for store_model, dates, traffic in tasks:
+            yield _create_columns(store_model, dates, traffic)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for store_model, dates, traffic in tasks:
+            pending.append(executor.submit(_create_columns, store_model, dates, traffic))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
 
-        return self.data_frame.to_csv(path)
+def _merge_columns(column_list):
+    """
+    Merges the column arrays of consecutive days or chunks of days, keeping their order.
+    :param column_list: a list of dictionaries of column arrays {column: array}.
+    :return: a dictionary of the merged column arrays {column: array}.
+    """
+    columns = {}
+    for key in schema.COLUMNS:
+        if key == 'DayOfWeek':
+            codes = np.concatenate([chunk[key].codes for chunk in column_list])
+            columns[key] = schema.day_names(codes)
+        else:
+            columns[key] = np.concatenate([chunk[key] for chunk in column_list]) \
+                .astype(schema.DTYPES[key], copy=False)
+    return columns
+
+
+def _to_frame(columns, first_id):
+    """
+    Returns a data frame of the shoppers, numbering them in arrival order starting
+    from first_id. The columns are already in date and arrival order.
+    :param columns: a dictionary of compact column arrays {column: array}.
+    :param first_id: the ShopperId of the first shopper.
+    :return: a data frame of the shoppers.
+    """
+    shopper_ids = pd.RangeIndex(first_id, first_id + len(columns['Date']))
+    data_frame = pd.DataFrame(columns, index=shopper_ids)
+    data_frame['ShopperId'] = shopper_ids
+    return data_frame
+
+
+def _open_text(path, compression):
+    """
+    Opens a text file for writing, compressing what is written to it.
+    :param path: path of the file.
+    :param compression: compression of the file, gzip, zstd or None.
+    :return: a writable text file object.
+    """
+    if compression is None:
+        return open(path, 'w', newline='')
+    if compression == 'gzip':
+        return gzip.open(path, 'wt', newline='')
+    if compression == 'zstd':
+        try:
+            import zstandard
+        except ImportError:
+            raise ImportError("Writing zstd files requires zstandard, "
+                              "install it with pip install zstandard.")
+        return zstandard.open(path, 'wt', newline='')
+    raise ValueError("Invalid. The compression ({}) is not supported, "
+                     "use gzip, zstd or None.".format(compression))
+
+
+def _import_pyarrow():
+    """
+    Imports pyarrow, which is only needed to write Parquet and Arrow files.
+    :return: the pyarrow module.
+    """
+    try:
+        import pyarrow
+        import pyarrow.ipc
+    except ImportError:
+        raise ImportError("Writing Parquet or Arrow files requires pyarrow, "
+                          "install it with pip install pyarrow.")
+    return pyarrow
@@ -0,0 +1,80 @@
+"""
+The time-series layout of a collection of shoppers: a MongoDB time-series collection
+with TimeIn as the time field and the parameter set and store as the meta field, and the
+rewriting of queries so they prune its buckets by time and meta.
+"""
+from datetime import timedelta
+
+# the options of the time-series collection, shoppers arrive minutes apart
+TIMESERIES_OPTIONS = {"timeField": "TimeIn", "metaField": "meta", "granularity": "minutes"}
+
+# fields of a shopper also stored in its meta field
+META_FIELDS = ["parameter_name", "StoreId"]
+
+
+def timeseries_query(query_dict):
+    """
+    Returns a query on shoppers rewritten for a time-series collection. Every condition
+    on a meta field is repeated on the meta field, and a condition on the Date is
+    repeated as a range of TimeIn, so MongoDB only unpacks the buckets of those dates,
+    stores and parameter sets. The rewritten query matches the same shoppers.
+    :param query_dict: a dictionary of a query on the shoppers.
+    :return: the rewritten query.
+    """
+    conditions = [query_dict] if query_dict else []
+    for field in META_FIELDS:
+        if field in query_dict:
+            conditions.append({"meta." + field: query_dict[field]})
+    time_range = _time_range(query_dict.get("Date"))
+    if time_range:
+        conditions.append({TIMESERIES_OPTIONS["timeField"]: time_range})
+    if len(conditions) < 2:
+        return query_dict
+    return {"$and": conditions}
+
+
+def _time_range(condition):
+    """
+    Returns the range of TimeIn of the shoppers matching a condition on their Date. Every
+    Date is a midnight, so each bound is first rounded to the midnight the Dates it lets
+    through start or end at.
+    :param condition: a date, or a dictionary of $gt, $gte, $lt, $lte or $in dates.
+    :return: a dictionary of $gte and $lt datetimes, empty if the condition has no bounds.
+    """
+    day = timedelta(days=1)
+    if condition is None:
+        return {}
+    if not isinstance(condition, dict):
+        return {"$gte": _floor(condition), "$lt": _floor(condition) + day}
+    time_range = {}
+    if condition.get("$in"):
+        time_range = {"$gte": _floor(min(condition["$in"])),
+                      "$lt": _floor(max(condition["$in"])) + day}
+    if "$gte" in condition:
+        time_range["$gte"] = _ceil(condition["$gte"])
+    if "$gt" in condition:
+        time_range["$gte"] = _floor(condition["$gt"]) + day
+    if "$lte" in condition:
+        time_range["$lt"] = _floor(condition["$lte"]) + day
+    if "$lt" in condition:
+        time_range["$lt"] = _ceil(condition["$lt"])
+    return time_range
+
+
+def _floor(date):
+    """
+    Returns the midnight at the start of the day of a datetime.
+    :param date: a datetime.
+    :return: the datetime at midnight.
+    """
+    return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _ceil(date):
+    """
+    Returns the first midnight at or after a datetime.
+    :param date: a datetime.
+    :return: the datetime itself at midnight, or the next midnight.
+    """
+    midnight = _floor(date)
+    return midnight if midnight == date else midnight + timedelta(days=1)
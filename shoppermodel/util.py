@@ -4,13 +4,25 @@ Utility functions
 import numpy as np
 
 
-def random_datetimes(minimum, maximum, size):
+def random_datetimes(minimum, maximum, size, rng=None):
     """
     Returns a numpy array of random values.
     :param minimum: minimum allowed value.
     :param maximum: maximum allowed value.
     :param size: size of the output array.
+    :param rng: numpy Generator to draw the values from (optional).
     :return: a numpy array of random values.
     """
-    result = np.random.rand(size) * (maximum - minimum) + minimum
+    if rng is None:
+        rng = np.random.default_rng()
+    result = rng.random(size) * (maximum - minimum) + minimum
     return result
+
+
+def seconds_since_midnight(a_time):
+    """
+    Returns the number of seconds between midnight and the given time.
+    :param a_time: a datetime.time object.
+    :return: the number of seconds since midnight as an integer.
+    """
+    return a_time.hour * 3600 + a_time.minute * 60 + a_time.second
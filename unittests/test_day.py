@@ -0,0 +1,118 @@
+"""
+Tests for the Day class
+"""
+from datetime import datetime
+from unittest import TestCase
+
+import pandas as pd
+
+from configuration import HolidayModifiers, Rush, SeniorDiscount, StoreModel, DayModifiers
+from shoppermodel import Day, to_external
+
+
+def create_store_model():
+    """
+    Returns a StoreModel initialized with the default parameters.
+    :return: a StoreModel.
+    """
+    lunch_rush = Rush("12:00", "13:00", 10, 0.1)
+    dinner_rush = Rush("17:00", "18:30", 10, 0.15)
+    senior_discount = SeniorDiscount("10:00", "12:00", 45, 60, 0.2)
+    avg_shopper_traffic = {"Monday": 800, "Tuesday": 1000, "Wednesday": 1200,
+                           "Thursday": 900, "Friday": 2500, "Saturday": 4000,
+                           "Sunday": 5000}
+    return StoreModel(lunch_rush, dinner_rush, HolidayModifiers(), DayModifiers(),
+                      senior_discount, avg_shopper_traffic)
+
+
+class TestDay(TestCase):
+    """
+    Test class for the day.py
+    """
+
+    def setUp(self):
+        self.store_model = create_store_model()
+
+    def test_create_shoppers_columns(self):
+        """
+        Test that every column holds one value per shopper and that the shoppers arrive
+        while the store is open.
+        """
+        date = pd.Timestamp("2020-01-08")
+        day = Day(self.store_model, 500, date)
+        day.create_shoppers()
+
+        self.assertEqual(["Date", "DayOfWeek", "TimeIn", "TimeSpent", "IsSenior", "IsSunny"],
+                         list(day.shoppers))
+        for value in day.shoppers.values():
+            self.assertEqual(500, len(value))
+        self.assertEqual("int32", day.shoppers["TimeIn"].dtype)
+        self.assertEqual("float32", day.shoppers["TimeSpent"].dtype)
+
+        shoppers = to_external(pd.DataFrame(day.shoppers))
+        self.assertGreaterEqual(shoppers["TimeIn"].min(), datetime(2020, 1, 8, 6, 0))
+        self.assertLess(shoppers["TimeIn"].max(), datetime(2020, 1, 8, 21, 0))
+        self.assertTrue((shoppers["Date"] == date).all())
+        self.assertTrue((shoppers["DayOfWeek"] == "Wednesday").all())
+
+    def test_senior_day(self):
+        """
+        Test that every shopper on the senior discount day arrives during senior hours.
+        """
+        day = Day(self.store_model, 500, pd.Timestamp("2020-01-07"))
+        day.create_shoppers()
+
+        time_in = to_external(pd.DataFrame(day.shoppers))["TimeIn"]
+        self.assertTrue((time_in >= datetime(2020, 1, 7, 10, 0)).all())
+        self.assertTrue((time_in <= datetime(2020, 1, 7, 12, 0)).all())
+
+    def test_weekend_time_spent(self):
+        """
+        Test that shoppers on a cloudy weekend spend the weekend time in the store.
+        """
+        day = Day(self.store_model, 500, pd.Timestamp("2020-01-04"))
+        day.is_sunny = False
+        day.create_shoppers()
+
+        weekend_time_spent = self.store_model.day_modifiers.weekend_time_spent
+        self.assertTrue((day.shoppers["TimeSpent"] == weekend_time_spent).all())
+
+    def test_seeded_days_are_reproducible(self):
+        """
+        Test that a seeded store model creates the same shoppers for a date, regardless of
+        the order the days are created in.
+        """
+        self.store_model.seed = 42
+        first = self.store_model.create_day(pd.Timestamp("2020-01-08"))
+        self.store_model.create_day(pd.Timestamp("2020-01-09")).create_shoppers()
+        second = self.store_model.create_day(pd.Timestamp("2020-01-08"))
+        first.create_shoppers()
+        second.create_shoppers()
+
+        for key, value in first.shoppers.items():
+            self.assertTrue((value == second.shoppers[key]).all())
+
+        self.store_model.seed = 43
+        third = self.store_model.create_day(pd.Timestamp("2020-01-08"))
+        third.create_shoppers()
+        self.assertFalse((first.shoppers["TimeIn"] == third.shoppers["TimeIn"]).all())
+
+    def test_compiled_store_model(self):
+        """
+        Test that the compiled store model holds the times as seconds since midnight and
+        creates the same day as the store model.
+        """
+        self.store_model.seed = 42
+        compiled = self.store_model.compile()
+        self.assertEqual(6 * 3600, compiled.open_time)
+        self.assertEqual(21 * 3600, compiled.close_time)
+        self.assertEqual((12 * 3600, 13 * 3600), compiled.lunch_rush[:2])
+        self.assertEqual(1, compiled.senior_discount.weekday)
+
+        date = pd.Timestamp("2020-01-07")
+        expected = self.store_model.create_day(date, 300)
+        actual = compiled.create_day(date, 300)
+        expected.create_shoppers()
+        actual.create_shoppers()
+        for key, value in expected.shoppers.items():
+            self.assertTrue((value == actual.shoppers[key]).all())
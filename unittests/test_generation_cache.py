@@ -0,0 +1,90 @@
+"""
+Tests for the GenerationCache class
+"""
+import os
+import tempfile
+from unittest import TestCase
+
+import pandas as pd
+
+from configuration import TimeFrame
+from configuration.parameter_set import normalize_parameters
+from shoppermodel import GenerationCache, ShopperTable
+from shoppermodel.pipeline import tee
+from test_day import create_store_model
+from test_parameter_set import create_parameter_set
+
+
+class TestGenerationCache(TestCase):
+    """
+    Test class for the generation_cache.py
+    """
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.time_frame = TimeFrame("2020-01-01", "2020-01-10")
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_key(self):
+        """
+        Test that parameter documents generating the same shoppers have the same key.
+        """
+        parameter_set = create_parameter_set()
+        same = create_parameter_set()
+        same["name"] = "other"
+        same["start_date"] = "2020-1-1"
+        same["open_time"] = "06:00:00"
+        same["lunch_rush"]["time_spent"] = 10.0
+        key = GenerationCache.key(normalize_parameters(parameter_set, 5))
+
+        self.assertEqual(key, GenerationCache.key(normalize_parameters(same, 5)))
+        self.assertNotEqual(key, GenerationCache.key(normalize_parameters(parameter_set, 6)))
+
+    def test_put_and_get(self):
+        """
+        Test that the cached shoppers are the ones that were generated.
+        """
+        cache = GenerationCache(self.folder.name)
+        self.assertIsNone(cache.get("a"))
+
+        expected = ShopperTable(create_store_model(), self.time_frame, seed=7).create_table()
+        cache.put("a", ShopperTable(create_store_model(), self.time_frame, seed=7))
+        self.assertTrue(expected.equals(cache.get("a").create_table()))
+
+    def test_put_while_consumed(self):
+        """
+        Test that chunks teed to the cache are cached once the last one is consumed, and
+        not at all if the consumer stops early.
+        """
+        cache = GenerationCache(self.folder.name)
+        shopper_table = ShopperTable(create_store_model(), self.time_frame, seed=7)
+        chunks = tee(shopper_table.iter_chunks(3),
+                     lambda data_frames: cache.put("a", shopper_table, data_frames=data_frames))
+        next(chunks)
+        chunks.close()
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual([], os.listdir(self.folder.name))
+
+        chunks = tee(shopper_table.iter_chunks(3),
+                     lambda data_frames: cache.put("a", shopper_table, data_frames=data_frames))
+        expected = pd.concat(list(chunks))
+        self.assertTrue(expected.equals(cache.get("a").create_table()))
+
+    def test_evict_least_recently_used(self):
+        """
+        Test that the least recently used shoppers are deleted once the cache is full.
+        """
+        cache = GenerationCache(self.folder.name)
+        cache.put("a", ShopperTable(create_store_model(), self.time_frame, seed=1))
+        cache.max_bytes = cache.size() * 2.5
+        cache.put("b", ShopperTable(create_store_model(), self.time_frame, seed=2))
+        os.utime(os.path.join(self.folder.name, "a", "manifest.json"), (0, 0))
+        os.utime(os.path.join(self.folder.name, "b", "manifest.json"), (1, 1))
+        cache.get("a")
+        cache.put("c", ShopperTable(create_store_model(), self.time_frame, seed=3))
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
@@ -3,7 +3,10 @@ Tests for the holiday modifiers class
 """
 from unittest import TestCase
 from datetime import date, timedelta
-from configuration import HolidayModifiers
+
+import pandas as pd
+
+from configuration import HolidayCalendar, HolidayModifiers
 
 
 class TestHolidayModifiers(TestCase):
@@ -55,3 +58,31 @@ class TestHolidayModifiers(TestCase):
         self.assertEqual(self.num_of_shoppers,
                          self.holiday_modifiers
                          .apply_holiday_modifier(test_date, self.num_of_shoppers))
+
+    def test_holiday_calendar(self):
+        """
+        Test that the precomputed calendar gives the kind and multiplier of known dates
+        """
+        dates = pd.DatetimeIndex(["2020-11-26", "2020-12-24", "2020-06-29", "2020-07-02",
+                                  "2020-07-05"])
+        calendar = HolidayCalendar("2020-06-01", "2020-12-31")
+        kinds = calendar.kinds_of(dates)
+
+        # Thanksgiving, the day before Christmas, a week before and the day before the
+        # observed Independence Day on Friday July 3, and the day after July 4
+        self.assertEqual([HolidayCalendar.HOLIDAY, HolidayCalendar.DAY_BEFORE,
+                          HolidayCalendar.WEEK_BEFORE, HolidayCalendar.DAY_BEFORE,
+                          HolidayCalendar.NONE], list(kinds))
+        self.assertEqual([0.2, 1.4, 1.15, 1.4, 1.0],
+                         [round(multiplier, 2) for multiplier
+                          in self.holiday_modifiers.multipliers(kinds)])
+
+    def test_region(self):
+        """
+        Test that the holidays follow the configured region
+        """
+        canada = HolidayModifiers(region="CA")
+        canada_day = date.fromisoformat("2020-07-01")
+        self.assertTrue(canada_day in canada.holidays)
+        self.assertFalse(canada_day in self.holiday_modifiers.holidays)
+        self.assertRaises(AttributeError, HolidayModifiers, region="XX")
@@ -0,0 +1,46 @@
+"""
+Tests for the index advisor in indexes.py
+"""
+from datetime import datetime
+from unittest import TestCase
+
+from shoppermodel.indexes import SHOPPER_INDEXES, is_covered, query_shape, suggest_index
+from shoppermodel.pagination import PAGE_SORT, encode_token, keyset_query
+
+
+class TestIndexes(TestCase):
+    """
+    Test class for the indexes.py
+    """
+
+    def test_query_shape(self):
+        """
+        Test that a query shape keeps the fields of the query, not its values.
+        """
+        shape = query_shape({"$and": [{"Date": {"$gte": 1, "$lte": 2}}, {"IsSenior": True}]},
+                            [("TimeIn", 1)])
+        self.assertEqual((("IsSenior",), ("TimeIn",), ("Date",)), shape)
+        self.assertEqual(shape, query_shape({"IsSenior": False, "Date": {"$gt": 5}},
+                                            {"TimeIn": -1}))
+        self.assertEqual([("IsSenior", 1), ("TimeIn", 1), ("Date", 1)], suggest_index(shape))
+
+    def test_is_covered(self):
+        """
+        Test that an index serves the queries on its leading fields only.
+        """
+        index_keys = [[("_id", 1)], [("StoreId", 1), ("Date", 1)]]
+        self.assertTrue(is_covered(query_shape({"Date": 1, "StoreId": "north"}), index_keys))
+        self.assertTrue(is_covered(query_shape({"StoreId": "north", "Date": {"$gt": 1}}),
+                                   index_keys))
+        self.assertTrue(is_covered(query_shape({"_id": 5}), index_keys))
+        self.assertFalse(is_covered(query_shape({"Date": 1}), index_keys))
+        self.assertFalse(is_covered(query_shape({"StoreId": "north"}, [("TimeIn", 1)]),
+                                    index_keys))
+
+    def test_page_covered(self):
+        """
+        Test that the pages of shoppers are served by the indexes of the shoppers.
+        """
+        token = encode_token({"TimeIn": datetime(2020, 1, 4, 9, 30), "_id": 120})
+        for page_query in [keyset_query({}), keyset_query({}, token)]:
+            self.assertTrue(is_covered(query_shape(page_query, PAGE_SORT), SHOPPER_INDEXES))
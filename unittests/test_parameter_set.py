@@ -0,0 +1,89 @@
+"""
+Tests for the parameter_set.py functions
+"""
+import copy
+from unittest import TestCase
+
+from configuration.parameter_set import affected_dates, create_config
+from shoppermodel import ShopperTable, schema
+from test_store_fleet import create_manifest
+
+
+def create_parameter_set():
+    """
+    Returns a parameter document with the default parameters.
+    :return: the parameter document as a dictionary.
+    """
+    manifest = create_manifest([])
+    parameter_set = copy.deepcopy(manifest["defaults"])
+    parameter_set["start_date"] = "2020-01-01"
+    parameter_set["end_date"] = "2020-01-31"
+    parameter_set["seed"] = 5
+    return parameter_set
+
+
+class TestParameterSet(TestCase):
+    """
+    Test class for the parameter_set.py
+    """
+
+    def setUp(self):
+        self.old = create_parameter_set()
+        self.new = create_parameter_set()
+
+    def test_senior_discount_affects_senior_days(self):
+        """
+        Test that changing the senior discount affects only the old and new senior day.
+        """
+        self.new["senior_discount"]["max_time_spent"] = 90
+        dates = affected_dates(self.old, self.new)
+        self.assertEqual({"Tuesday"}, set(dates.day_name()))
+        self.assertEqual(4, len(dates))
+
+        self.new["senior_discount"]["day"] = "Thursday"
+        dates = affected_dates(self.old, self.new)
+        self.assertEqual({"Tuesday", "Thursday"}, set(dates.day_name()))
+
+    def test_weekend_and_traffic_fields(self):
+        """
+        Test that the weekend time spent affects weekends and the traffic of a day of
+        the week affects only that day.
+        """
+        self.new["day_modifiers"]["weekend_time_spent"] = 45
+        self.assertEqual({"Saturday", "Sunday"}, set(affected_dates(self.old, self.new)
+                                                     .day_name()))
+
+        self.new = create_parameter_set()
+        self.new["daily_average_traffic"]["Monday"] = 700
+        self.assertEqual({"Monday"}, set(affected_dates(self.old, self.new).day_name()))
+
+    def test_every_day_and_unused_fields(self):
+        """
+        Test that the rushes affect every date and unused parameters affect none.
+        """
+        self.new["day_modifiers"]["sunny_traffic_percent"] = 0.9
+        self.assertEqual(0, len(affected_dates(self.old, self.new)))
+
+        self.new["lunch_rush"]["percent"] = 0.3
+        self.assertEqual(31, len(affected_dates(self.old, self.new)))
+
+    def test_unaffected_dates_unchanged(self):
+        """
+        Test that regenerating every date leaves the shoppers of the unaffected dates
+        unchanged.
+        """
+        self.new["holiday_modifiers"]["holiday_percent"] = 0.5
+        self.new["day_modifiers"]["weekend_time_spent"] = 45
+        dates = affected_dates(self.old, self.new)
+
+        self.assertLess(0, len(dates))
+
+        old_frame = ShopperTable(*create_config(self.old)).create_table()
+        new_table = ShopperTable(*create_config(self.new))
+        new_frame = new_table.create_table()
+        columns = ["Date", "TimeIn", "TimeSpent", "IsSenior", "IsSunny"]
+        for date in new_table.time_frame.dates.difference(dates):
+            day = schema.date_index(date)
+            old_day = old_frame[old_frame["Date"] == day][columns].reset_index(drop=True)
+            new_day = new_frame[new_frame["Date"] == day][columns].reset_index(drop=True)
+            self.assertTrue(old_day.equals(new_day))
@@ -0,0 +1,94 @@
+"""
+Tests for the run_pipeline and tee functions
+"""
+import threading
+from unittest import TestCase
+
+from shoppermodel.pipeline import run_pipeline, tee
+
+
+class TestPipeline(TestCase):
+    """
+    Test class for the pipeline.py
+    """
+
+    def test_consumes_every_item(self):
+        """
+        Test that every item is consumed once by the consumer threads.
+        """
+        consumed = []
+        lock = threading.Lock()
+
+        def consume(item):
+            with lock:
+                consumed.append(item)
+
+        run_pipeline(range(100), consume, consumers=3, queue_size=2)
+        self.assertEqual(list(range(100)), sorted(consumed))
+
+    def test_back_pressure(self):
+        """
+        Test that the producer waits for the consumer once the queue is full.
+        """
+        release = threading.Event()
+        produced = []
+
+        def items():
+            for item in range(10):
+                produced.append(item)
+                yield item
+
+        thread = threading.Thread(target=run_pipeline,
+                                  args=(items(), lambda item: release.wait(), 1, 2))
+        thread.start()
+        thread.join(0.2)
+        # one item held by the consumer, two in the queue and one waiting to be put
+        self.assertLessEqual(len(produced), 4)
+        release.set()
+        thread.join()
+        self.assertEqual(10, len(produced))
+
+    def test_consumer_error(self):
+        """
+        Test that an error of a consumer stops the producer and is raised.
+        """
+        def consume(item):
+            if item == 5:
+                raise RuntimeError("insert failed")
+
+        with self.assertRaises(RuntimeError):
+            run_pipeline(range(1000), consume, consumers=2)
+
+
+    def test_tee(self):
+        """
+        Test that the caller and the consumer of tee both get every item, in order.
+        """
+        consumed = []
+        self.assertEqual(list(range(100)), list(tee(range(100), consumed.extend, 2)))
+        self.assertEqual(list(range(100)), consumed)
+
+    def test_tee_stopped(self):
+        """
+        Test that the consumer of tee sees an error when the caller stops early, and that
+        an error of the consumer is raised to the caller.
+        """
+        errors = []
+
+        def consume(items):
+            try:
+                list(items)
+            except Exception as err:
+                errors.append(err)
+                raise
+
+        items = tee(range(100), consume)
+        next(items)
+        items.close()
+        self.assertEqual(1, len(errors))
+
+        def fail(items):
+            raise RuntimeError("write failed")
+
+        with self.assertRaises(RuntimeError):
+            list(tee(range(1000), fail))
@@ -6,7 +6,7 @@ from unittest import TestCase
 from pymongo import DESCENDING
 
 from configuration import *
-from shoppermodel import ShopperTable, ShopperDatabase
+from shoppermodel import ShopperTable, ShopperDatabase, to_external
 
 
 def read_commands():
@@ -161,8 +161,7 @@ class TestShopperDatabase(TestCase):
         args = read_commands()
         cls.store_model, cls.time_frame = create_config(args)
         cls.shopper_table = ShopperTable(cls.store_model, cls.time_frame)
-        cls.data_frame = cls.shopper_table.create_table()
-        cls.data_frame["TimeIn"] = cls.data_frame["TimeIn"].astype("datetime64[s]")
+        cls.data_frame = to_external(cls.shopper_table.create_table())
 
         cls.database = ShopperDatabase()
         cls.database.connect_to_client()
@@ -0,0 +1,289 @@
+"""Tests the bulk ingest of the ShopperDatabase class with an in-process MongoDB."""
+from datetime import datetime
+from unittest import TestCase, skipUnless
+
+import pandas as pd
+
+from configuration import StoreFleet, TimeFrame
+from shoppermodel import FleetTable, ShopperDatabase, ShopperTable, to_external
+from test_day import create_store_model
+from test_store_fleet import create_manifest
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+@skipUnless(mongomock, "mongomock is not installed")
+class TestShopperDatabaseIngest(TestCase):
+    """
+    Tests populate_shopper_database against mongomock.
+    """
+
+    def setUp(self):
+        self.database = ShopperDatabase()
+        self.database.client = mongomock.MongoClient()
+        self.database.database = self.database.client[self.database.database_name]
+        self.time_frame = TimeFrame("2020-01-01", "2020-01-10")
+
+    def test_populate_in_batches(self):
+        """
+        Tests that the batched documents match the records of the table.
+        """
+        expected = ShopperTable(create_store_model(), self.time_frame, seed=7).create_table()
+        shopper_table = ShopperTable(create_store_model(), self.time_frame, seed=7)
+        self.database.populate_shopper_database(shopper_table, "shoppers", days_per_chunk=3,
+                                                batch_size=1000, writers=3)
+
+        collection = self.database.database["shoppers"]
+        self.assertEqual(len(expected), collection.count_documents({}))
+        records = to_external(expected.iloc[[0, 4321, -1]]).to_dict("records")
+        for record in records:
+            document = collection.find_one({"_id": record["ShopperId"]})
+            record["_id"] = record["ShopperId"]
+            record["parameter_name"] = "shoppers"
+            record["Date"] = record["Date"].to_pydatetime()
+            record["TimeIn"] = record["TimeIn"].to_pydatetime()
+            self.assertEqual(record, document)
+
+    def test_replace_days(self):
+        """
+        Tests that replacing days swaps only the shoppers of those days and gives the
+        new shoppers unused ShopperIds.
+        """
+        store_model = create_store_model()
+        self.database.populate_shopper_database(
+            ShopperTable(store_model, self.time_frame, seed=7), "shoppers")
+        collection = self.database.database["shoppers"]
+        count = collection.count_documents({})
+        untouched = collection.find_one({"Date": datetime(2020, 1, 2)})
+
+        store_model.avg_shopper_traffic["Tuesday"] = 100
+        dates = pd.DatetimeIndex(["2020-01-07"])
+        deleted = self.database.replace_days(ShopperTable(store_model, self.time_frame, seed=7),
+                                             "shoppers", dates)
+
+        self.assertEqual(100, collection.count_documents({"Date": datetime(2020, 1, 7)}))
+        self.assertEqual(count - deleted + 100, collection.count_documents({}))
+        self.assertEqual(untouched, collection.find_one({"_id": untouched["_id"]}))
+        replaced = collection.find_one({"Date": datetime(2020, 1, 7)})
+        self.assertGreaterEqual(replaced["_id"], count)
+
+    def test_append_days(self):
+        """
+        Tests that appending days to a collection gives the same shoppers as generating
+        the whole time frame at once.
+        """
+        self.database.populate_shopper_database(
+            ShopperTable(create_store_model(), self.time_frame, seed=7), "shoppers")
+        time_frame = TimeFrame("2020-01-01", "2020-01-20")
+        appended = self.database.append_days(
+            ShopperTable(create_store_model(), time_frame, seed=7), "shoppers")
+        self.assertEqual(10, appended)
+        self.assertEqual(0, self.database.append_days(
+            ShopperTable(create_store_model(), time_frame, seed=7), "shoppers"))
+
+        expected = ShopperTable(create_store_model(), time_frame, seed=7).create_table()
+        collection = self.database.database["shoppers"]
+        self.assertEqual(len(expected), collection.count_documents({}))
+        last = collection.find_one({"_id": len(expected) - 1})
+        self.assertEqual(datetime(2020, 1, 20), last["Date"])
+        self.assertAlmostEqual(float(expected["TimeSpent"].iloc[-1]), last["TimeSpent"])
+
+    def test_fleet_days(self):
+        """
+        Tests that the days of a fleet of stores are replaced and appended with unused
+        ShopperIds.
+        """
+        manifest = create_manifest([{"store_id": "north"}, {"store_id": "south"}])
+        traffic = manifest["defaults"]["daily_average_traffic"]
+        manifest["defaults"]["daily_average_traffic"] = dict.fromkeys(traffic, 100)
+        manifest["end_date"] = "2020-01-05"
+        self.database.populate_shopper_database(FleetTable(StoreFleet.from_dict(manifest)),
+                                                "fleet")
+        collection = self.database.database["fleet"]
+        count = collection.count_documents({})
+
+        manifest["stores"][1]["daily_average_traffic"] = {"Friday": 50}
+        deleted = self.database.replace_days(FleetTable(StoreFleet.from_dict(manifest)),
+                                             "fleet", pd.DatetimeIndex(["2020-01-03"]))
+        self.assertEqual(50, collection.count_documents({"Date": datetime(2020, 1, 3),
+                                                         "StoreId": "south"}))
+        self.assertEqual(count - deleted + 150, collection.count_documents({}))
+        replaced = collection.find_one({"Date": datetime(2020, 1, 3)}, sort=[("_id", 1)])
+        self.assertGreaterEqual(replaced["_id"], count)
+
+        manifest["end_date"] = "2020-01-08"
+        self.assertEqual(3, self.database.append_days(
+            FleetTable(StoreFleet.from_dict(manifest)), "fleet"))
+        expected = FleetTable(StoreFleet.from_dict(manifest)).create_table()
+        self.assertEqual(len(expected), collection.count_documents({}))
+
+    def test_rollups(self):
+        """
+        Tests that the rollups written at ingest match the shoppers and follow a
+        replacement of days.
+        """
+        store_model = create_store_model()
+        self.database.populate_shopper_database(
+            ShopperTable(store_model, self.time_frame, seed=7), "shoppers", days_per_chunk=3)
+        collection = self.database.database["shoppers"]
+
+        daily = self.database.summary("shoppers")
+        self.assertEqual(10, daily["count"])
+        first = daily["documents"][0]
+        shoppers = list(collection.find({"Date": datetime(2020, 1, 1)}))
+        self.assertEqual(len(shoppers), first["count"])
+        self.assertEqual("Wednesday", first["DayOfWeek"])
+        self.assertAlmostEqual(sum(shopper["TimeSpent"] for shopper in shoppers) / len(shoppers),
+                               first["mean_time_spent"], places=4)
+        hourly = self.database.summary("shoppers", "hour", {"Date": datetime(2020, 1, 1)})
+        self.assertEqual(len(shoppers), sum(rollup["count"] for rollup in hourly["documents"]))
+        with self.assertRaises(ValueError):
+            self.database.summary("shoppers", "week")
+
+        store_model.avg_shopper_traffic["Tuesday"] = 100
+        self.database.replace_days(ShopperTable(store_model, self.time_frame, seed=7),
+                                   "shoppers", pd.DatetimeIndex(["2020-01-07"]))
+        daily = self.database.summary("shoppers", query_dict={"Date": datetime(2020, 1, 7)})
+        self.assertEqual(1, daily["count"])
+        self.assertEqual(100, daily["documents"][0]["count"])
+
+    def test_indexes(self):
+        """
+        Tests that the declared indexes are created after the load and that the advisor
+        suggests an index for a query shape no index serves.
+        """
+        self.database.populate_shopper_database(
+            ShopperTable(create_store_model(), self.time_frame, seed=7), "shoppers")
+        indexes = self.database.database["shoppers"].index_information()
+        self.assertIn([("Date", 1), ("TimeIn", 1)],
+                      [index["key"] for index in indexes.values()])
+
+        self.database.query({"Date": datetime(2020, 1, 2)}, collection_name="shoppers")
+        self.database.query({"IsSenior": True, "Date": {"$gte": datetime(2020, 1, 2)}},
+                            collection_name="shoppers", limit=5)
+        report = self.database.index_report("shoppers")["collections"]["shoppers"]
+        self.assertEqual([{"index": [["IsSenior", 1], ["Date", 1]], "queries": 1}],
+                         report["suggestions"])
+
+    def test_bucketed_layout(self):
+        """
+        Tests that querying and aggregating hourly buckets gives the same shoppers as
+        the shopper layout, and that appending days to buckets continues the ShopperIds.
+        """
+        store_model = create_store_model()
+        for day in store_model.avg_shopper_traffic:
+            store_model.avg_shopper_traffic[day] = 300
+        time_frame = TimeFrame("2020-01-03", "2020-01-04")
+        self.database.populate_shopper_database(
+            ShopperTable(store_model, time_frame, seed=7), "shoppers")
+        query_dict = {"Date": datetime(2020, 1, 4), "TimeSpent": {"$gt": 30}}
+        sort_list = [("_id", 1)]
+        expected = self.database.query(query_dict, sort_list, "shoppers")
+        pipeline = [{"$match": {"IsSenior": True}},
+                    {"$group": {"_id": "$DayOfWeek", "count": {"$sum": 1}}},
+                    {"$sort": {"_id": 1}}]
+        expected_groups = list(self.database.aggregate(pipeline, "shoppers"))
+
+        self.database.populate_shopper_database(
+            ShopperTable(store_model, time_frame, seed=7), "buckets",
+            days_per_chunk=1, batch_size=1000, layout="hour")
+        collection = self.database.database["buckets"]
+        self.assertEqual(self.database.summary("buckets", "hour")["count"],
+                         collection.count_documents({}))
+        result = self.database.query(query_dict, sort_list, "buckets")
+        self.assertEqual(expected["count"], result["count"])
+        self.assertEqual([dict(shopper, parameter_name="buckets")
+                          for shopper in expected["documents"]], result["documents"])
+        self.assertEqual(expected_groups, list(self.database.aggregate(pipeline, "buckets")))
+
+        time_frame = TimeFrame("2020-01-03", "2020-01-05")
+        self.database.append_days(ShopperTable(store_model, time_frame, seed=7),
+                                  "buckets")
+        full = ShopperTable(store_model, time_frame, seed=7).create_table()
+        last = collection.find_one(sort=[("_id", -1)])
+        self.assertEqual(len(full) - 1, last["ShopperId"][-1])
+        self.assertEqual(len(full), sum(bucket["count"] for bucket in collection.find()))
+
+    def test_page(self):
+        """
+        Tests that walking the pages of a query visits every matching shopper once, in
+        arrival order, for the shopper and the bucketed layouts.
+        """
+        store_model = create_store_model()
+        for day in store_model.avg_shopper_traffic:
+            store_model.avg_shopper_traffic[day] = 100
+        time_frame = TimeFrame("2020-01-03", "2020-01-05")
+        query_dict = {"Date": {"$gte": datetime(2020, 1, 4)}}
+        for layout in ["shopper", "hour"]:
+            self.database.populate_shopper_database(
+                ShopperTable(store_model, time_frame, seed=7), layout, layout=layout)
+            # the seniors are not matched until the buckets are unwound
+            for page_query in [query_dict, dict(query_dict, IsSenior=True)]:
+                expected = self.database.query(page_query, [("TimeIn", 1), ("_id", 1)], layout)
+
+                shopper_ids = []
+                token = None
+                while True:
+                    page = self.database.page(page_query, layout, page_size=30, token=token)
+                    self.assertLessEqual(len(page["documents"]), 30)
+                    shopper_ids += [shopper["_id"] for shopper in page["documents"]]
+                    token = page["next"]
+                    if token is None:
+                        break
+                self.assertEqual([shopper["_id"] for shopper in expected["documents"]],
+                                 shopper_ids)
+
+        with self.assertRaises(ValueError):
+            self.database.page(query_dict, "hour", token="not a token")
+
+    def test_fields(self):
+        """
+        Tests that queries and pages return only the fields asked for.
+        """
+        store_model = create_store_model()
+        for day in store_model.avg_shopper_traffic:
+            store_model.avg_shopper_traffic[day] = 100
+        time_frame = TimeFrame("2020-01-03", "2020-01-04")
+        fields = ["TimeIn", "TimeSpent"]
+        for layout in ["shopper", "day"]:
+            self.database.populate_shopper_database(
+                ShopperTable(store_model, time_frame, seed=7), layout, layout=layout)
+            result = self.database.query({"IsSenior": False}, [("TimeIn", 1)], layout,
+                                         fields=fields)
+            self.assertEqual([set(fields)] * result["count"],
+                             [set(shopper) for shopper in result["documents"]])
+            page = self.database.page({}, layout, page_size=5, fields=["TimeSpent", "_id"])
+            self.assertEqual({"TimeSpent", "_id"}, set(page["documents"][0]))
+            self.assertIsNotNone(page["next"])
+
+    def test_counts(self):
+        """
+        Tests that a query counts its documents exactly, estimates the count of an
+        unfiltered query when asked to and leaves the count out when it isn't wanted.
+        """
+        store_model = create_store_model()
+        for day in store_model.avg_shopper_traffic:
+            store_model.avg_shopper_traffic[day] = 100
+        self.database.populate_shopper_database(
+            ShopperTable(store_model, TimeFrame("2020-01-03", "2020-01-04"), seed=7),
+            "shoppers")
+        total = self.database.database["shoppers"].count_documents({})
+        seniors = self.database.query({"IsSenior": True}, collection_name="shoppers")
+
+        result = self.database.query({"IsSenior": True}, collection_name="shoppers", limit=3)
+        self.assertEqual((seniors["count"], "exact", 3),
+                         (result["count"], result["count_type"], len(result["documents"])))
+        result = self.database.query({}, collection_name="shoppers", limit=3,
+                                     count="estimated")
+        self.assertEqual((total, "estimated"), (result["count"], result["count_type"]))
+        result = self.database.query({}, collection_name="shoppers", limit=3, count=None)
+        self.assertNotIn("count", result)
+        self.assertEqual(3, len(result["documents"]))
+
+        page = self.database.page({"IsSenior": True}, "shoppers", page_size=2, count="exact")
+        self.assertEqual((seniors["count"], "exact"), (page["count"], page["count_type"]))
+        with self.assertRaises(ValueError):
+            self.database.query({}, collection_name="shoppers", count="approximate")
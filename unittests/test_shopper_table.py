@@ -0,0 +1,135 @@
+"""
+Tests for the ShopperTable class
+"""
+import os
+import tempfile
+from unittest import TestCase, skipUnless
+
+import numpy as np
+import pandas as pd
+
+from configuration import TimeFrame
+from shoppermodel import ShardStore, ShopperTable, to_external
+from test_day import create_store_model
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+class TestShopperTable(TestCase):
+    """
+    Test class for the shopper_table.py
+    """
+
+    def setUp(self):
+        self.store_model = create_store_model()
+        self.time_frame = TimeFrame("2020-01-01", "2020-01-10")
+
+    def test_create_table_with_workers(self):
+        """
+        Test that generating the days in worker processes creates the same table
+        as generating them in this process.
+        """
+        expected = ShopperTable(self.store_model, self.time_frame, seed=7).create_table()
+        actual = ShopperTable(self.store_model, self.time_frame, seed=7).create_table(workers=2)
+        self.assertTrue(expected.equals(actual))
+
+    def test_iter_chunks(self):
+        """
+        Test that the chunks hold consecutive days and together make up the whole table.
+        """
+        expected = ShopperTable(self.store_model, self.time_frame, seed=7).create_table()
+        chunks = list(ShopperTable(self.store_model, self.time_frame, seed=7).iter_chunks(3))
+
+        self.assertEqual(4, len(chunks))
+        for chunk in chunks:
+            self.assertLessEqual(chunk["Date"].nunique(), 3)
+        self.assertTrue(expected.equals(pd.concat(chunks)))
+
+    def test_create_table_order(self):
+        """
+        Test that the table comes out in date and arrival order with ShopperIds
+        following that order.
+        """
+        data_frame = ShopperTable(self.store_model, self.time_frame).create_table()
+
+        sorted_frame = data_frame.sort_values(by=["Date", "TimeIn"], kind="stable")
+        self.assertTrue(sorted_frame.index.equals(data_frame.index))
+        self.assertEqual(list(range(len(data_frame))), data_frame["ShopperId"].tolist())
+
+    @skipUnless(pyarrow, "pyarrow is not installed")
+    def test_to_parquet(self):
+        """
+        Test that the Parquet file holds one row group per day and the same shoppers
+        as the table.
+        """
+        expected = ShopperTable(self.store_model, self.time_frame, seed=7).create_table()
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "shoppers.parquet")
+            ShopperTable(self.store_model, self.time_frame, seed=7).to_parquet(path, 3)
+            parquet_file = pyarrow.parquet.ParquetFile(path)
+            actual = parquet_file.read().to_pandas()
+
+            self.assertEqual(10, parquet_file.metadata.num_row_groups)
+        # the day names may come back as a string type instead of objects
+        pd.testing.assert_frame_equal(to_external(expected).reset_index(drop=True), actual,
+                                      check_dtype=False)
+
+    def test_to_csv_gzip(self):
+        """
+        Test that the compressed csv without the index holds the same shoppers as the table.
+        """
+        expected = ShopperTable(self.store_model, self.time_frame, seed=7).create_table()
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "shoppers.csv.gz")
+            ShopperTable(self.store_model, self.time_frame, seed=7).to_csv(
+                path, 3, compression="gzip", index=False)
+            actual = pd.read_csv(path, compression="gzip")
+
+        self.assertEqual(list(to_external(expected)), list(actual))
+        self.assertEqual(len(expected), len(actual))
+        self.assertEqual(expected["ShopperId"].tolist(), actual["ShopperId"].tolist())
+
+    def test_shards(self):
+        """
+        Test that the shoppers opened from a shard store are the ones that were saved,
+        memory mapped from the shard files.
+        """
+        expected = ShopperTable(self.store_model, self.time_frame, seed=7).create_table()
+        with tempfile.TemporaryDirectory() as folder:
+            ShopperTable(self.store_model, self.time_frame, seed=7).to_shards(folder, 3)
+            shopper_table = ShopperTable.from_shards(folder)
+            shards = list(shopper_table.iter_chunks())
+
+            self.assertEqual(4, len(shards))
+            base = shards[0]["TimeIn"].to_numpy()
+            while base is not None and not isinstance(base, np.memmap):
+                base = base.base
+            self.assertIsNotNone(base)
+            self.assertEqual(self.time_frame.dates.tolist(),
+                             shopper_table.time_frame.dates.tolist())
+            self.assertTrue(expected.equals(shopper_table.create_table()))
+            del shards, shopper_table
+
+    def test_shards_of_one_day(self):
+        """
+        Test that a shard store of the shoppers of a single day opens with a time frame
+        of that day, and that an empty shard store can't be opened.
+        """
+        data_frame = ShopperTable(self.store_model, self.time_frame, seed=7).create_table()
+        first_day = data_frame[data_frame["Date"] == data_frame["Date"].iloc[0]]
+        with tempfile.TemporaryDirectory() as folder:
+            ShardStore.write(folder, [first_day])
+            shopper_table = ShopperTable.from_shards(folder)
+            self.assertEqual(self.time_frame.dates[:1].tolist(),
+                             shopper_table.time_frame.dates.tolist())
+            self.assertTrue(first_day.equals(shopper_table.create_table()))
+            del shopper_table
+
+        with tempfile.TemporaryDirectory() as folder:
+            ShardStore.write(folder, [])
+            with self.assertRaises(ValueError):
+                ShopperTable.from_shards(folder)
@@ -0,0 +1,91 @@
+"""
+Tests for the StoreFleet and FleetTable classes
+"""
+from unittest import TestCase
+
+from configuration import StoreFleet
+from shoppermodel import FleetTable
+
+
+def create_manifest(stores):
+    """
+    Returns a fleet manifest with the default parameters for the given stores.
+    :param stores: list of store dictionaries with a store_id.
+    :return: the manifest as a dictionary.
+    """
+    defaults = {
+        "open_time": "06:00",
+        "close_time": "21:00",
+        "daily_average_traffic": {"Monday": 800, "Tuesday": 1000, "Wednesday": 1200,
+                                  "Thursday": 900, "Friday": 2500, "Saturday": 4000,
+                                  "Sunday": 5000},
+        "lunch_rush": {"start_time": "12:00", "end_time": "13:00", "time_spent": 10,
+                       "percent": 0.1},
+        "dinner_rush": {"start_time": "17:00", "end_time": "18:30", "time_spent": 10,
+                        "percent": 0.15},
+        "day_modifiers": {"min_time_spent": 6, "avg_time_spent": 25, "max_time_spent": 75,
+                          "weekend_time_spent": 60, "sunny_traffic_percent": 0.4,
+                          "sunny_chance_percent": 0.3, "sunny_time_spent": 15},
+        "holiday_modifiers": {"holiday_percent": 0.2, "day_before_percent": 0.4,
+                              "week_before_percent": 0.15},
+        "senior_discount": {"start_time": "10:00", "end_time": "12:00", "min_time_spent": 45,
+                            "max_time_spent": 60, "percent": 0.2, "day": "Tuesday"}
+    }
+    return {"start_date": "2020-01-01", "end_date": "2020-01-10", "seed": 11,
+            "defaults": defaults, "stores": stores}
+
+
+class TestStoreFleet(TestCase):
+    """
+    Test class for the store_fleet.py and fleet_table.py
+    """
+
+    def test_store_overrides(self):
+        """
+        Test that a store's parameters replace the shared parameters
+        """
+        manifest = create_manifest([{"store_id": "north"},
+                                    {"store_id": "south", "lunch_rush": {"percent": 0.3}}])
+        store_fleet = StoreFleet.from_dict(manifest)
+
+        self.assertEqual(0.1, store_fleet.store_models["north"].lunch_rush.percent)
+        self.assertEqual(0.3, store_fleet.store_models["south"].lunch_rush.percent)
+        self.assertEqual(10, store_fleet.store_models["south"].lunch_rush.time_spent)
+        self.assertNotEqual(store_fleet.store_models["north"].seed,
+                            store_fleet.store_models["south"].seed)
+
+    def test_store_seed(self):
+        """
+        Test that a store with a seed in the manifest keeps it and the other stores get
+        seeds derived from the seed of the fleet
+        """
+        manifest = create_manifest([{"store_id": "north", "seed": 0},
+                                    {"store_id": "south"}])
+        store_fleet = StoreFleet.from_dict(manifest)
+        derived = StoreFleet.from_dict(create_manifest([{"store_id": "south"}]))
+
+        self.assertEqual(0, store_fleet.store_models["north"].seed)
+        self.assertEqual(derived.store_models["south"].seed,
+                         store_fleet.store_models["south"].seed)
+
+        manifest["defaults"]["seed"] = 5
+        with self.assertRaises(ValueError):
+            StoreFleet.from_dict(manifest)
+
+    def test_fleet_table(self):
+        """
+        Test that every shopper is tagged with its store and that a store generates the
+        same shoppers no matter which other stores are in the fleet
+        """
+        both = StoreFleet.from_dict(create_manifest([{"store_id": "north"},
+                                                     {"store_id": "south"}]))
+        north = StoreFleet.from_dict(create_manifest([{"store_id": "north"}]))
+        both_frame = FleetTable(both).create_table(workers=2)
+        north_frame = FleetTable(north).create_table()
+
+        self.assertEqual({"north", "south"}, set(both_frame["StoreId"]))
+        self.assertTrue(both_frame["ShopperId"].is_unique)
+        columns = ["Date", "TimeIn", "TimeSpent", "IsSenior", "IsSunny"]
+        north_rows = both_frame[both_frame["StoreId"] == "north"][columns]
+        self.assertTrue(north_rows.reset_index(drop=True)
+                        .equals(north_frame[columns].reset_index(drop=True)))
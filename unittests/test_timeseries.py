@@ -0,0 +1,53 @@
+"""
+Tests for the query rewriting of time-series collections in timeseries.py
+"""
+from datetime import datetime
+from unittest import TestCase
+
+from shoppermodel.timeseries import timeseries_query
+
+
+class TestTimeseries(TestCase):
+    """
+    Test class for the timeseries.py
+    """
+
+    def test_date_range(self):
+        """
+        Test that a range of dates is repeated as a range of TimeIn covering whole days.
+        """
+        query_dict = {"Date": {"$gte": datetime(2020, 1, 2), "$lte": datetime(2020, 1, 5)},
+                      "StoreId": "north"}
+        self.assertEqual({"$and": [query_dict, {"meta.StoreId": "north"},
+                                   {"TimeIn": {"$gte": datetime(2020, 1, 2),
+                                               "$lt": datetime(2020, 1, 6)}}]},
+                         timeseries_query(query_dict))
+
+    def test_dates(self):
+        """
+        Test that a date and a list of dates are repeated as ranges of TimeIn.
+        """
+        query_dict = {"Date": datetime(2020, 1, 2)}
+        self.assertEqual({"TimeIn": {"$gte": datetime(2020, 1, 2), "$lt": datetime(2020, 1, 3)}},
+                         timeseries_query(query_dict)["$and"][1])
+        query_dict = {"Date": {"$in": [datetime(2020, 1, 9), datetime(2020, 1, 2)]}}
+        self.assertEqual({"TimeIn": {"$gte": datetime(2020, 1, 2), "$lt": datetime(2020, 1, 10)}},
+                         timeseries_query(query_dict)["$and"][1])
+        self.assertEqual({"IsSenior": True}, timeseries_query({"IsSenior": True}))
+
+    def test_bounds_between_midnights(self):
+        """
+        Test that bounds that are not at midnight are rounded to the days whose Date they
+        let through.
+        """
+        noon = datetime(2020, 1, 5, 12)
+        expected = {"$lt": datetime(2020, 1, 6)}
+        self.assertEqual(expected, timeseries_query({"Date": {"$lt": noon}})["$and"][1]["TimeIn"])
+        self.assertEqual(expected, timeseries_query({"Date": {"$lte": noon}})["$and"][1]["TimeIn"])
+        expected = {"$gte": datetime(2020, 1, 6)}
+        self.assertEqual(expected, timeseries_query({"Date": {"$gt": noon}})["$and"][1]["TimeIn"])
+        self.assertEqual(expected, timeseries_query({"Date": {"$gte": noon}})["$and"][1]["TimeIn"])
+        self.assertEqual({"$gte": datetime(2020, 1, 5), "$lt": datetime(2020, 1, 5)},
+                         timeseries_query({"Date": {"$gte": datetime(2020, 1, 5),
+                                                    "$lt": datetime(2020, 1, 5)}})
+                         ["$and"][1]["TimeIn"])